@@ -1,10 +1,14 @@
 from flask import Flask, render_template, redirect, url_for
 from routes import auth, chat, diary, community, place, tourspot, dailycare, mypage
+from assets import init_assets
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object('config.Config')
     
+    # 빌드한 정적 파일은 해시 경로 + .br/.gz + immutable 캐시로 서비스
+    init_assets(app)
+    
     # 블루프린트 등록
     app.register_blueprint(auth.bp, url_prefix='/auth')
     app.register_blueprint(chat.bp, url_prefix='/chat')
@@ -8,6 +8,11 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///mypets_voice.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # 여행지 추천(/tourspot/recommendations)이 읽는 DB - demo_flask_app/feed_sync.py가 채우는 DB
+    # (demo 앱의 DATABASE_URL=sqlite:///petcare.db는 Flask-SQLAlchemy가 instance/ 아래로 둠)
+    TOURSPOT_DATABASE_URL = os.environ.get('TOURSPOT_DATABASE_URL') or 'sqlite:///' + os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '..', 'demo_flask_app', 'instance', 'petcare.db')
+    
     # Upload configuration
     UPLOAD_FOLDER = 'static/uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
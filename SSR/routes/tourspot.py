@@ -1,12 +1,55 @@
-from flask import Blueprint, render_template, request, jsonify
+import os
+
+from flask import Blueprint, current_app, render_template, request, jsonify
+from sqlalchemy import create_engine, inspect, text
 
 bp = Blueprint('tourspot', __name__)
 
+
+def _engine():
+    # feed_sync.py가 채운 로컬 DB를 읽기만 하므로 앱마다 엔진 하나를 재사용
+    engine = current_app.extensions.get('tourspot_engine')
+    if engine is None:
+        engine = create_engine(current_app.config['TOURSPOT_DATABASE_URL'])
+        current_app.extensions['tourspot_engine'] = engine
+    return engine
+
+
+def _missing_sqlite_file(engine):
+    # 파일이 없는데 연결하면 sqlite가 빈 DB를 만들어 버리므로 먼저 확인
+    url = engine.url
+    return (url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+            and not os.path.exists(url.database))
+
 @bp.route('/')
 def index():
     return render_template('tourspot/index.html')
 
 @bp.route('/recommendations')
 def recommendations():
-    # TODO: 투어스팟 추천 로직 구현
-    return jsonify({'status': 'success', 'spots': []})
\ No newline at end of file
+    # 외부 API를 요청마다 부르지 않고, 동기화해 둔 여행지(travel_destination)에서 추천
+    region = request.args.get('region', '').strip()
+    limit = max(1, min(request.args.get('limit', 12, type=int), 50))
+    
+    sql = ('SELECT id, name, location, description, image_url, contact_info, website, pet_policies '
+           'FROM travel_destination')
+    params = {'limit': limit}
+    if region:
+        sql += ' WHERE location LIKE :region'
+        params['region'] = f'%{region}%'
+    sql += ' ORDER BY synced_at DESC, id DESC LIMIT :limit'
+    
+    try:
+        engine = _engine()
+        if _missing_sqlite_file(engine):
+            # 아직 feed_sync.py로 동기화하지 않음 - 추천할 여행지가 없는 것과 같음
+            return jsonify({'status': 'success', 'spots': []})
+        with engine.connect() as conn:
+            if not inspect(conn).has_table('travel_destination'):
+                return jsonify({'status': 'success', 'spots': []})
+            spots = [dict(row._mapping) for row in conn.execute(text(sql), params)]
+    except Exception as e:
+        current_app.logger.warning('여행지 조회 실패: %s', e)
+        return jsonify({'status': 'error', 'message': '여행지 정보를 불러올 수 없습니다.', 'spots': []}), 503
+    
+    return jsonify({'status': 'success', 'spots': spots})
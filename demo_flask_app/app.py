@@ -1,9 +1,9 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, Response, abort, render_template, request, redirect, url_for, flash, jsonify, session, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 import os
+import json
 from datetime import datetime
 import requests
 import openai
@@ -16,40 +16,218 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///petcare.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
+app.config['IMAGE_MAX_BYTES'] = int(os.getenv('IMAGE_MAX_BYTES', str(15 * 1024 * 1024)))
+# 업로드 한 장 + multipart 헤더 여유분보다 큰 요청 본문은 읽기 전에 413
+app.config['MAX_CONTENT_LENGTH'] = app.config['IMAGE_MAX_BYTES'] + 1024 * 1024
+app.config['METRICS_ENABLED'] = os.getenv('PETCARE_METRICS', '0') == '1'
 
 # 업로드 폴더 생성
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # 모델 정의 먼저 import
-from models import db, User, Pet, Diary, DiaryLike, CommunityPost, Comment, PostLike, HealthRecord, CareRoutine, ChatLog, Place, PlaceReview, TravelDestination
+from models import db, User, Pet, Diary, DiaryJob, DiaryLike, CommunityPost, Comment, PostLike, HealthRecord, CareRoutine, ChatLog, Place, PlaceReview, TravelDestination, UploadedImage
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, paginate_feed, parse_feed_args, serialize_post
+from comments import add_comment, delete_comment, load_thread, serialize_thread
+from counters import LIKE_TARGETS, ViewCounter, like_listeners, set_like, toggle_like
+from rankings import BOARDS, Rankings
+import search
+import geo
+from reviews import add_review, delete_review, rating_summary, recent_reviews, serialize_review, top_rated, update_review
+from sqlalchemy.orm import contains_eager, joinedload
+from instrumentation import init_instrumentation
+from diary_jobs import DiaryJobQueue, QueueFull, serialize_job
+from cache_backends import make_backend
+from persona import PersonaCache
+from identity import IdentityCache
+from page_cache import ContentVersions, PageCache, content_fingerprint, template_stamp
+from assets import init_assets
+from compression import CompressionMiddleware
+from passwords import PasswordService, PasswordServiceBusy, RateLimiter
+from chat_context import ContextBuilder, extractive_summary
+from response_cache import ResponseCache
+from llm_gateway import CircuitBreaker, LLMGateway, LLMRejected, LLMUnavailable, fallback_reply
+from db_profile import init_db_profile
+from weather import WeatherService, make_provider, serialize_weather
+from images import ImagePipeline, ImageTooLarge, InvalidImage, parse_photos, resolve_photos, serialize_image
 
-# 데이터베이스 초기화
-db.init_app(app)
+# 데이터베이스 초기화 (SQLite면 WAL/PRAGMA/연결 풀 프로필 적용, SQLITE_PROFILE)
+init_db_profile(app, db)
+
+# 요청별 쿼리 수/지연 시간 계측 (PETCARE_METRICS=1 일 때만)
+init_instrumentation(app, db)
 
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# OpenAI API 설정
-from openai import OpenAI
-openai_client = OpenAI(
-    api_key=os.getenv('OPENAI_API_KEY')
+# OpenAI API 설정 (타임아웃/재시도/동시 호출 제한/서킷 브레이커는 게이트웨이에서)
+# OPENAI_BASE_URL을 지정하면 로컬 스텁 서버(fake_openai.py) 등 호환 서버를 사용
+llm = LLMGateway(
+    api_key=os.getenv('OPENAI_API_KEY'),
+    base_url=os.getenv('OPENAI_BASE_URL') or None,
+    timeout=float(os.getenv('LLM_TIMEOUT', '20')),
+    deadline=float(os.getenv('LLM_DEADLINE', '45')),
+    max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '8')),
+    max_retries=int(os.getenv('LLM_MAX_RETRIES', '2')),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv('LLM_BREAKER_THRESHOLD', '5')),
+        reset_timeout=float(os.getenv('LLM_BREAKER_RESET', '30'))
+    )
 ) if os.getenv('OPENAI_API_KEY') else None
 
+# 반려동물 페르소나 프롬프트 캐시 (PERSONA_CACHE_URL=redis://... 이면 워커 간 공유)
+persona_cache = PersonaCache(make_backend(
+    os.getenv('PERSONA_CACHE_URL'),
+    prefix='persona',
+    maxsize=int(os.getenv('PERSONA_CACHE_SIZE', '1024'))
+))
+persona_cache.watch()
+
+# 로그인 사용자 스냅샷 캐시 (IDENTITY_CACHE_URL=redis://... 이면 워커 간 공유)
+identity_cache = IdentityCache(make_backend(
+    os.getenv('IDENTITY_CACHE_URL'),
+    prefix='identity',
+    maxsize=int(os.getenv('IDENTITY_CACHE_SIZE', '4096')),
+    ttl=int(os.getenv('IDENTITY_CACHE_TTL', '300'))
+))
+identity_cache.watch()
+
+# 비밀번호 해시는 전용 스레드 풀에서 (PASSWORD_HASH_METHOD가 바뀌면 로그인할 때 다시 해시)
+password_service = PasswordService(
+    method=os.getenv('PASSWORD_HASH_METHOD', 'scrypt'),
+    workers=int(os.getenv('PASSWORD_WORKERS', '4')),
+    max_pending=int(os.getenv('PASSWORD_MAX_PENDING', '32'))
+)
+# 로그인/회원가입 시도 제한 (IP별, 로그인은 계정별로도)
+ip_limiter = RateLimiter(
+    per_minute=float(os.getenv('AUTH_IP_PER_MINUTE', '20')),
+    burst=int(os.getenv('AUTH_IP_BURST', '30'))
+)
+account_limiter = RateLimiter(
+    per_minute=float(os.getenv('AUTH_ACCOUNT_PER_MINUTE', '5')),
+    burst=int(os.getenv('AUTH_ACCOUNT_BURST', '10'))
+)
+
+def too_many_attempts(*keys):
+    """키마다 시도 토큰을 쓰고, 하나라도 모자라면 429 응답 (괜찮으면 None)"""
+    for limiter, key in keys:
+        wait = limiter.acquire(key)
+        if wait:
+            response = jsonify({'error': '시도가 너무 많아요. 잠시 후 다시 시도해주세요.'})
+            response.headers['Retry-After'] = str(int(wait) + 1)
+            return response, 429
+    return None
+
+# 메인 페이지 인기/트렌딩 순위 (좋아요가 바뀌면 바로 반영, RANKINGS_REFRESH초마다 재계산)
+rankings = Rankings(
+    app,
+    refresh_interval=int(os.getenv('RANKINGS_REFRESH', '300')),
+    trending_window_days=int(os.getenv('TRENDING_WINDOW_DAYS', '7'))
+)
+rankings.watch()  # 글이 비공개로 바뀌거나 지워지면 바로 순위표에서 뺌
+like_listeners.append(rankings.on_likes_changed)
+
+# 익명 페이지 ETag/304와 렌더링 조각 캐시 (PAGE_CACHE_URL=redis://... 이면 워커 간 공유)
+page_cache_backend = make_backend(
+    os.getenv('PAGE_CACHE_URL'),
+    prefix='page',
+    maxsize=int(os.getenv('PAGE_CACHE_SIZE', '512')),
+    ttl=int(os.getenv('PAGE_CACHE_TTL', '60'))
+)
+content_versions = ContentVersions(
+    page_cache_backend,
+    # 버전을 공유하지 않는 프로세스 내 LRU면 다른 워커의 변경을 DB 지문으로 확인
+    fingerprint=None if os.getenv('PAGE_CACHE_URL') else content_fingerprint,
+    check_interval=int(os.getenv('PAGE_CACHE_VERSION_CHECK', '60'))
+)
+content_versions.watch()
+like_listeners.append(content_versions.on_likes_changed)
+page_cache = PageCache(page_cache_backend, content_versions,
+                       template_stamp(os.path.join(app.root_path, app.template_folder)))
+
+# 빌드한 정적 파일(python assets.py)은 해시 경로 + 미리 압축한 .br/.gz + immutable 캐시로 서비스
+init_assets(app)
+
+# HTML/JSON/SSE 응답 압축 (Accept-Encoding에 따라 zstd/br/gzip, 스트리밍은 조각 단위)
+if os.getenv('COMPRESSION_ENABLED', '1') == '1':
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app,
+        min_size=int(os.getenv('COMPRESSION_MIN_SIZE', '1024')),
+        buffer_limit=int(os.getenv('COMPRESSION_BUFFER_LIMIT', str(1024 * 1024))),
+        encodings=tuple(os.getenv('COMPRESSION_ENCODINGS', 'zstd,br,gzip').split(',')),
+        levels={'br': int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4')),
+                'zstd': int(os.getenv('COMPRESSION_ZSTD_LEVEL', '3')),
+                'gzip': int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))}
+    )
+
+# 일기 작성용 날씨 (지역/정시 단위 캐시, 같은 지역 동시 조회는 외부 호출 한 번)
+weather_service = WeatherService(
+    make_provider(os.getenv('WEATHER_PROVIDER', 'fake'), os.getenv('WEATHER_API_KEY'),
+                  latency=float(os.getenv('WEATHER_FAKE_LATENCY', '0.2'))),
+    grid=float(os.getenv('WEATHER_GRID', '0.1')),
+    stale_ttl=int(os.getenv('WEATHER_STALE_TTL', '10800')),
+    timeout=float(os.getenv('WEATHER_TIMEOUT', '1.5'))
+)
+WEATHER_DEFAULT_LOCATION = (float(os.getenv('WEATHER_DEFAULT_LAT', '37.5665')),
+                            float(os.getenv('WEATHER_DEFAULT_LNG', '126.9780')))
+
+# 업로드 사진 처리 (원본은 static 밖에 두고 WebP/JPEG 변환본은 스레드 풀에서 생성)
+image_pipeline = ImagePipeline(
+    app,
+    upload_dir=app.config['UPLOAD_FOLDER'],
+    originals_dir=os.getenv('IMAGE_ORIGINALS_DIR', 'image_originals'),
+    url_prefix='/' + app.config['UPLOAD_FOLDER'],
+    workers=int(os.getenv('IMAGE_WORKERS', '2')),
+    max_bytes=app.config['IMAGE_MAX_BYTES']
+)
+app.add_template_filter(parse_photos, 'photo_list')
+
+# 게시글/공개 일기 전문 검색 색인 (글이 바뀌면 같은 트랜잭션에서 갱신)
+search.watch()
+
+# 장소 위치 검색 R*Tree (장소가 추가/이동되면 같은 트랜잭션에서 갱신)
+geo.watch()
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # 매 요청 User 조회 대신 캐시된 스냅샷 (User가 바뀌어 커밋되면 캐시에서 지워짐)
+    return identity_cache.load(user_id)
+
+def ranking_key():
+    """메인 페이지 인기 목록의 내용을 정하는 값 (순위표 상위 항목의 id/좋아요/조회수)"""
+    return tuple((item.id, item.likes, item.views)
+                 for name in ('popular_diaries', 'popular_posts') for item in rankings.top(name))
 
 # 메인 페이지
 @app.route('/')
+@page_cache.cached_page(scopes=('diary', 'post'), max_age=60, key=ranking_key)
 def index():
-    # 인기 일기와 커뮤니티 게시글 가져오기
-    popular_diaries = Diary.query.filter_by(is_public=True).order_by(Diary.likes.desc()).limit(5).all()
-    popular_posts = CommunityPost.query.order_by(CommunityPost.likes.desc()).limit(5).all()
+    # 인기 일기와 커뮤니티 게시글 (메모리의 순위표에서, 렌더링한 목록은 조각 캐시에)
+    popular_lists = page_cache.fragment(
+        'popular_lists', (ranking_key(), page_cache.version_key('diary', 'post')),
+        lambda: render_template('_popular_lists.html',
+                                popular_diaries=rankings.top('popular_diaries'),
+                                popular_posts=rankings.top('popular_posts')))
     
-    return render_template('index.html', 
-                         popular_diaries=popular_diaries, 
-                         popular_posts=popular_posts)
+    return render_template('index.html', popular_lists=popular_lists)
+
+@app.route('/api/rankings/<name>')
+def api_rankings(name):
+    if name not in BOARDS:
+        abort(404)
+    limit = min(request.args.get('limit', 5, type=int), rankings.capacity)
+    return jsonify({
+        'ranking': name,
+        'items': [{
+            'id': item.id,
+            'title': item.title,
+            'author': item.author,
+            'likes': item.likes,
+            'views': item.views,
+            'score': round(item.score, 4),
+            'created_at': item.created_at.isoformat()
+        } for item in rankings.top(name, limit=max(limit, 1))]
+    }), 200
 
 # 회원가입
 @app.route('/register', methods=['GET', 'POST'])
@@ -76,6 +254,11 @@ def register():
             if len(password) < 6:
                 return jsonify({'error': '비밀번호는 최소 6자 이상이어야 합니다.'}), 400
             
+            # 중복 체크로 가입된 아이디/이메일을 알아낼 수 없도록 DB 조회 전에 시도 제한
+            limited = too_many_attempts((ip_limiter, request.remote_addr))
+            if limited:
+                return limited
+            
             # 중복 체크
             if User.query.filter_by(username=username).first():
                 return jsonify({'error': '이미 존재하는 아이디입니다.'}), 400
@@ -88,7 +271,7 @@ def register():
                 username=username,
                 email=email,
                 nickname=nickname,
-                password_hash=generate_password_hash(password)
+                password_hash=password_service.hash(password)
             )
             
             db.session.add(new_user)
@@ -97,6 +280,8 @@ def register():
             print(f"User created successfully: {username}")  # 디버그용
             return jsonify({'message': '회원가입이 완료되었습니다.'}), 200
             
+        except PasswordServiceBusy:
+            return jsonify({'error': '지금은 요청이 많아요. 잠시 후 다시 시도해주세요.'}), 503
         except Exception as e:
             print(f"Registration error: {e}")  # 디버그용
             db.session.rollback()
@@ -119,12 +304,22 @@ def login():
             if not username or not password:
                 return jsonify({'error': '아이디와 비밀번호를 모두 입력해주세요.'}), 400
             
+            limited = too_many_attempts((ip_limiter, request.remote_addr), (account_limiter, username.lower()))
+            if limited:
+                return limited
+            
             user = User.query.filter_by(username=username).first()
             print(f"User found: {user is not None}")  # 디버그용
             
             if user:
                 print(f"Checking password for user: {username}")  # 디버그용
-                if check_password_hash(user.password_hash, password):
+                ok, needs_rehash = password_service.verify(user.password_hash, password)
+                if ok:
+                    if needs_rehash:
+                        # 해시 방식/파라미터가 바뀌었으면 맞는 비밀번호를 아는 지금 새로 해시
+                        user.password_hash = password_service.hash(password)
+                        db.session.commit()
+                    account_limiter.reset(username.lower())
                     login_user(user)
                     print(f"Login successful for user: {username}")  # 디버그용
                     return jsonify({'message': '로그인 성공', 'redirect': url_for('dashboard')}), 200
@@ -135,6 +330,9 @@ def login():
                 print(f"User not found: {username}")  # 디버그용
                 return jsonify({'error': '존재하지 않는 아이디입니다.'}), 400
                 
+        except PasswordServiceBusy:
+            db.session.rollback()
+            return jsonify({'error': '지금은 요청이 많아요. 잠시 후 다시 시도해주세요.'}), 503
         except Exception as e:
             print(f"Login error: {e}")  # 디버그용
             return jsonify({'error': f'로그인 중 오류가 발생했습니다: {str(e)}'}), 500
@@ -145,6 +343,7 @@ def login():
 @app.route('/logout')
 @login_required
 def logout():
+    identity_cache.invalidate(current_user.id)
     logout_user()
     return redirect(url_for('index'))
 
@@ -153,7 +352,7 @@ def logout():
 @login_required
 def dashboard():
     user_pets = Pet.query.filter_by(user_id=current_user.id).all()
-    recent_diaries = Diary.query.join(Pet).filter(Pet.user_id == current_user.id).order_by(Diary.created_at.desc()).limit(3).all()
+    recent_diaries = Diary.query.join(Pet).options(contains_eager(Diary.pet)).filter(Pet.user_id == current_user.id).order_by(Diary.created_at.desc()).limit(3).all()
     
     return render_template('dashboard.html', pets=user_pets, recent_diaries=recent_diaries)
 
@@ -185,6 +384,12 @@ def add_pet():
             user_id=current_user.id
         )
         
+        # 미리 /api/images로 올린 프로필 사진은 정사각형 썸네일을 사용
+        # (URL은 해시로 정해지므로 변환을 기다리지 않고 바로 기록)
+        profile_photo = resolve_photos([data.get('profile_image_id')], limit=1)
+        if profile_photo:
+            new_pet.profile_image = profile_photo[0]['thumb']['jpeg']
+        
         db.session.add(new_pet)
         db.session.commit()
         
@@ -199,6 +404,57 @@ def chat(pet_id):
     pet = Pet.query.filter_by(id=pet_id, user_id=current_user.id).first_or_404()
     return render_template('chat.html', pet=pet)
 
+def summarize_chat(previous_summary, turns):
+    """오래된 대화를 누적 요약에 합침 (맥락 예산을 넘을 때만 호출)"""
+    if not llm:
+        return extractive_summary(previous_summary, turns)
+    
+    conversation = '\n'.join(f"주인: {log.user_message}\n나: {log.ai_response}" for log in turns)
+    return llm.complete(
+        messages=[
+            {
+                "role": "system",
+                "content": "반려동물이 주인과 나눈 대화를 반려동물이 기억해야 할 사실 위주로 5문장 이내로 요약하세요."
+            },
+            {
+                "role": "user",
+                "content": f"기존 요약:\n{previous_summary or '(없음)'}\n\n새 대화:\n{conversation}"
+            }
+        ],
+        max_tokens=300,
+        temperature=0.3,
+        purpose='summary'
+    )
+
+# 반복 질문 응답 캐시 (CHAT_CACHE_THRESHOLD < 1.0 이면 비슷한 질문도 적중)
+response_cache = ResponseCache(
+    ttl=int(os.getenv('CHAT_CACHE_TTL', '3600')),
+    maxsize=int(os.getenv('CHAT_CACHE_SIZE', '5000')),
+    threshold=float(os.getenv('CHAT_CACHE_THRESHOLD', '1.0'))
+) if os.getenv('CHAT_CACHE_ENABLED', '0') == '1' else None
+
+# 대화 맥락 구성 (최근 대화 + 누적 요약을 토큰 예산 안에서, 요약은 백그라운드 스레드에서)
+chat_context = ContextBuilder(
+    budget_tokens=int(os.getenv('CHAT_CONTEXT_BUDGET', '1000')),
+    window=int(os.getenv('CHAT_CONTEXT_WINDOW', '20')),
+    summarize=summarize_chat,
+    app=app
+)
+
+def save_chat_log(persona, message, ai_response):
+    chat_log = ChatLog(
+        pet_id=persona.pet_id,
+        user_message=message,
+        ai_response=ai_response
+    )
+    db.session.add(chat_log)
+    db.session.commit()
+
+def sse_event(data, event=None):
+    """Server-Sent Events 형식의 메시지 한 개"""
+    payload = json.dumps(data, ensure_ascii=False)
+    return (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+
 @app.route('/api/chat', methods=['POST'])
 @login_required
 def api_chat():
@@ -206,53 +462,83 @@ def api_chat():
     pet_id = data.get('pet_id')
     message = data.get('message')
     
-    pet = Pet.query.filter_by(id=pet_id, user_id=current_user.id).first_or_404()
+    # 캐시 적중 시 Pet 조회 없이 소유자 확인과 프롬프트 구성이 끝남
+    persona = persona_cache.load(pet_id, current_user.id)
+    if persona is None:
+        abort(404)
+    
+    # 자주 오는 질문은 캐시된 대답 재사용 (CHAT_CACHE_ENABLED=1 일 때만)
+    cached = response_cache.get(persona, message) if response_cache else None
+    if cached is not None:
+        save_chat_log(persona, message, cached.response)
+        if data.get('stream'):
+            body = sse_event({'token': cached.response}) + sse_event({'response': cached.response, 'cached': True}, event='done')
+            return Response(body, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+        return jsonify({'response': cached.response, 'cached': True}), 200
+    
+    if not llm:
+        return jsonify({'error': 'OpenAI API 키가 설정되지 않았습니다. 관리자에게 문의하세요.'}), 500
+    
+    context = chat_context.build(persona, message)
+    
+    if data.get('stream'):
+        return Response(stream_with_context(stream_chat(persona, message, context)),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
     
     # AI 응답 생성
     try:
-        if not openai_client:
-            return jsonify({'error': 'OpenAI API 키가 설정되지 않았습니다. 관리자에게 문의하세요.'}), 500
-            
-        response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"""
-                    당신은 {pet.name}이라는 이름의 {pet.species} {pet.breed}입니다.
-                    성격: {pet.personality}
-                    말투: {pet.speaking_style}
-                    주인을 부르는 호칭: {pet.user_nickname or '주인'}
-                    좋아하는 것: {pet.likes}
-                    싫어하는 것: {pet.dislikes}
-                    습관: {pet.habits}
-                    
-                    반려동물의 관점에서 주인과 대화하세요. 친근하고 애정어린 톤으로 대화하며, 
-                    때로는 장난스럽고 귀여운 모습을 보여주세요.
-                    """
-                },
-                {"role": "user", "content": message}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
-        
-        ai_response = response.choices[0].message.content
+        ai_response = llm.complete(context.messages, max_tokens=500, temperature=0.7)
         
         # 대화 기록 저장
-        chat_log = ChatLog(
-            pet_id=pet_id,
-            user_message=message,
-            ai_response=ai_response
-        )
-        db.session.add(chat_log)
-        db.session.commit()
+        save_chat_log(persona, message, ai_response)
+        if response_cache:
+            response_cache.put(persona, message, ai_response)
         
         return jsonify({'response': ai_response}), 200
         
+    except LLMUnavailable:
+        # OpenAI 장애 중에는 기다리지 않고 반려동물 말투의 고정 답변 (기록/캐시하지 않음)
+        return jsonify({'response': fallback_reply(persona.name), 'degraded': True}), 200
     except Exception as e:
         return jsonify({'error': 'AI 응답 생성 중 오류가 발생했습니다.'}), 500
 
+def stream_chat(persona, message, context):
+    """
+    토큰이 도착하는 대로 SSE로 전달하고, 스트림이 끝나면 전체 응답을 ChatLog에 저장.
+    
+    이벤트 형식:
+        data: {"token": "..."}            토큰 조각
+        event: done / data: {"response"}  전체 응답 (저장 완료)
+        event: error / data: {"error"}    생성 실패
+    OpenAI를 쓸 수 없으면 고정 답변을 토큰 하나로 보내고 done에 degraded를 표시.
+    """
+    chunks = []
+    try:
+        for token in llm.stream(context.messages, max_tokens=500, temperature=0.7):
+            chunks.append(token)
+            yield sse_event({'token': token})
+        
+        ai_response = ''.join(chunks)
+        
+        # 스트림이 끝난 뒤 한 번에 대화 기록 저장
+        save_chat_log(persona, message, ai_response)
+        if response_cache:
+            response_cache.put(persona, message, ai_response)
+        
+        yield sse_event({'response': ai_response}, event='done')
+        
+    except LLMUnavailable:
+        if chunks:
+            yield sse_event({'error': 'AI 응답 생성 중 오류가 발생했습니다.'}, event='error')
+            return
+        reply = fallback_reply(persona.name)
+        yield sse_event({'token': reply})
+        yield sse_event({'response': reply, 'degraded': True}, event='done')
+    except Exception as e:
+        db.session.rollback()
+        yield sse_event({'error': 'AI 응답 생성 중 오류가 발생했습니다.'}, event='error')
+
 # 일기 작성
 @app.route('/diary')
 @login_required
@@ -267,6 +553,99 @@ def pet_diary(pet_id):
     diaries = Diary.query.filter_by(pet_id=pet_id).order_by(Diary.created_at.desc()).all()
     return render_template('pet_diary.html', pet=pet, diaries=diaries)
 
+def generate_diary_content(pet, weather, content_summary):
+    """
+    반려동물 관점의 일기 본문 생성 (백그라운드 작업 스레드에서 호출)
+    OpenAI를 쓸 수 없으면 LLMUnavailable이 올라가고 작업 큐가 백오프 뒤에 다시 시도함
+    (서킷이 열려 있어 거절된 LLMRejected는 시도 횟수에 넣지 않음)
+    """
+    return llm.complete(
+        messages=[
+            {
+                "role": "system",
+                "content": f"""
+                당신은 {pet.name}이라는 {pet.species} {pet.breed}입니다.
+                오늘 있었던 일을 바탕으로 일기를 작성해주세요.
+                반려동물의 관점에서 하루를 돌아보며, 감정과 생각을 표현하세요.
+                귀엽고 따뜻한 문체로 작성해주세요.
+                """
+            },
+            {
+                "role": "user", 
+                "content": f"오늘 날씨: {weather}\n오늘 있었던 일: {content_summary}\n\n이 내용을 바탕으로 일기를 작성해주세요."
+            }
+        ],
+        max_tokens=800,
+        temperature=0.8,
+        purpose='diary'
+    )
+
+# 게시글 조회수는 모아서 반영
+view_counter = ViewCounter(
+    app,
+    flush_interval=float(os.getenv('VIEW_FLUSH_INTERVAL', '10')),
+    flush_threshold=int(os.getenv('VIEW_FLUSH_THRESHOLD', '500'))
+)
+
+# AI 일기 생성 작업 큐
+diary_queue = DiaryJobQueue(
+    app,
+    generate=generate_diary_content,
+    workers=int(os.getenv('DIARY_JOB_WORKERS', '2')),
+    max_pending=int(os.getenv('DIARY_JOB_QUEUE_SIZE', '16')),
+    poll_interval=float(os.getenv('DIARY_JOB_POLL_INTERVAL', '5')),
+    lease=float(os.getenv('DIARY_JOB_LEASE', '120')),
+    retry_base=float(os.getenv('DIARY_JOB_RETRY_BASE', '30')),
+    retry_max=float(os.getenv('DIARY_JOB_RETRY_MAX', '600')),
+    rejected_errors=(LLMRejected,)
+)
+
+def request_location(data):
+    """요청의 latitude/longitude, 없거나 잘못되면 기본 지역"""
+    try:
+        lat, lng = float(data.get('latitude')), float(data.get('longitude'))
+    except (TypeError, ValueError):
+        return WEATHER_DEFAULT_LOCATION
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return WEATHER_DEFAULT_LOCATION
+    return lat, lng
+
+@app.route('/api/weather')
+@login_required
+def api_weather():
+    current = weather_service.lookup(*request_location(request.args))
+    if current is None:
+        return jsonify({'error': '날씨 정보를 가져오지 못했습니다.'}), 503
+    return jsonify(serialize_weather(current)), 200
+
+@app.route('/api/images', methods=['POST'])
+@login_required
+def api_upload_image():
+    # 본문 자체가 이미지(Content-Type: image/*)이면 그대로 스트리밍, 아니면 multipart의 file 필드
+    # (multipart는 werkzeug가 이미 다 받아 임시 파일로 옮겨 둔 것을 읽음)
+    if request.mimetype.startswith('image/') or request.mimetype == 'application/octet-stream':
+        stream = request.stream
+    else:
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({'error': '이미지 파일이 필요합니다.'}), 400
+        stream = upload.stream
+    
+    try:
+        image, _ = image_pipeline.store(stream, uploaded_by=current_user.id)
+    except ImageTooLarge:
+        return jsonify({'error': '사진이 너무 커요.'}), 413
+    except InvalidImage as e:
+        return jsonify({'error': str(e)}), 400
+    # 변환본은 뒤에서 만들어지므로 pending이면 202
+    return jsonify(serialize_image(image)), 202 if image.status == 'pending' else 200
+
+@app.route('/api/images/<digest>')
+@login_required
+def api_image(digest):
+    image = UploadedImage.query.filter_by(sha256=digest).first_or_404()
+    return jsonify(serialize_image(image)), 200
+
 @app.route('/diary/write/<int:pet_id>', methods=['GET', 'POST'])
 @login_required
 def write_diary(pet_id):
@@ -277,63 +656,112 @@ def write_diary(pet_id):
         
         title = data.get('title')
         content_summary = data.get('content_summary')
-        weather = data.get('weather', '맑음')
+        weather = (data.get('weather') or 'auto').strip()
+        
+        if not title or not content_summary:
+            return jsonify({'error': '제목과 오늘 있었던 일을 입력해주세요.'}), 400
+        
+        if not llm:
+            return jsonify({'error': 'OpenAI API 키가 설정되지 않았습니다. 관리자에게 문의하세요.'}), 500
+        
+        if weather == 'auto':
+            # 현재 위치(없으면 기본 지역) 날씨, 제때 못 받으면 맑음
+            current = weather_service.lookup(*request_location(data))
+            weather = current.condition if current else '맑음'
         
-        # AI로 일기 생성
+        # 사진은 먼저 /api/images로 올리고 받은 id 목록만 보냄 (최대 5장)
+        photos = resolve_photos(data.get('photos') if request.is_json else request.form.getlist('photos'))
+        
+        # AI 일기 생성은 백그라운드 작업으로 넘기고 바로 작업 id 반환
         try:
-            if not openai_client:
-                return jsonify({'error': 'OpenAI API 키가 설정되지 않았습니다. 관리자에게 문의하세요.'}), 500
-                
-            response = openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"""
-                        당신은 {pet.name}이라는 {pet.species} {pet.breed}입니다.
-                        오늘 있었던 일을 바탕으로 일기를 작성해주세요.
-                        반려동물의 관점에서 하루를 돌아보며, 감정과 생각을 표현하세요.
-                        귀엽고 따뜻한 문체로 작성해주세요.
-                        """
-                    },
-                    {
-                        "role": "user", 
-                        "content": f"오늘 날씨: {weather}\n오늘 있었던 일: {content_summary}\n\n이 내용을 바탕으로 일기를 작성해주세요."
-                    }
-                ],
-                max_tokens=800,
-                temperature=0.8
-            )
-            
-            ai_content = response.choices[0].message.content
-            
-            new_diary = Diary(
+            job = diary_queue.enqueue(
+                pet,
                 title=title,
-                content=ai_content,
+                content_summary=content_summary,
                 weather=weather,
-                pet_id=pet_id,
-                is_public=data.get('is_public') == 'true'
+                photos=json.dumps(photos, ensure_ascii=False) if photos else None,
+                is_public=data.get('is_public') in (True, 'true', 'on')
             )
-            
-            db.session.add(new_diary)
-            db.session.commit()
-            
-            return jsonify({
-                'message': '일기가 작성되었습니다.',
-                'diary_content': ai_content,
-                'redirect': url_for('pet_diary', pet_id=pet_id)
-            }), 200
-            
-        except Exception as e:
-            return jsonify({'error': '일기 생성 중 오류가 발생했습니다.'}), 500
+        except QueueFull:
+            return jsonify({'error': '지금은 일기 작성 요청이 많아요. 잠시 후 다시 시도해주세요.'}), 503
+        
+        return jsonify({
+            'message': '일기를 작성하고 있어요.',
+            'job_id': job.id,
+            'weather': weather,
+            'status_url': url_for('api_diary_job', job_id=job.id),
+            'redirect': url_for('pet_diary', pet_id=pet_id)
+        }), 202
     
     return render_template('write_diary.html', pet=pet)
 
+@app.route('/api/diary/jobs/<job_id>')
+@login_required
+def api_diary_job(job_id):
+    job = DiaryJob.query.join(Pet).filter(DiaryJob.id == job_id, Pet.user_id == current_user.id).first_or_404()
+    return jsonify(serialize_job(job)), 200
+
 # 커뮤니티
+def render_post_cards(posts):
+    """게시글 카드 목록 HTML (내 글에만 수정 메뉴가 있으므로 로그인한 사용자별로 캐시)"""
+    audience = current_user.id if current_user.is_authenticated else None
+    return page_cache.fragment(
+        'post_cards', (audience, [post.id for post in posts], page_cache.version_key('post')),
+        lambda: render_template('_post_cards.html', posts=posts))
+
 @app.route('/community')
+@page_cache.cached_page(scopes=('post',), max_age=30)
 def community():
-    posts = CommunityPost.query.order_by(CommunityPost.created_at.desc()).all()
-    return render_template('community.html', posts=posts)
+    filters = parse_feed_args(request.args)
+    try:
+        page = paginate_feed(**filters)
+    except InvalidCursor:
+        # 잘못된 커서는 첫 페이지로 대체
+        filters['cursor'] = None
+        page = paginate_feed(**filters)
+    
+    return render_template('community.html',
+                         posts=page.items,
+                         post_cards=render_post_cards(page.items),
+                         next_cursor=page.next_cursor,
+                         filters=filters)
+
+@app.route('/api/community/posts')
+def api_community_posts():
+    filters = parse_feed_args(request.args)
+    try:
+        page = paginate_feed(**filters)
+    except InvalidCursor:
+        return jsonify({'error': '잘못된 커서입니다.'}), 400
+    
+    return jsonify({
+        'posts': [serialize_post(post) for post in page.items],
+        'html': render_post_cards(page.items),
+        'next_cursor': page.next_cursor
+    }), 200
+
+@app.route('/api/community/posts/<int:post_id>')
+def api_community_post(post_id):
+    post = CommunityPost.query.options(joinedload(CommunityPost.author)).get_or_404(post_id)
+    view_counter.record(post.id)
+    
+    result = serialize_post(post)
+    result['content'] = post.content
+    result['views'] = (post.views or 0) + view_counter.pending(post.id)
+    return jsonify(result), 200
+
+@app.route('/api/search')
+def api_search():
+    filters = search.parse_search_args(request.args, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    try:
+        page = search.search(**filters)
+    except InvalidCursor:
+        return jsonify({'error': '잘못된 커서입니다.'}), 400
+    
+    return jsonify({
+        'results': [search.serialize_hit(hit, filters['q']) for hit in page.hits],
+        'next_cursor': page.next_cursor
+    }), 200
 
 @app.route('/community/write', methods=['GET', 'POST'])
 @login_required
@@ -355,6 +783,73 @@ def write_post():
     
     return render_template('write_post.html')
 
+@app.route('/api/community/posts/<int:post_id>/comments')
+def api_comment_threads(post_id):
+    CommunityPost.query.get_or_404(post_id)
+    limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    try:
+        page = load_thread(post_id, cursor=request.args.get('cursor') or None, limit=limit)
+    except InvalidCursor:
+        return jsonify({'error': '잘못된 커서입니다.'}), 400
+    
+    return jsonify({
+        'comments': [serialize_thread(node) for node in page.threads],
+        'next_cursor': page.next_cursor
+    }), 200
+
+@app.route('/api/community/posts/<int:post_id>/comments', methods=['POST'])
+@login_required
+def api_add_comment(post_id):
+    post = CommunityPost.query.get_or_404(post_id)
+    data = request.get_json() if request.is_json else request.form
+    
+    content = (data.get('content') or '').strip()
+    if not content:
+        return jsonify({'error': '댓글 내용을 입력해주세요.'}), 400
+    
+    try:
+        parent_id = int(data['parent_id']) if data.get('parent_id') else None
+        comment = add_comment(post, current_user.id, content, parent_id=parent_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'message': '댓글이 작성되었습니다.', 'comment_id': comment.id}), 200
+
+@app.route('/api/comments/<int:comment_id>', methods=['DELETE'])
+@login_required
+def api_delete_comment(comment_id):
+    comment = Comment.query.filter_by(id=comment_id, user_id=current_user.id).first_or_404()
+    deleted = delete_comment(comment)
+    return jsonify({'message': '댓글이 삭제되었습니다.', 'deleted': deleted}), 200
+
+# 좋아요 (POST: 토글, {"liked": true/false}를 주면 그 상태로 맞춤 / DELETE: 취소)
+@app.route('/api/<kind>/<int:target_id>/like', methods=['POST', 'DELETE'])
+@login_required
+def api_like(kind, target_id):
+    if kind not in LIKE_TARGETS:
+        abort(404)
+    model = LIKE_TARGETS[kind][0]
+    target = db.session.get(model, target_id)
+    if target is None:
+        abort(404)
+    # 비공개 일기는 작성자만 좋아요 가능
+    if kind == 'diary' and not target.is_public and target.pet.user_id != current_user.id:
+        abort(404)
+    
+    data = request.get_json(silent=True) or {}
+    if request.method == 'DELETE':
+        liked, likes = set_like(kind, target_id, current_user.id, False)
+    elif 'liked' in data:
+        liked, likes = set_like(kind, target_id, current_user.id, bool(data['liked']))
+    else:
+        liked, likes = toggle_like(kind, target_id, current_user.id)
+    
+    return jsonify({
+        'liked': liked,
+        'likes': likes,
+        'message': '좋아요를 눌렀어요.' if liked else '좋아요를 취소했어요.'
+    }), 200
+
 # 반려동물 케어
 @app.route('/care')
 @login_required
@@ -373,10 +868,74 @@ def pet_care(pet_id):
 
 # 지도 및 여행지 정보
 @app.route('/places')
+@page_cache.cached_page(max_age=3600)
 def places():
     return render_template('places.html')
 
+@app.route('/api/places/nearby')
+def api_places_nearby():
+    try:
+        filters = geo.parse_location_args(request.args)
+    except geo.InvalidLocation as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if 'box' in filters:
+        results = geo.within(**filters)
+    else:
+        results = geo.nearby(**filters)
+    return jsonify({
+        'places': [geo.serialize_place(place, distance) for place, distance in results]
+    }), 200
+
+@app.route('/api/places')
+def api_places():
+    category = (request.args.get('category') or '').strip() or None
+    limit = max(1, min(request.args.get('limit', geo.DEFAULT_LIMIT, type=int), geo.MAX_LIMIT))
+    places = top_rated(category=category, limit=limit)
+    return jsonify({'places': [geo.serialize_place(place) for place in places]}), 200
+
+@app.route('/api/places/<int:place_id>/reviews')
+def api_place_reviews(place_id):
+    place = Place.query.get_or_404(place_id)
+    limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    return jsonify({
+        'summary': rating_summary(place),
+        'reviews': [serialize_review(review) for review in recent_reviews(place.id, limit)]
+    }), 200
+
+@app.route('/api/places/<int:place_id>/reviews', methods=['POST'])
+@login_required
+def api_add_review(place_id):
+    place = Place.query.get_or_404(place_id)
+    data = request.get_json() if request.is_json else request.form
+    
+    try:
+        review = add_review(place, current_user.id, data.get('rating'), (data.get('content') or '').strip() or None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'message': '리뷰가 작성되었습니다.', 'review_id': review.id,
+                    'summary': rating_summary(place)}), 200
+
+@app.route('/api/reviews/<int:review_id>', methods=['PATCH', 'DELETE'])
+@login_required
+def api_review(review_id):
+    review = PlaceReview.query.filter_by(id=review_id, user_id=current_user.id).first_or_404()
+    place = review.place
+    
+    if request.method == 'DELETE':
+        delete_review(review)
+        return jsonify({'message': '리뷰가 삭제되었습니다.', 'summary': rating_summary(place)}), 200
+    
+    data = request.get_json() if request.is_json else request.form
+    try:
+        update_review(review, rating=data.get('rating'), content=data.get('content'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'message': '리뷰가 수정되었습니다.', 'summary': rating_summary(place)}), 200
+
 @app.route('/travel')
+@page_cache.cached_page(max_age=3600)
 def travel():
     return render_template('travel.html')
 
@@ -384,6 +943,22 @@ def travel():
 def create_app():
     return app
 
+def start_background_jobs():
+    """
+    밀린 AI 일기 작업과 사진 변환을 이어서 처리하고 조회수 반영 스레드를 시작 (서버 프로세스마다 한 번).
+    일기 작업은 점유(claim) 후 실행하므로 워커가 여럿이어도 중복 실행되지 않음.
+    (이어서 처리할 일기 작업 수, 사진 수)
+    """
+    view_counter.start()
+    jobs = diary_queue.resume_pending()
+    try:
+        images = image_pipeline.resume_pending()
+    except Exception as e:
+        # 마이그레이션 전 DB 등 - 서버는 그대로 띄움
+        print(f"⚠️ 밀린 사진 변환을 가져오지 못했습니다: {e}")
+        images = 0
+    return jobs, images
+
 if __name__ == '__main__':
     print("⚠️  직접 app.py를 실행하는 대신 다음 명령어를 사용하세요:")
     print("   python run_demo.py  (권장)")
@@ -393,9 +968,12 @@ if __name__ == '__main__':
     input()
     
     try:
+        from migrations import migrate
         with app.app_context():
-            db.create_all()
+            migrate()
             print("✅ 데이터베이스 초기화 완료")
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            start_background_jobs()
     except Exception as e:
         print(f"❌ 데이터베이스 초기화 실패: {e}")
     
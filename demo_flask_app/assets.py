@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+정적 파일(CSS/JS) 빌드와 서비스 - 압축, 내용 해시 파일명, 미리 압축한 gzip/brotli
+
+static/css, static/js를 Flask가 그대로 짧은 캐시 시간으로 보내는 대신, 배포 전에
+한 번 빌드해서 static/dist/ 아래에 내용 해시가 붙은 파일을 만들어 둡니다.
+
+    python assets.py                       # 이 앱의 static/ 빌드
+    python assets.py --check               # 빌드 결과가 원본보다 오래됐는지만 확인
+
+SSR 앱은 따로 배포할 수 있도록 같은 내용의 사본(SSR/assets.py)을 씁니다.
+한쪽을 고치면 다른 쪽도 같이 고쳐주세요.
+
+- CSS는 주석/공백을 줄이고, JS는 rjsmin이 설치되어 있으면 줄입니다 (없으면 그대로).
+- 파일명에 내용 해시(8자리)를 붙이고(css/base.css -> dist/css/base.1a2b3c4d.css),
+  .gz와 .br(Brotli 패키지가 있을 때)을 함께 만들어 둡니다. 압축해도 작아지지 않으면
+  압축본은 만들지 않습니다.
+- dist/manifest.json 에 원래 경로 -> 해시 경로를 기록합니다. 이전 빌드의 파일은
+  배포 중인 페이지가 참조할 수 있으므로 한 세대까지 남기고 그 전 것은 지웁니다.
+
+앱에서는 init_assets(app)을 부르면
+- 템플릿의 url_for('static', filename=...)과 asset_url(...)이 manifest에 있는 파일은
+  해시 경로를 돌려주고, 빌드하지 않았으면 원래 경로를 그대로 돌려줍니다.
+- dist/ 아래 파일은 Accept-Encoding에 따라 .br/.gz 압축본을 그대로 보내고,
+  파일명이 내용으로 정해지므로 1년짜리 immutable 캐시 헤더를 붙입니다.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # pip install Brotli
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:  # pip install rjsmin
+    rjsmin = None
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+SOURCE_DIRS = ('css', 'js')
+MINIFIERS = {'.css': 'minify_css', '.js': 'minify_js'}
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Accept-Encoding 협상 순서 (브라우저가 둘 다 받으면 더 작은 brotli)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_css_tokens = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/|\s+', re.S)
+# calc()의 '+'와 'a :hover'처럼 공백이 의미 있는 곳은 건드리지 않음
+_css_punctuation = re.compile(r'\s*([{};,>~])\s*|(:)\s+')
+_css_url = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def minify_css(source):
+    """주석을 지우고 공백을 줄임 (문자열 안은 그대로)"""
+    strings = []
+
+    def keep(match):
+        if match.group(1):
+            strings.append(match.group(1))
+            return f'\0{len(strings) - 1}\0'
+        return ' ' if match.group(0)[0].isspace() else ''
+
+    compact = _css_tokens.sub(keep, source)
+    compact = _css_punctuation.sub(lambda m: m.group(1) or m.group(2), compact).replace(';}', '}').strip()
+    return re.sub(r'\0(\d+)\0', lambda m: strings[int(m.group(1))], compact)
+
+
+def minify_js(source):
+    return rjsmin.jsmin(source) if rjsmin is not None else source
+
+
+def _rebase_css_urls(css, depth):
+    """dist/ 아래로 옮기면서 깨지는 상대 url(...)을 원래 파일을 가리키도록 고침"""
+    def rebase(match):
+        quote, target = match.groups()
+        if target.startswith(('/', 'data:', 'http:', 'https:', '#')):
+            return match.group(0)
+        return f'url({quote}{"../" * depth}{target}{quote})'
+    return _css_url.sub(rebase, css)
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def _compress(path, data):
+    """data를 .gz/.br로 압축해 저장 (작아질 때만). 만든 파일 목록"""
+    written = []
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            _write(path + suffix, compressed)
+            written.append(path + suffix)
+    return written
+
+
+def load_manifest(static_dir):
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def sources(static_dir):
+    """빌드할 원본 파일의 static 기준 경로 (css/, js/ 아래)"""
+    for folder in SOURCE_DIRS:
+        for root, _, files in os.walk(os.path.join(static_dir, folder)):
+            for name in sorted(files):
+                if os.path.splitext(name)[1] in MINIFIERS:
+                    yield os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, '/')
+
+
+def build(static_dir):
+    """static_dir을 빌드하고 (manifest, 원본 바이트 합, 해시 파일 바이트 합, gzip 합, brotli 합) 반환"""
+    dist = os.path.join(static_dir, DIST_DIR)
+    previous = load_manifest(static_dir)
+    manifest, totals = {}, [0, 0, 0, 0]
+
+    for logical in sources(static_dir):
+        stem, ext = os.path.splitext(logical)
+        with open(os.path.join(static_dir, logical), encoding='utf-8') as f:
+            source = f.read()
+        output = globals()[MINIFIERS[ext]](source)
+        if ext == '.css':
+            output = _rebase_css_urls(output, 1)  # dist/ 한 단계 아래로 옮김
+        data = output.encode('utf-8')
+
+        hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:8]}{ext}'
+        path = os.path.join(dist, hashed)
+        _write(path, data)
+        compressed = {suffix: os.path.getsize(path + suffix) for suffix in ('.gz', '.br')
+                      if path + suffix in _compress(path, data)}
+        manifest[logical] = f'{DIST_DIR}/{hashed}'
+
+        totals[0] += len(source.encode('utf-8'))
+        totals[1] += len(data)
+        totals[2] += compressed.get('.gz', len(data))
+        totals[3] += compressed.get('.br', compressed.get('.gz', len(data)))
+
+    _write(os.path.join(dist, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    _prune(static_dir, set(manifest.values()) | set(previous.values()))
+    return (manifest, *totals)
+
+
+def _prune(static_dir, keep):
+    """이번/이전 빌드에 없는 해시 파일과 압축본을 지움"""
+    dist = os.path.join(static_dir, DIST_DIR)
+    for root, _, files in os.walk(dist):
+        for name in files:
+            relative = os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, '/')
+            base = re.sub(r'\.(gz|br)$', '', relative)
+            if name != MANIFEST and base not in keep:
+                os.remove(os.path.join(root, name))
+
+
+def is_stale(static_dir):
+    """빌드 결과가 없거나 원본이 manifest보다 나중에 바뀌었거나 새로 생긴 파일이 있는지"""
+    manifest_path = os.path.join(static_dir, DIST_DIR, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return True
+    built_at = os.path.getmtime(manifest_path)
+    manifest = load_manifest(static_dir)
+    return any(logical not in manifest or os.path.getmtime(os.path.join(static_dir, logical)) > built_at
+               for logical in sources(static_dir))
+
+
+def init_assets(app):
+    """manifest의 해시 경로로 static URL을 만들고, dist/ 파일은 압축본과 immutable 캐시로 보냄"""
+    manifest = load_manifest(app.static_folder)
+    app.extensions['assets_manifest'] = manifest
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    def asset_url(filename, **values):
+        """url_for('static', filename=...)과 같음 (빌드했으면 해시 경로)"""
+        return url_for('static', filename=filename, **values)
+
+    app.add_template_global(asset_url, 'asset_url')
+
+    def static(filename):
+        if not filename.startswith(DIST_DIR + '/'):
+            return app.send_static_file(filename)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = request.accept_encodings
+        for encoding, suffix in ENCODINGS:
+            if accepted[encoding] and os.path.isfile(os.path.join(app.static_folder, filename + suffix)):
+                response = send_from_directory(app.static_folder, filename + suffix, mimetype=mimetype,
+                                               max_age=31536000)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(app.static_folder, filename, max_age=31536000)
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = static
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='정적 파일 빌드 (압축, 해시 파일명, gzip/brotli)')
+    parser.add_argument('static_dirs', nargs='*',
+                        default=[os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')])
+    parser.add_argument('--check', action='store_true', help='빌드하지 않고 오래된 빌드가 있는지만 확인')
+    args = parser.parse_args()
+
+    if args.check:
+        stale = [static_dir for static_dir in args.static_dirs if is_stale(static_dir)]
+        for static_dir in stale:
+            print(f'❌ {static_dir}: 빌드가 없거나 오래됐습니다 (python assets.py {static_dir})')
+        if not stale:
+            print('✅ 정적 파일 빌드가 최신입니다.')
+        sys.exit(1 if stale else 0)
+
+    if rjsmin is None:
+        print('⚠️  rjsmin이 없어 JS는 줄이지 않습니다 (pip install rjsmin)')
+    if brotli is None:
+        print('⚠️  Brotli가 없어 .br 파일은 만들지 않습니다 (pip install Brotli)')
+    for static_dir in args.static_dirs:
+        manifest, source, minified, gzipped, brotlied = build(static_dir)
+        print(f'✅ {static_dir}: {len(manifest)}개 파일  원본 {source:,}B -> 압축 전 {minified:,}B, '
+              f'gzip {gzipped:,}B, br {brotlied:,}B')
+
+
+if __name__ == '__main__':
+    main()
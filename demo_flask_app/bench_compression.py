@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+응답 압축 벤치마크 - 인코딩/레벨별 CPU 비용과 줄어든 바이트
+
+사용법:
+    python bench_compression.py                     # 게시글 40개, 조합마다 50번 압축
+    python bench_compression.py --posts 100 --repeat 500
+    python bench_compression.py --levels gzip:1,gzip:6,br:4,br:11,zstd:3
+
+임시 DB에 긴 게시글을 만든 뒤 실제 응답을 받아 압축 대상으로 씁니다.
+    html : GET /community (게시글 본문이 data 속성에 들어간 페이지)
+    json : GET /api/community/posts
+    sse  : AI 채팅 스트리밍처럼 토큰 하나씩 보내는 SSE 이벤트 (이벤트마다 flush)
+조합마다 응답 하나를 압축하는 CPU 시간(ms), 압축 후 크기 비율, CPU 1ms당 줄어든 KB를
+출력하고, 압축을 풀어 원래 내용과 같은지 확인합니다.
+마지막으로 CompressionMiddleware를 거친 요청과 압축하지 않은 요청의 처리 시간을 비교합니다.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import zlib
+
+# app을 import하기 전에 임시 DB
+_tmp_dir = tempfile.mkdtemp(prefix='petcare-bench-')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(_tmp_dir, "bench.db")}'
+
+import app as app_module
+from compression import ENCODERS, CompressionMiddleware, brotli, zstandard
+from models import db, CommunityPost, User
+
+WORDS = ('산책', '강아지', '고양이', '간식', '사료', '동물병원', '예방접종', '미용', '놀이터', '공원',
+         '오늘은', '날씨가', '좋아서', '함께', '다녀왔어요', '추천합니다', '후기', '질문', '꿀팁', '입니다')
+TAGS = ('산책해요', '꿀팁', '질문', '자랑')
+
+
+def seed(n_posts, rng):
+    with app_module.app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', nickname='벤치')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([CommunityPost(
+            title=' '.join(rng.choices(WORDS, k=5)),
+            content=' '.join(rng.choices(WORDS, k=rng.randint(80, 300))),
+            tag=rng.choice(TAGS), user_id=user.id,
+        ) for _ in range(n_posts)])
+        db.session.commit()
+
+
+def payloads(rng):
+    """압축할 응답 본문: 이름 -> 조각 목록 (sse만 여러 조각)"""
+    client = app_module.app.test_client()
+    headers = {'Accept-Encoding': 'identity'}
+    html = client.get('/community?limit=20', headers=headers).data
+    json_body = client.get('/api/community/posts?limit=20', headers=headers).data
+    reply = ' '.join(rng.choices(WORDS, k=300))
+    events = [app_module.sse_event({'token': token + ' '}).encode('utf-8') for token in reply.split(' ')]
+    events.append(app_module.sse_event({'response': reply}, event='done').encode('utf-8'))
+    return {'html': [html], 'json': [json_body], 'sse': events}
+
+
+def decompress(encoding, data):
+    if encoding == 'gzip':
+        return zlib.decompress(data, 31)
+    if encoding == 'br':
+        return brotli.decompress(data)
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def encode(encoding, level, chunks):
+    """chunks를 압축. 조각이 여러 개면 미들웨어처럼 조각마다 flush"""
+    encoder = ENCODERS[encoding][0](level)
+    flush = len(chunks) > 1
+    body = b''.join(encoder.compress(chunk) + (encoder.flush() if flush else b'') for chunk in chunks)
+    return body + encoder.finish()
+
+
+def measure(encoding, level, chunks, repeat):
+    """(응답 하나당 CPU ms, 압축 크기, 원래 내용과 같은지)"""
+    started = time.process_time()
+    for _ in range(repeat):
+        body = encode(encoding, level, chunks)
+    cpu_ms = (time.process_time() - started) * 1000 / repeat
+    return cpu_ms, len(body), decompress(encoding, body) == b''.join(chunks)
+
+
+def request_overhead(repeat):
+    """미들웨어를 거친 GET /community 의 요청당 ms (identity, 그리고 인코딩별)"""
+    client = app_module.app.test_client()
+    results = {}
+    for encoding in ('identity',) + tuple(ENCODERS):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            client.get('/community?limit=20', headers={'Accept-Encoding': encoding})
+        results[encoding] = (time.perf_counter() - started) * 1000 / repeat
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='응답 압축 벤치마크')
+    parser.add_argument('--posts', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=50, help='조합마다 압축 횟수')
+    parser.add_argument('--levels', default='gzip:1,gzip:6,gzip:9,br:1,br:4,br:6,br:11,zstd:1,zstd:3,zstd:9',
+                        help='비교할 인코딩:레벨 (쉼표로 구분, 설치되지 않은 인코딩은 건너뜀)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    seed(args.posts, rng)
+    bodies = payloads(rng)
+    combos = [(name, int(level)) for name, level in (item.split(':') for item in args.levels.split(','))]
+    skipped = sorted({name for name, _ in combos if name not in ENCODERS})
+    if skipped:
+        print(f'⚠️  설치되지 않아 건너뜀: {", ".join(skipped)} (pip install Brotli zstandard)')
+
+    print(f'🗜️  응답 압축 벤치마크 (게시글 {args.posts}개, 조합마다 {args.repeat}번, CPU {os.cpu_count()}개)')
+    for payload, chunks in bodies.items():
+        size = sum(len(chunk) for chunk in chunks)
+        label = f'{len(chunks)}개 이벤트' if len(chunks) > 1 else '한 번에'
+        print(f'\n{payload} ({size:,}B, {label})')
+        for encoding, level in combos:
+            if encoding not in ENCODERS:
+                continue
+            cpu_ms, compressed, same = measure(encoding, level, chunks, args.repeat)
+            saved_kb = (size - compressed) / 1024
+            mark = '✅' if same and compressed < size else '❌'
+            print(f'{mark} {encoding:<5} {level:>2}  CPU {cpu_ms:7.3f}ms  {compressed:>8,}B ({compressed / size:6.1%})'
+                  f'  CPU 1ms당 {saved_kb / cpu_ms if cpu_ms else float("inf"):8.1f}KB 절약')
+
+    # 미들웨어(app.py의 설정 레벨)까지 포함한 요청 처리 시간
+    if not isinstance(app_module.app.wsgi_app, CompressionMiddleware):
+        app_module.app.wsgi_app = CompressionMiddleware(app_module.app.wsgi_app)
+    print('\nGET /community 요청당 처리 시간 (미들웨어 포함)')
+    for encoding, ms in request_overhead(max(args.repeat // 4, 10)).items():
+        print(f'   {encoding:<8} {ms:7.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+로그인 처리량 벤치마크 - 비밀번호 해시 방식/전용 스레드 수별 초당 로그인 수
+
+사용법:
+    python bench_login.py                                  # 동시 16명, 조합마다 100번 로그인
+    python bench_login.py --concurrency 32 --logins 1000 --workers 0,2,4,8
+    python bench_login.py --methods pbkdf2:sha256:600000,scrypt:16384:8:1
+
+임시 DB에 사용자를 만들고, 여러 스레드가 동시에 POST /login 을 보내는 동안
+초당 성공한 로그인 수와 평균/p95 지연 시간을 출력합니다.
+    workers=0 : 요청 스레드에서 바로 해시 검증 (예전 방식)
+    workers=N : passwords.PasswordService의 N개짜리 전용 스레드 풀에서 검증
+마지막으로 예전 방식으로 저장된 해시가 로그인 한 번에 새 방식으로 바뀌는지 확인합니다.
+시도 제한(AUTH_*)은 벤치마크 동안 꺼둡니다.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+# app을 import하기 전에 임시 DB와 시도 제한 해제
+_tmp_dir = tempfile.mkdtemp(prefix='petcare-bench-')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(_tmp_dir, "bench.db")}'
+for _name in ('AUTH_IP_PER_MINUTE', 'AUTH_IP_BURST', 'AUTH_ACCOUNT_PER_MINUTE', 'AUTH_ACCOUNT_BURST'):
+    os.environ[_name] = '1000000000'
+
+import app as app_module
+from models import db, User
+from passwords import PasswordService, hash_scheme
+from werkzeug.security import generate_password_hash
+
+PASSWORD = 'bench-password'
+
+
+def seed_users(n_users, method):
+    password_hash = generate_password_hash(PASSWORD, method=method)
+    with app_module.app.app_context():
+        User.query.delete()
+        db.session.add_all([User(username=f'bench{i}', email=f'bench{i}@example.com', nickname=f'벤치{i}',
+                                 password_hash=password_hash) for i in range(n_users)])
+        db.session.commit()
+
+
+def run(concurrency, logins, n_users):
+    """동시 concurrency개 스레드로 logins번 로그인. (초당 로그인, 평균 ms, p95 ms, 실패 수)"""
+    latencies, failures = [], []
+    counter = iter(range(logins))
+    lock = threading.Lock()
+
+    def worker():
+        client = app_module.app.test_client()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            started = time.perf_counter()
+            response = client.post('/login', json={'username': f'bench{i % n_users}', 'password': PASSWORD})
+            elapsed = time.perf_counter() - started
+            with lock:
+                (latencies if response.status_code == 200 else failures).append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # login()의 디버그 출력 숨김
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+    mean = statistics.mean(latencies) * 1000 if latencies else 0
+    return len(latencies) / elapsed, mean, p95, len(failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='로그인 처리량 벤치마크')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=100, help='방식/스레드 수 조합마다 로그인 횟수')
+    parser.add_argument('--methods', default='pbkdf2:sha256:600000,scrypt')
+    parser.add_argument('--workers', default='0,4', help='비교할 PASSWORD_WORKERS 값 (쉼표로 구분)')
+    args = parser.parse_args()
+
+    with app_module.app.app_context():
+        db.create_all()
+
+    print(f'🔐 로그인 벤치마크 (사용자 {args.users}명, 동시 {args.concurrency}, {args.logins}번씩, CPU {os.cpu_count()}개)')
+    for method in args.methods.split(','):
+        seed_users(args.users, method)
+        for workers in (int(value) for value in args.workers.split(',')):
+            app_module.password_service = PasswordService(method, workers=workers, max_pending=args.concurrency)
+            rate, mean, p95, failures = run(args.concurrency, args.logins, args.users)
+            app_module.password_service.shutdown()
+            label = '요청 스레드' if workers == 0 else f'전용 {workers}개'
+            mark = '✅' if failures == 0 else '❌'
+            print(f'{mark} {method:<24} {label:<8} {rate:7.1f} 로그인/초  평균 {mean:7.1f}ms  p95 {p95:7.1f}ms'
+                  f'  실패 {failures}')
+
+    # 예전 방식 해시가 로그인하면서 새 방식으로 바뀌는지
+    old_method, new_method = 'pbkdf2:sha256:1000', 'scrypt'
+    seed_users(args.users, old_method)
+    app_module.password_service = PasswordService(new_method, workers=2, max_pending=args.concurrency)
+    run(args.concurrency, args.users, args.users)
+    with app_module.app.app_context():
+        schemes = {hash_scheme(user.password_hash) for user in User.query}
+    upgraded = schemes == {app_module.password_service.scheme}
+    print(f'{"✅" if upgraded else "❌"} {old_method} → {new_method} 다시 해시: 남은 방식 {sorted(schemes)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+주변 장소 검색 벤치마크 - R*Tree(geo.py) vs 위경도 범위 스캔
+
+사용법:
+    python bench_places.py                       # 장소 20만 개, 쿼리 500번
+    python bench_places.py --places 500000 --queries 1000 --radius 3000
+
+임시 DB 파일에 전국(위도 33~38.5, 경도 126~129.5)에 흩어진 가상 장소를 만들고,
+무작위 위치에서 반경 안의 장소를 가까운 순으로 20개 찾는 검색을 두 방식으로 반복합니다.
+    rtree: geo.nearby() - place_rtree로 후보를 고른 뒤 거리 계산
+    scan : 같은 조건을 place 테이블 latitude/longitude 범위로만 거름 (인덱스 없음)
+두 방식의 결과가 같은지 확인하고 평균/p95 지연 시간을 출력합니다.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import text
+
+CATEGORIES = ('병원', '카페', '공원', '펜션', '용품점')
+
+
+def seed(conn, n_places, rng):
+    conn.execute(text(
+        'INSERT INTO place (name, address, category, latitude, longitude, pet_friendly) '
+        'VALUES (:name, :address, :category, :latitude, :longitude, :pet_friendly)'
+    ), [{
+        'name': f'장소 {i}', 'address': f'가상 주소 {i}', 'category': rng.choice(CATEGORIES),
+        'latitude': rng.uniform(33.0, 38.5), 'longitude': rng.uniform(126.0, 129.5),
+        'pet_friendly': rng.random() < 0.8,
+    } for i in range(n_places)])
+
+
+def timed(func, points):
+    latencies, results = [], []
+    for lat, lng, category in points:
+        started = time.perf_counter()
+        found = func(lat, lng, category)
+        latencies.append(time.perf_counter() - started)
+        results.append([place.id for place, _ in found])
+    latencies.sort()
+    return statistics.mean(latencies) * 1000, latencies[int(len(latencies) * 0.95)] * 1000, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='주변 장소 검색 벤치마크')
+    parser.add_argument('--places', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--radius', type=float, default=2000, help='검색 반경 (미터)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='petcare-bench-')
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp_dir, "bench.db")}'
+    try:
+        from app import app
+        from models import db
+        import geo
+
+        rng = random.Random(args.seed)
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            with db.engine.begin() as conn:
+                seed(conn, args.places, rng)
+            seeded = time.perf_counter() - started
+            started = time.perf_counter()
+            with db.engine.begin() as conn:
+                geo.create_index(conn)
+            indexed = time.perf_counter() - started
+            print(f'🧪 장소 {args.places:,}개 생성 {seeded:.1f}초, R*Tree 색인 {indexed:.1f}초')
+            print(f'   반경 {args.radius:g}m, 쿼리 {args.queries}번 (절반은 카테고리 필터)\n')
+
+            points = [(rng.uniform(33.5, 38.0), rng.uniform(126.5, 129.0),
+                       rng.choice(CATEGORIES) if i % 2 else None) for i in range(args.queries)]
+            url = str(db.engine.url)
+
+            def with_rtree(lat, lng, category):
+                geo._ready[url] = True
+                return geo.nearby(lat, lng, args.radius, category=category)
+
+            def with_scan(lat, lng, category):
+                geo._ready[url] = False
+                return geo.nearby(lat, lng, args.radius, category=category)
+
+            print(f'{"방식":<6} {"평균":>9} {"p95":>9}')
+            summary = {}
+            for name, func in (('scan', with_scan), ('rtree', with_rtree)):
+                mean, p95, results = timed(func, points)
+                summary[name] = (mean, results)
+                print(f'{name:<6} {mean:>7.2f}ms {p95:>7.2f}ms')
+            geo._ready.pop(url, None)
+
+        same = summary['scan'][1] == summary['rtree'][1]
+        found = sum(len(ids) for ids in summary['rtree'][1]) / len(points)
+        print(f'\n검색당 평균 {found:.1f}개, 속도 {summary["scan"][0] / summary["rtree"][0]:.0f}배')
+        print('✅ 두 방식의 결과가 같습니다.' if same else '❌ 두 방식의 결과가 다릅니다.')
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
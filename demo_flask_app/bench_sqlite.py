@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+SQLite 동시 읽기/쓰기 벤치마크 - 엔진 프로필(db_profile.py) 전후 비교
+
+사용법:
+    python bench_sqlite.py                          # default / tuned 프로필 비교
+    python bench_sqlite.py --seconds 10 --readers 16 --writers 8
+
+프로필마다 임시 DB 파일을 만들어 게시글을 채운 뒤, 여러 스레드가 동시에
+    읽기: 최신 게시글 피드 20개 조회
+    쓰기: 대화 기록 1건 추가 + 게시글 좋아요 원자적 증가 (한 트랜잭션)
+를 반복하고 초당 처리량, p95 지연 시간, "database is locked" 오류 수를 출력합니다.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from db_profile import PROFILES, apply_pragmas, engine_options, profile_settings
+from models import db
+
+users = db.metadata.tables['user']
+pets = db.metadata.tables['pet']
+posts = db.metadata.tables['community_post']
+chat_logs = db.metadata.tables['chat_log']
+
+
+def make_engine(path, profile):
+    uri = f'sqlite:///{path}'
+    settings = profile_settings(profile)
+    engine = create_engine(uri, **engine_options(uri, settings))
+    apply_pragmas(engine, settings)
+    return engine
+
+
+def seed(engine, n_posts=2000):
+    db.metadata.create_all(engine)
+    base = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(users), [
+            {'username': f'user{i}', 'email': f'user{i}@petcare.com', 'nickname': f'사용자{i}',
+             'password_hash': '-', 'created_at': base} for i in range(50)])
+        conn.execute(insert(pets), [
+            {'name': f'멍멍이{i}', 'species': '강아지', 'user_id': i + 1, 'created_at': base}
+            for i in range(50)])
+        conn.execute(insert(posts), [
+            {'title': f'게시글 {i}', 'content': '산책 꿀팁 공유합니다. ' * 20, 'tag': '꿀팁',
+             'likes': 0, 'views': 0, 'comment_count': 0, 'user_id': i % 50 + 1,
+             'created_at': base + timedelta(minutes=i)} for i in range(n_posts)])
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.locked = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def fail(self):
+        with self.lock:
+            self.locked += 1
+
+    def summary(self, seconds):
+        latencies = sorted(self.latencies)
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+        return len(latencies) / seconds, p95, self.locked
+
+
+def reader(engine, stats, stop):
+    query = select(posts.c.id, posts.c.title, posts.c.likes).order_by(posts.c.created_at.desc()).limit(20)
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(query).fetchall()
+            stats.record(time.perf_counter() - started)
+        except OperationalError:
+            stats.fail()
+
+
+def writer(engine, stats, stop, n_posts):
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(chat_logs).values(
+                    user_message='산책 갈래?', ai_response='멍멍! 좋아!',
+                    pet_id=random.randint(1, 50), created_at=datetime.utcnow()))
+                post_id = random.randint(1, n_posts)
+                conn.execute(update(posts).where(posts.c.id == post_id).values(likes=posts.c.likes + 1))
+            stats.record(time.perf_counter() - started)
+        except OperationalError:
+            stats.fail()
+
+
+def run(profile, seconds, n_readers, n_writers, n_posts=2000):
+    tmp_dir = tempfile.mkdtemp(prefix='petcare-bench-')
+    try:
+        engine = make_engine(os.path.join(tmp_dir, 'bench.db'), profile)
+        seed(engine, n_posts)
+
+        reads, writes = Stats(), Stats()
+        stop = threading.Event()
+        threads = [threading.Thread(target=reader, args=(engine, reads, stop)) for _ in range(n_readers)]
+        threads += [threading.Thread(target=writer, args=(engine, writes, stop, n_posts)) for _ in range(n_writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        with engine.connect() as conn:
+            journal_mode = conn.exec_driver_sql('PRAGMA journal_mode').scalar()
+        engine.dispose()
+        return reads.summary(seconds), writes.summary(seconds), journal_mode
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite 엔진 프로필 동시성 벤치마크')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--profile', choices=PROFILES, action='append',
+                        help='측정할 프로필 (여러 번 지정 가능, 기본: 전부)')
+    args = parser.parse_args()
+
+    print(f'🧪 읽기 스레드 {args.readers}개, 쓰기 스레드 {args.writers}개, 프로필마다 {args.seconds:g}초\n')
+    print(f'{"프로필":<8} {"저널":<6} {"읽기/s":>9} {"읽기 p95":>10} {"쓰기/s":>9} {"쓰기 p95":>10} {"잠금 오류":>8}')
+    for profile in args.profile or PROFILES[::-1]:
+        (read_rate, read_p95, read_locked), (write_rate, write_p95, write_locked), journal = run(
+            profile, args.seconds, args.readers, args.writers)
+        print(f'{profile:<8} {journal:<6} {read_rate:>9.0f} {read_p95:>8.1f}ms '
+              f'{write_rate:>9.0f} {write_p95:>8.1f}ms {read_locked + write_locked:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+캐시 저장소 백엔드
+
+기본은 프로세스 안의 LRU(+선택적 TTL) 캐시이고, 여러 워커가 같은 캐시를
+공유해야 하면 redis:// URL을 지정해 Redis 백엔드를 사용합니다.
+두 백엔드 모두 JSON으로 직렬화할 수 있는 값만 저장합니다.
+
+    backend = make_backend(os.getenv('PERSONA_CACHE_URL'), prefix='persona', maxsize=1024)
+    backend.set('1', {...})
+    backend.get('1')
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCacheBackend:
+    """스레드 안전한 프로세스 내 LRU 캐시. ttl(초)을 주면 오래된 항목은 없는 것으로 취급"""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCacheBackend:
+    """여러 워커가 공유하는 Redis 캐시 (redis 패키지 필요)"""
+
+    def __init__(self, url, prefix='petcare', ttl=None):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('Redis 캐시를 사용하려면 pip install redis 가 필요합니다.') from e
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def get(self, key):
+        raw = self._client.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self._client.set(self._key(key), json.dumps(value, ensure_ascii=False), ex=ttl or None)
+
+    def delete(self, key):
+        self._client.delete(self._key(key))
+
+    def clear(self):
+        for key in self._client.scan_iter(f'{self.prefix}:*'):
+            self._client.delete(key)
+
+    def __len__(self):
+        return sum(1 for _ in self._client.scan_iter(f'{self.prefix}:*'))
+
+
+def make_backend(url=None, prefix='petcare', maxsize=1024, ttl=None):
+    """url이 redis:// 로 시작하면 Redis, 아니면 프로세스 내 LRU 백엔드"""
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisCacheBackend(url, prefix=prefix, ttl=ttl)
+    return LRUCacheBackend(maxsize=maxsize, ttl=ttl)
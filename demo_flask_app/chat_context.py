@@ -0,0 +1,208 @@
+"""
+반려동물 챗봇 대화 맥락 구성
+
+최근 ChatLog를 (pet_id, created_at) 인덱스로 가져와 토큰 예산 안에 들어가는
+만큼만 대화 기록으로 보내고, 예산을 넘는 오래된 대화는 ChatSummary의 누적
+요약으로 접어 넣습니다. 대화가 길어져도 메시지당 보내는 맥락 크기는 예산을
+넘지 않습니다.
+
+메시지 순서:
+    [페르소나 시스템 프롬프트] [이전 대화 요약] [최근 대화 ...] [이번 메시지]
+페르소나 프롬프트를 맨 앞에 고정해서 프롬프트 캐싱용 접두어를 유지합니다.
+
+app을 주면 요약(LLM 호출)은 요청 밖의 스레드에서 만들고, 그동안 메시지는 이전
+요약 + 예산 안의 최근 대화로 보냅니다. 요약을 만들다 실패하거나 같은 반려동물의
+첫 요약을 두 요청이 동시에 만들어도(pet_id 유니크) 채팅 요청은 실패하지 않고
+이전 요약을 그대로 씁니다.
+"""
+
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+
+from instrumentation import registry
+from models import db, ChatLog, ChatSummary
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding('cl100k_base')
+except Exception:  # tiktoken이 없으면 근사치 사용
+    _encoding = None
+
+ChatContext = namedtuple('ChatContext', ['messages', 'context_tokens', 'full_history_tokens'])
+
+context_tokens_total = registry.counter(
+    'petcare_chat_context_tokens_total', '대화 맥락(요약+최근 대화)으로 보낸 토큰 수')
+saved_tokens_total = registry.counter(
+    'petcare_chat_context_saved_tokens_total', '전체 대화 기록 대신 요약을 보내서 아낀 토큰 수')
+summary_folds_total = registry.counter(
+    'petcare_chat_summary_folds_total', '오래된 대화를 요약으로 접은 횟수')
+summary_fold_errors_total = registry.counter(
+    'petcare_chat_summary_fold_errors_total', '요약으로 접다가 실패해서 이전 요약을 그대로 쓴 횟수')
+
+
+def estimate_tokens(text):
+    """토큰 수 추정. tiktoken이 있으면 정확히, 없으면 UTF-8 바이트 수 기반 근사치"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    # 한글은 글자당 1토큰 안팎, 영문은 4글자당 1토큰 안팎
+    return len(text.encode('utf-8')) // 3 + 1
+
+
+def _turn_tokens(log):
+    return estimate_tokens(log.user_message) + estimate_tokens(log.ai_response) + 8
+
+
+def _partition(recent, budget, limit):
+    """최신순 대화 목록을 예산/개수 안에 드는 앞부분과 나머지로 나눔"""
+    kept = []
+    for log in recent:
+        cost = _turn_tokens(log)
+        if len(kept) >= limit or cost > budget:
+            break
+        kept.append(log)
+        budget -= cost
+    return kept, recent[len(kept):]
+
+
+def extractive_summary(previous, turns, limit=600):
+    """LLM 없이 쓰는 요약: 이전 요약 뒤에 대화 앞부분을 이어 붙이고 길이를 자름"""
+    lines = [previous] if previous else []
+    for log in turns:
+        lines.append(f'주인: {log.user_message[:80]} / 나: {log.ai_response[:80]}')
+    text = '\n'.join(lines)
+    return text[-limit:]
+
+
+class ContextBuilder:
+    """
+    budget_tokens: 요약 + 최근 대화에 쓸 최대 토큰 수
+    window: 한 번에 읽어오는 최근 대화 수
+    summarize(previous_summary, turns) -> 새 요약 문자열
+    app: 주면 요약을 백그라운드 스레드에서 만듦 (없으면 요청 안에서 바로)
+    """
+
+    def __init__(self, budget_tokens=1000, window=20, summarize=None, app=None):
+        self.budget_tokens = budget_tokens
+        self.window = window
+        self.summarize = summarize or extractive_summary
+        self.app = app
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat-summary') if app else None
+        self._folding = set()  # 요약을 만드는 중인 pet_id
+        self._folding_lock = threading.Lock()
+
+    def build(self, persona, message):
+        summary = ChatSummary.query.filter_by(pet_id=persona.pet_id).first()
+        since_id = summary.summarized_until_id if summary else 0
+
+        # 아직 요약되지 않은 최근 대화만 최신순으로 (창 크기를 넘는지 보려고 1개 더)
+        recent = (
+            ChatLog.query
+            .filter(ChatLog.pet_id == persona.pet_id, ChatLog.id > since_id)
+            .order_by(ChatLog.created_at.desc(), ChatLog.id.desc())
+            .limit(self.window + 1)
+            .all()
+        )
+
+        # 요약이 예산의 절반 이상을 차지하지 않도록 나머지를 최근 대화에 배정
+        summary_text = summary.summary if summary else ''
+        remaining = self.budget_tokens - min(estimate_tokens(summary_text), self.budget_tokens // 2)
+        kept, overflow = _partition(recent, remaining, self.window)
+
+        if overflow:
+            # 한 번 접을 때 절반까지 넉넉히 접어서 매 메시지마다 요약 호출이 생기지 않게 함
+            fold_kept, fold_overflow = _partition(recent, remaining // 2, self.window // 2)
+            turns = list(reversed(fold_overflow))
+            if self._executor is not None:
+                self._fold_later(persona.pet_id, [log.id for log in turns])
+            else:
+                folded = self._fold_safely(persona.pet_id, turns)
+                if folded is not None:
+                    summary, kept = folded, fold_kept
+                    summary_text = summary.summary
+
+        kept.reverse()
+        history = []
+        if summary_text:
+            history.append({"role": "system", "content": f"지금까지 주인과 나눈 대화 요약:\n{summary_text}"})
+        for log in kept:
+            history.append({"role": "user", "content": log.user_message})
+            history.append({"role": "assistant", "content": log.ai_response})
+
+        context_tokens = estimate_tokens(summary_text) + sum(_turn_tokens(log) for log in kept)
+        full_tokens = (summary.folded_tokens if summary else 0) + sum(_turn_tokens(log) for log in kept)
+        context_tokens_total.inc(context_tokens)
+        saved_tokens_total.inc(max(full_tokens - context_tokens, 0))
+
+        messages = [{"role": "system", "content": persona.prompt}]
+        messages.extend(history)
+        messages.append({"role": "user", "content": message})
+        return ChatContext(messages, context_tokens, full_tokens)
+
+    def _fold_later(self, pet_id, turn_ids):
+        with self._folding_lock:
+            if pet_id in self._folding:
+                return
+            self._folding.add(pet_id)
+        self._executor.submit(self._fold_in_background, pet_id, turn_ids)
+
+    def _fold_in_background(self, pet_id, turn_ids):
+        try:
+            with self.app.app_context():
+                turns = ChatLog.query.filter(ChatLog.id.in_(turn_ids)).order_by(ChatLog.id).all()
+                if turns:
+                    self._fold_safely(pet_id, turns)
+        finally:
+            with self._folding_lock:
+                self._folding.discard(pet_id)
+
+    def _fold_safely(self, pet_id, turns):
+        """_fold와 같지만 실패하면 None (이전 요약을 그대로 씀)"""
+        try:
+            return self._fold(pet_id, turns)
+        except Exception:
+            db.session.rollback()
+            summary_fold_errors_total.inc()
+            return None
+
+    def _fold(self, pet_id, turns, retries=1):
+        """예산을 넘은 오래된 대화(오래된 순)를 누적 요약에 합침"""
+        summary = ChatSummary.query.filter_by(pet_id=pet_id).first()
+        if summary is not None:
+            # 다른 요청이 그사이 먼저 접은 대화는 빼고
+            turns = [log for log in turns if log.id > summary.summarized_until_id]
+            if not turns:
+                return summary
+
+        previous = summary.summary if summary else ''
+        try:
+            text = self.summarize(previous, turns)
+        except Exception:
+            text = extractive_summary(previous, turns)
+        # 요약이 예산의 절반을 넘으면 오래된 앞부분부터 잘라냄
+        while estimate_tokens(text) > self.budget_tokens // 2:
+            text = text[max(len(text) // 10, 1):]
+
+        try:
+            # 첫 요약을 다른 요청이 먼저 만들면 유니크 제약 위반이므로 세이브포인트만 되돌림
+            with db.session.begin_nested():
+                if summary is None:
+                    summary = ChatSummary(pet_id=pet_id, summary='', summarized_until_id=0,
+                                          folded_turns=0, folded_tokens=0)
+                    db.session.add(summary)
+                summary.summary = text
+                summary.summarized_until_id = max(log.id for log in turns)
+                summary.folded_turns += len(turns)
+                summary.folded_tokens += sum(_turn_tokens(log) for log in turns)
+        except IntegrityError:
+            if retries <= 0:
+                raise
+            # 먼저 만들어진 요약 위에 다시 접음 (이미 접힌 대화는 건너뜀)
+            return self._fold(pet_id, turns, retries - 1)
+        db.session.commit()
+        summary_folds_total.inc()
+        return summary
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+좋아요 카운터 일관성 점검 스크립트
+
+사용법:
+    python check_likes.py
+
+임시 SQLite DB에서 좋아요/취소를 반복해 likes 컬럼이 좋아요 행 수와 같은지 확인하고,
+좋아요 행 INSERT와 카운터 UPDATE가 한 트랜잭션인지 확인합니다.
+카운터 UPDATE를 일부러 실패시켰을 때 좋아요 행도 함께 되돌려지지 않으면
+(세이브포인트 RELEASE가 좋아요 행만 먼저 커밋하는 등) 실패합니다.
+"""
+
+import os
+import sys
+import tempfile
+
+# app을 import하기 전에 임시 DB 경로 지정
+_tmp_dir = tempfile.mkdtemp(prefix='petcare-check-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'check.db')}"
+
+from sqlalchemy import event
+
+import counters
+from app import app
+from counters import LIKE_TARGETS, set_like, toggle_like
+from models import db, User, Pet, Diary, CommunityPost, Comment
+
+
+def seed():
+    """사용자 3명과 좋아요 대상(일기, 게시글, 댓글) 하나씩. 종류 -> 대상 id"""
+    db.drop_all()
+    db.create_all()
+    users = [User(username=f'user{i}', email=f'user{i}@petcare.com', nickname=f'사용자{i}', password_hash='-')
+             for i in range(3)]
+    db.session.add_all(users)
+    db.session.flush()
+    pet = Pet(name='멍멍이', species='강아지', user_id=users[0].id)
+    db.session.add(pet)
+    db.session.flush()
+    diary = Diary(title='일기', content='산책', pet_id=pet.id, is_public=True)
+    post = CommunityPost(title='게시글', content='꿀팁', user_id=users[0].id)
+    db.session.add_all([diary, post])
+    db.session.flush()
+    comment = Comment(content='댓글', post_id=post.id, user_id=users[1].id)
+    db.session.add(comment)
+    db.session.commit()
+    return [user.id for user in users], {'diary': diary.id, 'post': post.id, 'comment': comment.id}
+
+
+def counts(kind, target_id):
+    """(likes 컬럼, 좋아요 행 수)"""
+    model, like_model, column = LIKE_TARGETS[kind]
+    db.session.expire_all()
+    rows = like_model.query.filter(getattr(like_model, column) == target_id).count()
+    return db.session.get(model, target_id).likes or 0, rows
+
+
+def check_consistency(user_ids, targets):
+    ok = True
+    for kind, target_id in targets.items():
+        for user_id in user_ids:
+            set_like(kind, target_id, user_id, True)
+            set_like(kind, target_id, user_id, True)  # 두 번 눌러도 한 번
+        set_like(kind, target_id, user_ids[0], False)
+        set_like(kind, target_id, user_ids[0], False)
+        toggle_like(kind, target_id, user_ids[1])
+        likes, rows = counts(kind, target_id)
+        passed = likes == rows == len(user_ids) - 2
+        ok &= passed
+        print(f"{'✅' if passed else '❌'} {kind:<8} 좋아요/취소 반복 후 likes={likes}, 좋아요 행={rows}")
+    return ok
+
+
+def check_atomic(user_ids, targets):
+    """카운터 UPDATE가 실패하면 좋아요 행도 남지 않아야 함"""
+    ok = True
+    bump_likes = counters._bump_likes
+
+    def failing_bump(model, target_id, delta):
+        raise RuntimeError('카운터 갱신 실패 (점검용)')
+
+    counters._bump_likes = failing_bump
+    try:
+        for kind, target_id in targets.items():
+            before = counts(kind, target_id)
+            try:
+                set_like(kind, target_id, user_ids[0], True)
+            except RuntimeError:
+                pass
+            after = counts(kind, target_id)
+            passed = after == before
+            ok &= passed
+            print(f"{'✅' if passed else '❌'} {kind:<8} 카운터 갱신 실패 시 (likes, 좋아요 행) {before} -> {after}")
+    finally:
+        counters._bump_likes = bump_likes
+    return ok
+
+
+def check_statements(user_id, target_id):
+    """좋아요 한 번의 SQL이 하나의 트랜잭션 안에서 실행되는지 (SAVEPOINT/RELEASE 없음)"""
+    statements = []
+
+    def on_execute(conn, cursor, statement, *args):
+        statements.append(statement.split(None, 1)[0].upper())
+
+    event.listen(db.engine, 'before_cursor_execute', on_execute)
+    try:
+        set_like('diary', target_id, user_id, True)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', on_execute)
+    passed = 'SAVEPOINT' not in statements and 'RELEASE' not in statements
+    print(f"{'✅' if passed else '❌'} 좋아요 한 번의 SQL: {' '.join(statements)}")
+    return passed
+
+
+def main():
+    with app.app_context():
+        user_ids, targets = seed()
+        ok = check_consistency(user_ids, targets)
+        ok &= check_atomic(user_ids, targets)
+        ok &= check_statements(user_ids[0], targets['diary'])
+
+    if not ok:
+        print('\n❌ 좋아요 수와 좋아요 행이 어긋날 수 있습니다.')
+        sys.exit(1)
+    print('\n✅ 좋아요 행과 카운터가 항상 함께 바뀝니다.')
+
+
+if __name__ == '__main__':
+    main()
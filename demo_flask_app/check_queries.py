@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+피드 페이지 쿼리 수 / 실행 계획 점검 스크립트
+
+사용법:
+    python check_queries.py
+
+임시 SQLite DB에 게시글/일기 수를 바꿔가며 샘플 데이터를 넣고,
+각 피드 페이지가 실행하는 SQL 문 수가 데이터 양과 무관하게 일정한지 확인합니다.
+(게시글마다 작성자/댓글을 따로 조회하는 N+1 문제가 다시 생기면 실패합니다.)
+
+이어서 자주 실행되는 조회마다 EXPLAIN QUERY PLAN을 확인해서 인덱스 없이
+테이블 전체를 훑거나(SCAN 테이블) 정렬용 임시 B-트리를 만들면 실패합니다.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# app을 import하기 전에 임시 DB 경로 지정
+_tmp_dir = tempfile.mkdtemp(prefix='petcare-check-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'check.db')}"
+
+from sqlalchemy import event
+
+from app import app, rankings
+from models import db, User, Pet, Diary, CommunityPost, Comment, HealthRecord, CareRoutine, ChatLog, Place, PlaceReview
+from comments import add_comment
+from reviews import add_review
+from pagination import _sort_columns, feed_query
+from diary_jobs import claimable_jobs
+import geo
+import search
+
+# 페이지별로 허용하는 최대 SQL 문 수
+QUERY_BUDGETS = {
+    '/': 0,  # 인기 순위는 메모리의 순위표에서
+    '/community': 1,
+    '/community?sort=comments': 1,
+    '/api/community/posts': 1,
+    '/api/community/posts/1/comments': 2,  # 게시글 확인 + 댓글 스레드 전체
+    '/api/search?q=산책&type=post': 2,  # 전문 검색 색인 + 게시글
+    '/api/places/nearby?lat=37.5&lng=127': 2,  # R*Tree 후보 + 장소
+    '/api/places?category=카페': 1,
+    '/api/places/1/reviews': 2,  # 장소(평점 집계) + 리뷰
+}
+
+
+
+def hot_queries():
+    """(이름, 쿼리) - 인덱스를 타야 하는 자주 쓰는 조회
+
+    이름이 *로 끝나는 조회는 결과가 적어 정렬용 임시 B-트리를 허용합니다.
+    """
+    queries = [
+        ('내 반려동물 목록', Pet.query.filter_by(user_id=1)),
+        ('반려동물 일기 목록', Diary.query.filter_by(pet_id=1).order_by(Diary.created_at.desc())),
+        ('인기 일기', Diary.query.filter(Diary.is_public == True)
+            .order_by(Diary.likes.desc(), Diary.created_at.desc(), Diary.id.desc()).limit(21)),
+        ('인기 게시글', CommunityPost.query
+            .order_by(CommunityPost.likes.desc(), CommunityPost.created_at.desc(), CommunityPost.id.desc()).limit(21)),
+        ('건강 기록', HealthRecord.query.filter_by(pet_id=1).order_by(HealthRecord.created_at.desc())),
+        ('케어 루틴', CareRoutine.query.filter_by(pet_id=1)),
+        ('최근 대화', ChatLog.query.filter(ChatLog.pet_id == 1, ChatLog.id > 0)
+            .order_by(ChatLog.created_at.desc(), ChatLog.id.desc()).limit(21)),
+        ('게시글 댓글', Comment.query.filter(Comment.post_id == 1, Comment.parent_id.is_(None))),
+        ('대댓글', Comment.query.filter(Comment.parent_id.in_([1, 2, 3]))),
+        ('가져갈 일기 작업*', claimable_jobs(datetime.utcnow(), 120).limit(16)),
+        ('평점순 장소', Place.query.order_by(Place.rating_avg.desc(), Place.review_count.desc()).limit(20)),
+        ('카테고리 평점순', Place.query.filter(Place.category == '카페')
+            .order_by(Place.rating_avg.desc(), Place.review_count.desc()).limit(20)),
+        ('장소 리뷰', PlaceReview.query.filter(PlaceReview.place_id == 1)
+            .order_by(PlaceReview.created_at.desc(), PlaceReview.id.desc()).limit(20)),
+        ('태그 피드', feed_query(tag='꿀팁').order_by(CommunityPost.created_at.desc(), CommunityPost.id.desc()).limit(21)),
+    ]
+    for sort in ('latest', 'popular', 'comments', 'views'):
+        columns = _sort_columns(sort)
+        queries.append((f'피드 ({sort})', feed_query().order_by(*[c.desc() for c in columns]).limit(21)))
+    return queries
+
+
+def explain(query):
+    """EXPLAIN QUERY PLAN 결과의 detail 목록"""
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}').fetchall()
+    return [row[-1] for row in rows]
+
+
+def plan_problems(details, allow_sort=False):
+    """전체 테이블 스캔 또는 정렬용 임시 B-트리"""
+    return [detail for detail in details
+            if (detail.startswith('SCAN ') and ' USING ' not in detail)
+            or ('TEMP B-TREE' in detail and not allow_sort)]
+
+
+def check_plans():
+    failed = False
+    with app.app_context():
+        for name, query in hot_queries():
+            details = explain(query)
+            problems = plan_problems(details, allow_sort=name.endswith('*'))
+            failed |= bool(problems)
+            mark = '❌' if problems else '✅'
+            print(f'{mark} {name:<16} {" / ".join(problems or details)}')
+    return not failed
+
+
+class QueryCounter:
+    """엔진에서 실행되는 SQL 문 수를 센다"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def seed(n):
+    """사용자/반려동물/일기/게시글/댓글을 n개 단위로 생성"""
+    db.drop_all()
+    db.create_all()
+    with db.engine.begin() as conn:
+        search.create_index(conn)
+        geo.create_index(conn)
+
+    base = datetime(2024, 1, 1)
+    for i in range(n):
+        user = User(username=f'user{i:04d}', email=f'user{i}@petcare.com',
+                    nickname=f'사용자{i}', password_hash='-')
+        db.session.add(user)
+        db.session.flush()
+
+        pet = Pet(name=f'멍멍이{i}', species='강아지', user_id=user.id)
+        db.session.add(pet)
+        db.session.flush()
+
+        db.session.add(Diary(title=f'일기 {i}', content='오늘은 산책을 했어요.', pet_id=pet.id,
+                             is_public=True, likes=i, created_at=base + timedelta(hours=i)))
+        db.session.add(CommunityPost(title=f'게시글 {i}', content='산책 꿀팁 공유합니다.', tag='꿀팁',
+                                     user_id=user.id, likes=i, created_at=base + timedelta(hours=i)))
+        db.session.add(Place(name=f'애견카페 {i}', address=f'서울시 {i}번지', category='카페',
+                             latitude=37.5 + i * 0.0005, longitude=127.0 + i * 0.0005))
+    db.session.commit()
+
+    for place in Place.query.all():
+        for j in range(place.id % 3):
+            add_review(place, j + 1, j % 5 + 1, f'리뷰 {j}')
+
+    for post in CommunityPost.query.all():
+        for j in range(post.id % 3):
+            add_comment(post, post.user_id, f'댓글 {j}')
+
+    # 첫 게시글에는 n단계 깊이의 대댓글과 최상위 댓글 n개
+    first = db.session.get(CommunityPost, 1)
+    parent = Comment.query.filter_by(post_id=1).first()
+    for j in range(n):
+        parent = add_comment(first, first.user_id, f'대댓글 {j}', parent_id=parent.id)
+        add_comment(first, first.user_id, f'최상위 댓글 {j}')
+
+
+def measure(client, url):
+    with app.app_context():
+        db.session.remove()
+        with QueryCounter(db.engine) as counter:
+            response = client.get(url)
+    assert response.status_code == 200, f'{url} -> {response.status_code}'
+    return counter.count
+
+
+def main():
+    client = app.test_client()
+    results = {}
+
+    for n in (5, 40):
+        with app.app_context():
+            seed(n)
+        rankings.refresh()
+        results[n] = {url: measure(client, url) for url in QUERY_BUDGETS}
+
+    failed = False
+    for url, budget in QUERY_BUDGETS.items():
+        small, large = results[5][url], results[40][url]
+        ok = small == large and large <= budget
+        failed |= not ok
+        mark = '✅' if ok else '❌'
+        print(f'{mark} {url:<34} 게시글 5개: {small}개 쿼리, 40개: {large}개 쿼리 (허용 {budget}개)')
+
+    if failed:
+        print('\n❌ 데이터 양에 따라 쿼리 수가 늘어나는 페이지가 있습니다.')
+        sys.exit(1)
+    print('\n✅ 모든 피드 페이지의 쿼리 수가 일정합니다.\n')
+
+    if not check_plans():
+        print('\n❌ 인덱스를 타지 않는 조회가 있습니다. models.py와 migrations.py에 인덱스를 추가하세요.')
+        sys.exit(1)
+    print('\n✅ 자주 쓰는 조회가 모두 인덱스를 사용합니다.')
+
+
+if __name__ == '__main__':
+    main()
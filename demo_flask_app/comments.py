@@ -0,0 +1,157 @@
+"""
+커뮤니티 댓글 작성/삭제/스레드 조회
+
+CommunityPost.comment_count는 피드에서 댓글 수를 보여주기 위해 비정규화한
+컬럼입니다. 댓글 행을 추가/삭제하는 것과 같은 트랜잭션 안에서 원자적인
+UPDATE로 함께 갱신해야 하므로, 댓글 쓰기는 반드시 이 모듈을 거칩니다.
+
+댓글 스레드는 Comment.replies를 따라 노드마다 지연 로딩하지 않고, 재귀 CTE
+한 번으로 최상위 댓글 한 페이지와 그 아래 대댓글 전체를 가져와 메모리에서
+트리로 조립합니다. 최상위 댓글은 (created_at, id) 커서로 페이지를 나눕니다.
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.orm import joinedload
+
+from models import db, CommunityPost, Comment, CommentLike
+from pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+
+# 트리 노드: 댓글과 그 대댓글 노드 목록 (comment.replies 대신 사용)
+CommentNode = namedtuple('CommentNode', ['comment', 'replies'])
+ThreadPage = namedtuple('ThreadPage', ['threads', 'next_cursor'])
+
+
+def _bump_comment_count(post_id, delta):
+    # 읽고-쓰기 대신 SQL 안에서 증감해서 동시 작성 시에도 값이 유실되지 않음
+    db.session.execute(
+        update(CommunityPost)
+        .where(CommunityPost.id == post_id)
+        .values(comment_count=CommunityPost.comment_count + delta)
+    )
+
+
+def add_comment(post, user_id, content, parent_id=None):
+    """댓글을 추가하고 게시글의 댓글 수를 1 증가시킨 뒤 커밋"""
+    if parent_id is not None:
+        parent = Comment.query.filter_by(id=parent_id, post_id=post.id).first()
+        if parent is None:
+            raise ValueError('부모 댓글이 이 게시글에 없습니다.')
+
+    comment = Comment(content=content, user_id=user_id, post_id=post.id, parent_id=parent_id)
+    try:
+        db.session.add(comment)
+        db.session.flush()
+        _bump_comment_count(post.id, 1)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return comment
+
+
+def _subtree_ids(comment_id):
+    """댓글과 그 아래 모든 대댓글의 id 목록 (재귀 CTE 한 번)"""
+    subtree = select(Comment.id).where(Comment.id == comment_id).cte('subtree', recursive=True)
+    subtree = subtree.union_all(
+        select(Comment.id).join(subtree, Comment.parent_id == subtree.c.id)
+    )
+    return [row.id for row in db.session.execute(select(subtree.c.id))]
+
+
+def delete_comment(comment):
+    """댓글과 대댓글을 삭제하고 삭제된 개수만큼 댓글 수를 줄인 뒤 커밋"""
+    post_id = comment.post_id
+    try:
+        ids = _subtree_ids(comment.id)
+        CommentLike.query.filter(CommentLike.comment_id.in_(ids)).delete(synchronize_session=False)
+        Comment.query.filter(Comment.id.in_(ids)).delete(synchronize_session=False)
+        _bump_comment_count(post_id, -len(ids))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire_all()
+    return len(ids)
+
+
+def load_thread(post_id, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    게시글의 최상위 댓글 limit개와 그 아래 모든 대댓글을 한 번의 쿼리로 가져와
+    ThreadPage(CommentNode 목록, 다음 페이지 커서)로 반환.
+    커서가 잘못되면 pagination.InvalidCursor
+    """
+    roots = select(
+        Comment.id,
+        func.row_number().over(order_by=(Comment.created_at, Comment.id)).label('rank')
+    ).where(Comment.post_id == post_id, Comment.parent_id.is_(None))
+    if cursor:
+        roots = roots.where(tuple_(Comment.created_at, Comment.id) > tuple_(*decode_cursor(cursor, 'latest')))
+    # 다음 페이지가 있는지 보려고 최상위 댓글은 1개 더 가져오되, 그 대댓글은 따라가지 않음
+    roots = roots.order_by(Comment.created_at, Comment.id).limit(limit + 1).subquery()
+
+    thread = select(roots.c.id, roots.c.rank).cte('thread', recursive=True)
+    thread = thread.union_all(
+        select(Comment.id, thread.c.rank)
+        .join(thread, Comment.parent_id == thread.c.id)
+        .where(thread.c.rank <= limit)
+    )
+
+    comments = (
+        db.session.execute(
+            select(Comment)
+            .join(thread, Comment.id == thread.c.id)
+            .options(joinedload(Comment.author))
+            .order_by(Comment.created_at, Comment.id)
+        )
+        .scalars()
+        .all()
+    )
+
+    nodes = {comment.id: CommentNode(comment, []) for comment in comments}
+    threads = []
+    for comment in comments:
+        if comment.parent_id is None:
+            threads.append(nodes[comment.id])
+        elif comment.parent_id in nodes:
+            nodes[comment.parent_id].replies.append(nodes[comment.id])
+
+    next_cursor = None
+    if len(threads) > limit:
+        threads = threads[:limit]
+        last = threads[-1].comment
+        next_cursor = encode_cursor([last.created_at, last.id])
+    return ThreadPage(threads, next_cursor)
+
+
+def serialize_thread(node):
+    """댓글 트리 노드의 JSON 표현 (대댓글 포함)"""
+    comment = node.comment
+    return {
+        'id': comment.id,
+        'content': comment.content,
+        'author': comment.author.nickname,
+        'user_id': comment.user_id,
+        'likes': comment.likes or 0,
+        'created_at': comment.created_at.isoformat(),
+        'replies': [serialize_thread(reply) for reply in node.replies],
+    }
+
+
+def recount_comment_counts():
+    """기존 데이터의 comment_count를 실제 댓글 수로 다시 맞춤 (백필/점검용)"""
+    counts = (
+        db.session.query(Comment.post_id, func.count(Comment.id))
+        .group_by(Comment.post_id)
+        .all()
+    )
+    db.session.execute(update(CommunityPost).values(comment_count=0))
+    for post_id, count in counts:
+        db.session.execute(
+            update(CommunityPost)
+            .where(CommunityPost.id == post_id)
+            .values(comment_count=count)
+        )
+    db.session.commit()
+    return len(counts)
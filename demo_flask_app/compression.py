@@ -0,0 +1,242 @@
+"""
+동적 응답 압축 WSGI 미들웨어 - Accept-Encoding에 따라 zstd/brotli/gzip
+
+커뮤니티 페이지(게시글 본문을 data 속성에 통째로 넣음)나 채팅/일기 JSON 응답이
+압축 없이 나가므로, app.wsgi_app을 감싸서 응답 본문을 압축합니다.
+
+- 클라이언트가 받는 방식(Accept-Encoding, q값 포함) 중 서버가 가진 것을
+  COMPRESSION_ENCODINGS 순서대로 고릅니다. brotli(pip install Brotli),
+  zstd(pip install zstandard)는 설치되어 있을 때만 쓰고 gzip은 항상 있습니다.
+  bench_compression.py 기준으로 같은 압축률에서 zstd 3이 brotli 4보다 CPU를 덜 써서
+  기본 순서는 zstd, br, gzip입니다.
+- Content-Type이 허용 목록(HTML, JSON, CSS/JS, SSE 등)에 있고 이미 인코딩되지 않은
+  2xx 응답만 압축합니다. 길이를 아는 응답은 COMPRESSION_MIN_SIZE 바이트보다
+  작으면 그대로 보냅니다 (압축 헤더/CPU 비용이 더 큼).
+- 길이를 아는 응답은 COMPRESSION_BUFFER_LIMIT 바이트 이하면 한 번에 압축해서
+  Content-Length를 다시 붙이고, 그보다 크면 조각별로 압축해 그대로 흘려보냅니다.
+- 길이를 모르는 스트리밍 응답(stream_with_context, SSE)은 조각마다 압축한 뒤
+  flush해서 보내므로 본문 전체를 모으지 않고, 토큰이 바로바로 브라우저에 도착합니다.
+- 압축하면 표현이 달라지므로 강한 ETag는 약한 ETag로 바꾸고,
+  압축 대상 응답에는 항상 Vary: Accept-Encoding을 붙입니다.
+"""
+
+import zlib
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+from werkzeug.wsgi import ClosingIterator
+
+from instrumentation import registry
+
+try:
+    import brotli
+except ImportError:  # pip install Brotli
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pip install zstandard
+    zstandard = None
+
+compressed_bytes = registry.counter(
+    'petcare_compression_bytes_total', '동적 압축 전후 바이트 수 (encoding, stage=in/out)')
+compression_skipped = registry.counter(
+    'petcare_compression_skipped_total', '압축하지 않은 응답 수 (reason)')
+
+DEFAULT_TYPES = (
+    'text/html', 'text/plain', 'text/css', 'text/javascript', 'text/xml', 'text/event-stream',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+)
+
+
+class GzipEncoder:
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip 헤더
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+# 인코딩 이름 -> (인코더, 기본 레벨). 동적 압축이라 최고 압축률보다 속도 쪽 레벨
+ENCODERS = {'gzip': (GzipEncoder, 6)}
+if brotli is not None:
+    ENCODERS['br'] = (BrotliEncoder, 4)
+if zstandard is not None:
+    ENCODERS['zstd'] = (ZstdEncoder, 3)
+
+
+def available_encodings(preferred=('zstd', 'br', 'gzip')):
+    """preferred 중 이 환경에서 쓸 수 있는 인코딩 (순서 유지)"""
+    return tuple(name for name in preferred if name in ENCODERS)
+
+
+def negotiate(accept_encoding, encodings):
+    """Accept-Encoding 헤더로 고른 인코딩. q값이 가장 높은 것, 같으면 encodings 순서"""
+    accepted = parse_accept_header(accept_encoding)
+    best, best_quality = None, 0
+    for name in encodings:
+        quality = accepted[name]
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compress(data, encoding, level=None):
+    """data를 한 번에 압축 (벤치마크, 테스트용)"""
+    encoder_class, default_level = ENCODERS[encoding]
+    encoder = encoder_class(default_level if level is None else level)
+    return encoder.compress(data) + encoder.finish()
+
+
+class CompressionMiddleware:
+    """
+    app: 감쌀 WSGI 앱 (보통 flask_app.wsgi_app)
+    min_size: 길이를 아는 응답은 이보다 작으면 압축하지 않음
+    buffer_limit: 길이를 아는 응답이 이 이하면 한 번에 압축해 Content-Length를 붙임
+    encodings: 선호 순서대로 쓸 인코딩, levels: 인코딩 -> 레벨 (없으면 ENCODERS 기본값)
+    types: 압축할 Content-Type (파라미터 제외)
+    """
+
+    def __init__(self, app, min_size=1024, buffer_limit=1024 * 1024, encodings=('zstd', 'br', 'gzip'),
+                 levels=None, types=DEFAULT_TYPES):
+        self.app = app
+        self.min_size = min_size
+        self.buffer_limit = buffer_limit
+        self.encodings = available_encodings(encodings)
+        self.levels = {name: (levels or {}).get(name, ENCODERS[name][1]) for name in self.encodings}
+        self.types = frozenset(types)
+
+    def _encoding_for(self, environ, status, headers):
+        """이 응답에 쓸 인코딩, 압축 대상이 아니면 None. headers에 Vary를 붙임"""
+        content_type = headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+        if content_type not in self.types:
+            return None
+        vary = headers.get('Vary', '')
+        if 'accept-encoding' not in vary.lower():
+            headers['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+
+        code = int(status.split(' ', 1)[0])
+        length = headers.get('Content-Length')
+        if code < 200 or code >= 300 or code in (204, 206) or environ.get('REQUEST_METHOD') == 'HEAD':
+            reason = 'status'
+        elif 'Content-Encoding' in headers or 'no-transform' in headers.get('Cache-Control', ''):
+            reason = 'encoded'
+        elif length is not None and int(length) < self.min_size:
+            reason = 'small'
+        else:
+            encoding = negotiate(environ.get('HTTP_ACCEPT_ENCODING'), self.encodings)
+            if encoding is not None:
+                return encoding
+            reason = 'not_accepted'
+        compression_skipped.inc(reason=reason)
+        return None
+
+    def __call__(self, environ, start_response):
+        captured = []
+        written = []
+
+        def capture(status, headers, exc_info=None):
+            if exc_info and captured:
+                raise exc_info[1].with_traceback(exc_info[2])
+            captured[:] = [status, Headers(headers), exc_info]
+            return written.append  # WSGI write() 호출은 본문 앞부분으로 모아둠
+
+        app_iter = self.app(environ, capture)
+        status, headers, exc_info = captured
+        encoding = self._encoding_for(environ, status, headers)
+        if encoding is None:
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return ClosingIterator(_chain(written, app_iter), _close_callback(app_iter)) if written else app_iter
+
+        encoder = ENCODERS[encoding][0](self.levels[encoding])
+        headers['Content-Encoding'] = encoding
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            headers['ETag'] = 'W/' + etag
+
+        length = headers.get('Content-Length')
+        if length is not None and int(length) <= self.buffer_limit:
+            # Flask가 이미 메모리에 만든 응답: 한 번에 압축하고 길이를 다시 계산
+            try:
+                data = b''.join(_chain(written, app_iter))
+            finally:
+                _close(app_iter)
+            body = encoder.compress(data) + encoder.finish()
+            compressed_bytes.inc(len(data), encoding=encoding, stage='in')
+            compressed_bytes.inc(len(body), encoding=encoding, stage='out')
+            headers['Content-Length'] = str(len(body))
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return [body]
+
+        headers.remove('Content-Length')
+        start_response(status, headers.to_wsgi_list(), exc_info)
+        return self._stream(encoder, encoding, written, app_iter, flush=length is None)
+
+    def _stream(self, encoder, encoding, written, app_iter, flush):
+        """조각마다 압축. flush면 조각마다 내보냄 (SSE 이벤트가 다음 조각을 기다리지 않도록)"""
+        size_in = size_out = 0
+        try:
+            for chunk in _chain(written, app_iter):
+                if not chunk:
+                    continue
+                out = encoder.compress(chunk) + (encoder.flush() if flush else b'')
+                size_in += len(chunk)
+                size_out += len(out)
+                if out:
+                    yield out
+            out = encoder.finish()
+            size_out += len(out)
+            yield out
+        finally:
+            _close(app_iter)
+            compressed_bytes.inc(size_in, encoding=encoding, stage='in')
+            compressed_bytes.inc(size_out, encoding=encoding, stage='out')
+
+
+def _chain(written, app_iter):
+    yield from written
+    yield from app_iter
+
+
+def _close_callback(app_iter):
+    return getattr(app_iter, 'close', None)
+
+
+def _close(app_iter):
+    close = _close_callback(app_iter)
+    if close is not None:
+        close()
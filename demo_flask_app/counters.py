@@ -0,0 +1,172 @@
+"""
+좋아요/조회수 카운터
+
+좋아요
+    DiaryLike / PostLike / CommentLike 행의 (user_id, 대상 id) 유니크 제약을
+    기준으로 좋아요 여부를 판단합니다. 행을 실제로 추가/삭제했을 때만 같은
+    트랜잭션에서 원자적인 UPDATE(likes = likes ± 1)로 카운터를 바꾸므로,
+    같은 요청이 두 번 오거나 여러 사용자가 동시에 눌러도 값이 어긋나지 않습니다.
+
+조회수
+    조회마다 CommunityPost 행을 UPDATE하면 인기 글 한 행에 쓰기가 몰리므로
+    ViewCounter가 메모리에 모았다가 flush_interval초 또는 flush_threshold건마다
+    한 번의 executemany로 반영합니다. 조회가 끊겨도 남은 조회수가 반영되도록
+    start()로 띄운 데몬 스레드(start_background_jobs()에서 프로세스마다 시작)가
+    flush_interval초마다 반영하고, 정상 종료 때도 반영합니다.
+    프로세스가 비정상 종료되면 반영 전 조회수는 사라질 수 있습니다(정확도보다
+    쓰기 부하를 우선).
+"""
+
+import atexit
+import os
+import threading
+import time
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Diary, DiaryLike, CommunityPost, PostLike, Comment, CommentLike
+
+# type -> (대상 모델, 좋아요 모델, 좋아요 모델의 대상 id 컬럼 이름)
+LIKE_TARGETS = {
+    'diary': (Diary, DiaryLike, 'diary_id'),
+    'post': (CommunityPost, PostLike, 'post_id'),
+    'comment': (Comment, CommentLike, 'comment_id'),
+}
+
+# 좋아요 수가 실제로 바뀌면 listener(kind, target_id, likes)를 호출 (순위표 갱신 등)
+like_listeners = []
+
+
+def _bump_likes(model, target_id, delta):
+    db.session.execute(
+        update(model)
+        .where(model.id == target_id)
+        .values(likes=model.likes + delta)
+    )
+
+
+def _current_likes(model, target_id):
+    return db.session.execute(select(model.likes).where(model.id == target_id)).scalar() or 0
+
+
+def set_like(kind, target_id, user_id, liked):
+    """
+    좋아요 상태를 liked로 맞추고 (liked, 현재 좋아요 수)를 반환한 뒤 커밋.
+    이미 그 상태면 아무것도 바꾸지 않음 (멱등)
+    """
+    model, like_model, column = LIKE_TARGETS[kind]
+    try:
+        if liked:
+            # 이미 좋아요한 상태면 유니크 제약에 걸려 아무것도 넣지 않음.
+            # 세이브포인트를 쓰면 pysqlite에서는 RELEASE가 좋아요 행만 먼저 커밋하므로
+            # 카운터 UPDATE와 같은 트랜잭션이 되도록 ON CONFLICT DO NOTHING 한 문장으로 처리
+            result = db.session.execute(
+                sqlite_insert(like_model)
+                .values(user_id=user_id, **{column: target_id})
+                .on_conflict_do_nothing()
+            )
+            changed = result.rowcount > 0
+        else:
+            result = db.session.execute(
+                delete(like_model)
+                .where(like_model.user_id == user_id, getattr(like_model, column) == target_id)
+            )
+            changed = result.rowcount > 0
+
+        if changed:
+            _bump_likes(model, target_id, 1 if liked else -1)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    likes = _current_likes(model, target_id)
+    if changed:
+        for listener in like_listeners:
+            listener(kind, target_id, likes)
+    return liked, likes
+
+
+def toggle_like(kind, target_id, user_id):
+    """좋아요 상태를 뒤집음 (동시에 두 번 눌려도 결과는 set_like와 같이 일관됨)"""
+    _, like_model, column = LIKE_TARGETS[kind]
+    exists = db.session.execute(
+        select(like_model.id)
+        .where(like_model.user_id == user_id, getattr(like_model, column) == target_id)
+    ).first() is not None
+    return set_like(kind, target_id, user_id, not exists)
+
+
+class ViewCounter:
+    """게시글 조회수를 메모리에 모았다가 묶어서 반영"""
+
+    def __init__(self, app, flush_interval=10.0, flush_threshold=500):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = {}  # post_id -> 아직 반영하지 않은 조회수
+        self._pending_total = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._started_pid = None
+        atexit.register(self.flush)
+
+    def start(self):
+        """flush_interval초마다 반영하는 데몬 스레드 시작 (프로세스마다 한 번)"""
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='view-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            # record()나 임계치로 방금 반영했으면 건너뜀
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def record(self, post_id):
+        with self._lock:
+            self._pending[post_id] = self._pending.get(post_id, 0) + 1
+            self._pending_total += 1
+            due = (self._pending_total >= self.flush_threshold or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def pending(self, post_id):
+        """아직 DB에 반영되지 않은 조회수 (화면에 보여줄 때 더함)"""
+        return self._pending.get(post_id, 0)
+
+    def flush(self):
+        """모아둔 조회수를 한 트랜잭션으로 반영하고 반영한 게시글 수를 반환"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._pending_total = 0
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        params = [{'post_id': post_id, 'delta': delta} for post_id, delta in pending.items()]
+        table = CommunityPost.__table__
+        # 요청 세션과 섞이지 않도록 별도 연결에서 실행.
+        # 조회수는 내용 변경이 아니므로 updated_at의 onupdate가 적용되지 않게 그대로 둠
+        # (page_cache.content_fingerprint가 조회수 반영마다 바뀌지 않도록)
+        try:
+            with self.app.app_context(), db.engine.begin() as conn:
+                conn.execute(
+                    update(table)
+                    .where(table.c.id == bindparam('post_id'))
+                    .values(views=table.c.views + bindparam('delta'), updated_at=table.c.updated_at),
+                    params
+                )
+        except Exception:
+            # 실패한 조회수는 다음 반영 때 다시 시도
+            with self._lock:
+                for post_id, delta in pending.items():
+                    self._pending[post_id] = self._pending.get(post_id, 0) + delta
+                    self._pending_total += delta
+            return 0
+        return len(pending)
@@ -0,0 +1,106 @@
+"""
+SQLite 엔진 프로필
+
+기본 설정의 SQLite는 롤백 저널 모드라서 쓰기가 커밋되는 동안 읽기도 막히고,
+동시에 쓰면 곧바로 "database is locked"가 나기 쉽습니다. SQLITE_PROFILE=tuned
+(기본값)이면 엔진을 만들 때 연결마다 아래 PRAGMA를 적용하고 연결 풀을 설정합니다.
+
+    journal_mode=WAL      읽기와 쓰기가 서로 막지 않음 (DB 파일에 유지됨)
+    synchronous=NORMAL    WAL에서는 체크포인트 때만 fsync (전원 장애 시 마지막 커밋만 잃을 수 있음)
+    busy_timeout          잠금이 풀릴 때까지 기다리는 시간 (SQLITE_BUSY_TIMEOUT_MS)
+    mmap_size             DB 파일을 메모리 맵으로 읽기 (SQLITE_MMAP_SIZE 바이트)
+    cache_size            연결당 페이지 캐시 (SQLITE_CACHE_SIZE_KB)
+    temp_store=MEMORY     정렬/임시 테이블을 메모리에
+
+SQLITE_PROFILE=default 이면 SQLAlchemy 기본 설정을 그대로 씁니다 (bench_sqlite.py 비교용).
+SQLite가 아닌 DATABASE_URL에는 아무것도 적용하지 않습니다.
+"""
+
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+PROFILES = ('tuned', 'default')
+
+
+def profile_settings(profile=None):
+    """프로필 이름과 PRAGMA/풀 설정 (환경변수로 값 조정)"""
+    profile = profile or os.getenv('SQLITE_PROFILE', 'tuned')
+    if profile not in PROFILES:
+        raise ValueError(f'알 수 없는 SQLITE_PROFILE: {profile}')
+    return {
+        'profile': profile,
+        'busy_timeout_ms': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+        'cache_size_kb': int(os.getenv('SQLITE_CACHE_SIZE_KB', str(64 * 1024))),
+        'pool_size': int(os.getenv('SQLITE_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('SQLITE_MAX_OVERFLOW', '10')),
+    }
+
+
+def is_file_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(uri, settings=None):
+    """create_engine()/SQLALCHEMY_ENGINE_OPTIONS 에 넘길 옵션"""
+    settings = settings or profile_settings()
+    if not is_file_sqlite(uri) or settings['profile'] == 'default':
+        return {}
+    return {
+        'pool_size': settings['pool_size'],
+        'max_overflow': settings['max_overflow'],
+        'pool_timeout': settings['busy_timeout_ms'] / 1000,
+        'connect_args': {
+            # pysqlite 자체 대기 시간도 busy_timeout과 맞춤
+            'timeout': settings['busy_timeout_ms'] / 1000,
+            # 풀의 연결을 여러 스레드(요청, 작업 큐)가 돌려 쓰므로
+            'check_same_thread': False,
+        },
+    }
+
+
+def apply_pragmas(engine, settings=None):
+    """연결이 만들어질 때마다 PRAGMA를 적용하도록 엔진에 등록"""
+    settings = settings or profile_settings()
+    if engine.dialect.name != 'sqlite' or settings['profile'] == 'default':
+        return False
+
+    pragmas = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA busy_timeout={settings['busy_timeout_ms']}",
+        f"PRAGMA mmap_size={settings['mmap_size']}",
+        f"PRAGMA cache_size=-{settings['cache_size_kb']}",  # 음수는 KiB 단위
+        'PRAGMA temp_store=MEMORY',
+    )
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return True
+
+
+def init_db_profile(app, db):
+    """
+    db.init_app(app) 대신 호출. 엔진 옵션을 설정해 db를 초기화하고,
+    첫 연결이 만들어지기 전에 PRAGMA 이벤트를 등록합니다.
+    """
+    settings = profile_settings()
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    options = engine_options(uri, settings)
+    if options:
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).update(options)
+    db.init_app(app)
+    if is_file_sqlite(uri):
+        with app.app_context():
+            apply_pragmas(db.engine, settings)
+    return settings['profile']
@@ -0,0 +1,232 @@
+"""
+AI 일기 생성 백그라운드 작업 큐
+
+write_diary() 요청 안에서 LLM을 기다리지 않고 DiaryJob 행을 만든 뒤 바로
+job id를 돌려줍니다. 실제 생성은 스레드 풀에서 처리하고, 클라이언트는
+/api/diary/jobs/<job_id> 를 폴링해서 결과를 받습니다.
+
+- 대기 + 실행 중인 작업 수는 DIARY_JOB_QUEUE_SIZE로 제한합니다.
+  가득 차면 QueueFull을 발생시켜 요청 쪽에서 503을 돌려주게 합니다.
+- 실패한 작업은 바로 다시 돌리지 않고 next_attempt_at을 지수 백오프
+  (DIARY_JOB_RETRY_BASE초부터 두 배씩, 최대 DIARY_JOB_RETRY_MAX초) 뒤로 미룬 채
+  queued로 되돌립니다. 서킷이 열려 있거나 동시 호출이 가득 차서 OpenAI를 호출해
+  보지도 못한 거절(rejected_errors)은 시도 횟수에 넣지 않고 서킷이 다시 열릴 때까지 미룹니다.
+- 작업 상태는 DiaryJob 테이블에 있습니다. resume_pending()이 프로세스마다 한 번 밀린 작업을
+  가져오고, 이후 DIARY_JOB_POLL_INTERVAL초마다 다시 시도할 때가 된 작업을 가져옵니다.
+- 작업을 가져갈 때는 claimed_by/claimed_at을 조건부 UPDATE로 점유하므로 워커가
+  여럿이어도 한 작업을 두 번 돌리지 않습니다. 점유한 프로세스가 죽으면
+  DIARY_JOB_LEASE초 뒤에 다른 프로세스가 가져갑니다 (LLM_DEADLINE보다 길게 둠).
+"""
+
+import os
+import random
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, update
+
+from models import db, Diary, DiaryJob
+
+MAX_ATTEMPTS = 3
+
+
+class QueueFull(Exception):
+    """대기 중인 작업이 너무 많아 새 작업을 받을 수 없음"""
+
+
+def _claimable(now, lease):
+    """다시 시도할 때가 됐고 아무도 점유하지 않은(또는 점유가 만료된) 작업 조건"""
+    return and_(
+        DiaryJob.status.in_(('queued', 'running')),
+        or_(DiaryJob.next_attempt_at.is_(None), DiaryJob.next_attempt_at <= now),
+        or_(DiaryJob.claimed_at.is_(None), DiaryJob.claimed_at < now - timedelta(seconds=lease)),
+    )
+
+
+def claimable_jobs(now, lease):
+    """가져갈 수 있는 작업 (오래된 것부터)"""
+    return DiaryJob.query.filter(_claimable(now, lease)).order_by(DiaryJob.created_at)
+
+
+class DiaryJobQueue:
+    """
+    DiaryJob을 스레드 풀에서 처리하는 제한된 크기의 큐
+    rejected_errors: 시도 횟수에 넣지 않을 예외 (retry_after 속성이 있으면 그만큼 미룸)
+    """
+
+    def __init__(self, app, generate, workers=2, max_pending=16, poll_interval=5.0, lease=120.0,
+                 retry_base=30.0, retry_max=600.0, rejected_errors=()):
+        self.app = app
+        self.generate = generate  # generate(pet, weather, content_summary) -> 일기 본문
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.rejected_errors = tuple(rejected_errors)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='diary-job')
+        self._stopped = threading.Event()
+        self._start_lock = threading.Lock()
+        self._started_pid = None
+
+    @property
+    def worker_id(self):
+        # fork 뒤에도 프로세스마다 달라지도록 매번 계산
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def enqueue(self, pet, title, content_summary, weather, is_public, photos=None):
+        """작업 행을 저장하고 큐에 넣은 뒤 DiaryJob을 반환"""
+        if not self._slots.acquire(blocking=False):
+            raise QueueFull()
+
+        try:
+            job = DiaryJob(
+                id=uuid.uuid4().hex,
+                pet_id=pet.id,
+                title=title,
+                content_summary=content_summary,
+                weather=weather,
+                photos=photos,
+                is_public=is_public,
+                # 바로 이 프로세스에서 실행하므로 다른 워커의 폴링이 가져가지 않도록 점유
+                claimed_by=self.worker_id,
+                claimed_at=datetime.utcnow()
+            )
+            db.session.add(job)
+            db.session.commit()
+        except Exception:
+            self._slots.release()
+            db.session.rollback()
+            raise
+
+        self._executor.submit(self._run, job.id)
+        return job
+
+    def resume_pending(self):
+        """밀린 작업을 한 번 가져오고 폴링 스레드를 시작 (프로세스마다 한 번). 가져온 작업 수"""
+        with self._start_lock:
+            if self._started_pid == os.getpid():
+                return 0
+            self._started_pid = os.getpid()
+        try:
+            resumed = self.poll()
+        except Exception as e:
+            # 마이그레이션 전 등 - 폴링 스레드가 이어서 다시 시도
+            print(f"⚠️ 밀린 일기 작업을 가져오지 못했습니다: {e}")
+            resumed = 0
+        threading.Thread(target=self._poll_loop, name='diary-job-poller', daemon=True).start()
+        return resumed
+
+    def poll(self):
+        """다시 시도할 때가 된 작업과 점유가 만료된 작업을 점유해서 실행. 가져온 작업 수"""
+        claimed = 0
+        with self.app.app_context():
+            now = datetime.utcnow()
+            job_ids = [job.id for job in claimable_jobs(now, self.lease).limit(self.max_pending)]
+            for job_id in job_ids:
+                if not self._slots.acquire(blocking=False):
+                    break  # 나머지는 다음 폴링 때
+                result = db.session.execute(
+                    update(DiaryJob)
+                    .where(DiaryJob.id == job_id, _claimable(now, self.lease))
+                    .values(claimed_by=self.worker_id, claimed_at=now)
+                )
+                db.session.commit()
+                if result.rowcount != 1:
+                    self._slots.release()  # 다른 프로세스가 먼저 가져감
+                    continue
+                self._executor.submit(self._run, job_id)
+                claimed += 1
+        return claimed
+
+    def _poll_loop(self):
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                # DB가 잠깐 잠겨 있는 등 - 다음 폴링 때 다시 시도
+                print(f"⚠️ 일기 작업 폴링 실패: {e}")
+
+    def _run(self, job_id):
+        try:
+            with self.app.app_context():
+                self._process(job_id)
+        finally:
+            self._slots.release()
+
+    def _retry_delay(self, error, attempts):
+        if isinstance(error, self.rejected_errors):
+            delay = getattr(error, 'retry_after', None) or self.retry_base
+        else:
+            delay = min(self.retry_max, self.retry_base * (2 ** (attempts - 1)))
+        return delay * random.uniform(1.0, 1.5)  # 여러 작업이 한꺼번에 다시 몰리지 않도록
+
+    def _process(self, job_id):
+        job = db.session.get(DiaryJob, job_id)
+        if job is None or job.status in ('done', 'failed'):
+            return
+
+        job.status = 'running'
+        job.attempts = (job.attempts or 0) + 1
+        job.claimed_at = datetime.utcnow()
+        db.session.commit()
+
+        try:
+            content = self.generate(job.pet, job.weather, job.content_summary)
+
+            diary = Diary(
+                title=job.title,
+                content=content,
+                weather=job.weather,
+                photos=job.photos,
+                pet_id=job.pet_id,
+                is_public=job.is_public
+            )
+            db.session.add(diary)
+            db.session.flush()
+
+            job.diary_id = diary.id
+            job.status = 'done'
+            job.error = None
+            job.claimed_by = job.claimed_at = None
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(DiaryJob, job_id)
+            job.error = str(e)
+            if isinstance(e, self.rejected_errors):
+                job.attempts -= 1  # 호출도 못 해본 거절은 시도로 치지 않음
+            if job.attempts >= MAX_ATTEMPTS:
+                job.status = 'failed'
+            else:
+                # 폴링 스레드가 next_attempt_at 이후에 다시 가져감
+                job.status = 'queued'
+                job.next_attempt_at = datetime.utcnow() + timedelta(seconds=self._retry_delay(e, job.attempts))
+            job.claimed_by = job.claimed_at = None
+            db.session.commit()
+
+    def shutdown(self, wait=True):
+        self._stopped.set()
+        self._executor.shutdown(wait=wait)
+
+
+def serialize_job(job):
+    """작업 상태 폴링 응답"""
+    result = {
+        'job_id': job.id,
+        'status': job.status,
+        'created_at': job.created_at.isoformat(),
+        'updated_at': job.updated_at.isoformat() if job.updated_at else None,
+    }
+    if job.status == 'done' and job.diary is not None:
+        result['diary_id'] = job.diary_id
+        result['diary_content'] = job.diary.content
+    elif job.status == 'failed':
+        result['error'] = '일기 생성 중 오류가 발생했습니다.'
+    elif job.status == 'queued' and job.next_attempt_at is not None:
+        result['retry_at'] = job.next_attempt_at.isoformat()
+    return result
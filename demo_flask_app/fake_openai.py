@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+OpenAI 호환 로컬 스텁 서버 - API 키 없이 AI 채팅/일기 기능 확인용
+
+사용법:
+    python fake_openai.py            # http://127.0.0.1:5055/v1
+
+    # 다른 터미널에서
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:5055/v1 python run_demo.py
+
+환경변수:
+    FAKE_OPENAI_PORT   포트 (기본 5055)
+    FAKE_OPENAI_DELAY  스트리밍 토큰 사이 지연 초 (기본 0.05)
+    FAKE_OPENAI_LATENCY    응답 시작 전 지연 초 (기본 0, 느린 서버 흉내)
+    FAKE_OPENAI_FAIL_RATE  503으로 실패할 확률 0~1 (기본 0, 장애 흉내)
+
+실행 중에도 POST /_fake/config {"latency": 5, "fail_rate": 1} 로 바꿀 수 있습니다.
+
+/v1/chat/completions 의 일반 응답과 stream=True (SSE) 응답을 모두 흉내 냅니다.
+응답 내용은 마지막 사용자 메시지를 바탕으로 만든 고정 문장입니다.
+"""
+
+import json
+import os
+import random
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+app = Flask(__name__)
+
+TOKEN_DELAY = float(os.getenv('FAKE_OPENAI_DELAY', '0.05'))
+
+# 장애 흉내 설정 (/_fake/config 로 바꿀 수 있음)
+faults = {
+    'latency': float(os.getenv('FAKE_OPENAI_LATENCY', '0')),
+    'fail_rate': float(os.getenv('FAKE_OPENAI_FAIL_RATE', '0')),
+}
+
+
+def fake_reply(messages):
+    """마지막 사용자 메시지를 되받아 말하는 결정적인 응답"""
+    user_message = next(
+        (m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), ''
+    )
+    return f'멍멍! "{user_message}"라고 했구나? 나도 정말 좋아! 꼬리 흔드는 중이야 🐾'
+
+
+def tokenize(text):
+    """공백 단위로 잘라 토큰처럼 흘려보냄 (공백은 다음 토큰 앞에 붙임)"""
+    words = text.split(' ')
+    return [words[0]] + [' ' + w for w in words[1:]]
+
+
+def usage_for(messages, reply):
+    prompt_tokens = sum(len(m.get('content', '')) for m in messages) // 2
+    completion_tokens = len(reply) // 2
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+    }
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    if faults['latency']:
+        time.sleep(faults['latency'])
+    if random.random() < faults['fail_rate']:
+        return jsonify({'error': {'message': 'fake overload', 'type': 'server_error'}}), 503
+
+    body = request.get_json(force=True)
+    messages = body.get('messages', [])
+    model = body.get('model', 'gpt-3.5-turbo')
+    reply = fake_reply(messages)
+    completion_id = f'chatcmpl-{uuid.uuid4().hex[:12]}'
+    created = int(time.time())
+
+    if not body.get('stream'):
+        return jsonify({
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': created,
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': reply},
+                'finish_reason': 'stop',
+            }],
+            'usage': usage_for(messages, reply),
+        })
+
+    def generate():
+        def chunk(delta, finish_reason=None):
+            payload = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+            }
+            return f'data: {json.dumps(payload, ensure_ascii=False)}\n\n'
+
+        yield chunk({'role': 'assistant', 'content': ''})
+        for token in tokenize(reply):
+            time.sleep(TOKEN_DELAY)
+            yield chunk({'content': token})
+        yield chunk({}, finish_reason='stop')
+        yield 'data: [DONE]\n\n'
+
+    return Response(generate(), mimetype='text/event-stream')
+
+
+@app.route('/_fake/config', methods=['GET', 'POST'])
+def fake_config():
+    if request.method == 'POST':
+        for key, value in (request.get_json(force=True) or {}).items():
+            if key in faults:
+                faults[key] = float(value)
+    return jsonify(faults)
+
+
+@app.route('/v1/models')
+def models():
+    return jsonify({'object': 'list', 'data': [{'id': 'gpt-3.5-turbo', 'object': 'model'}]})
+
+
+if __name__ == '__main__':
+    port = int(os.getenv('FAKE_OPENAI_PORT', '5055'))
+    print('🧪 OpenAI 호환 스텁 서버 시작...')
+    print(f'📍 OPENAI_BASE_URL=http://127.0.0.1:{port}/v1')
+    app.run(host='127.0.0.1', port=port, threaded=True)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+관광 정보 API(한국관광공사 반려동물 동반여행 서비스) 로컬 스텁 서버 - feed_sync.py 확인용
+
+사용법:
+    python fake_tourapi.py           # http://127.0.0.1:5056/B551011/KorPetTourService
+
+    # 다른 터미널에서
+    TOUR_API_BASE_URL=http://127.0.0.1:5056/B551011/KorPetTourService TOUR_API_KEY=fake \\
+        python feed_sync.py
+
+환경변수:
+    FAKE_TOURAPI_PORT      포트 (기본 5056)
+    FAKE_TOURAPI_LATENCY   응답 전 지연 초 (기본 0)
+    FAKE_TOURAPI_MAX_AGE   Cache-Control max-age 초 (기본 3600)
+
+fixtures/tourapi/<오퍼레이션>.json 에 녹화해 둔 항목을 실제 API와 같은 모양
+(response.header / response.body.items.item, pageNo, numOfRows, totalCount)으로
+페이지를 나눠 돌려줍니다. contentTypeId로 거를 수 있고, 페이지 내용으로 만든
+ETag를 붙여서 If-None-Match가 같으면 304를 돌려줍니다.
+GET /_fake/stats 로 오퍼레이션별 요청 수와 304 응답 수를 확인할 수 있습니다.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+
+from flask import Flask, Response, jsonify, request
+
+app = Flask(__name__)
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'tourapi')
+LATENCY = float(os.getenv('FAKE_TOURAPI_LATENCY', '0'))
+MAX_AGE = int(os.getenv('FAKE_TOURAPI_MAX_AGE', '3600'))
+
+stats = Counter()
+
+
+def load_items(operation):
+    path = os.path.join(FIXTURE_DIR, f'{operation}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['items']
+
+
+def envelope(result_code, result_msg, body=None):
+    response = {'header': {'resultCode': result_code, 'resultMsg': result_msg}}
+    if body is not None:
+        response['body'] = body
+    return {'response': response}
+
+
+@app.route('/B551011/KorPetTourService/<operation>')
+def operation_list(operation):
+    if LATENCY:
+        time.sleep(LATENCY)
+    stats[operation] += 1
+
+    if not request.args.get('serviceKey'):
+        return jsonify(envelope('30', 'SERVICE_KEY_IS_NOT_REGISTERED_ERROR')), 401
+    items = load_items(operation)
+    if items is None:
+        return jsonify(envelope('04', 'HTTP_ERROR')), 404
+
+    content_type = request.args.get('contentTypeId')
+    if content_type:
+        items = [item for item in items if item['contenttypeid'] == content_type]
+    rows = max(1, min(int(request.args.get('numOfRows', 10)), 1000))
+    page = max(1, int(request.args.get('pageNo', 1)))
+    page_items = items[(page - 1) * rows:page * rows]
+
+    body = {
+        # 실제 API처럼 결과가 없으면 items가 빈 문자열
+        'items': {'item': page_items} if page_items else '',
+        'numOfRows': rows,
+        'pageNo': page,
+        'totalCount': len(items),
+    }
+    payload = json.dumps(envelope('0000', 'OK', body), ensure_ascii=False)
+    etag = '"' + hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32] + '"'
+    headers = {'ETag': etag, 'Cache-Control': f'max-age={MAX_AGE}'}
+
+    if request.headers.get('If-None-Match') == etag:
+        stats[f'{operation}:304'] += 1
+        return Response(status=304, headers=headers)
+    return Response(payload, mimetype='application/json', headers=headers)
+
+
+@app.route('/_fake/stats', methods=['GET', 'DELETE'])
+def fake_stats():
+    if request.method == 'DELETE':
+        stats.clear()
+    return jsonify(stats)
+
+
+if __name__ == '__main__':
+    port = int(os.getenv('FAKE_TOURAPI_PORT', '5056'))
+    print('🧪 관광 정보 API 스텁 서버 시작...')
+    print(f'📍 TOUR_API_BASE_URL=http://127.0.0.1:{port}/B551011/KorPetTourService')
+    app.run(host='127.0.0.1', port=port, threaded=True)
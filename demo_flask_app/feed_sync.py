@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+외부 관광/장소 데이터 동기화 (한국관광공사 반려동물 동반여행 서비스)
+
+Place와 TravelDestination을 요청마다 외부 API로 채우지 않고, 이 스크립트로
+주기적으로 한꺼번에 받아 로컬 DB에 upsert한 뒤 화면/API는 로컬 사본만 읽습니다.
+
+사용법:
+    python feed_sync.py                 # 모든 피드 (places, destinations)
+    python feed_sync.py places          # 장소만
+    python feed_sync.py --force         # 캐시 유효 기간을 무시하고 ETag로 다시 확인
+
+    # crontab 예시 (6시간마다)
+    0 */6 * * * cd /srv/petcare/demo_flask_app && python feed_sync.py
+
+- 요청은 연결 풀을 둔 requests.Session 하나로 보내고, 첫 페이지에서 전체 건수를
+  확인한 뒤 나머지 페이지는 FEED_SYNC_WORKERS개 스레드로 나눠 받습니다.
+  일시적인 오류(429/5xx, 연결 실패)는 지수 백오프로 재시도합니다.
+- 받은 원본 응답은 FEED_CACHE_DIR에 ETag와 함께 저장합니다. 유효 기간
+  (FEED_CACHE_TTL초, 서버가 Cache-Control max-age를 주면 더 짧은 쪽) 안에는
+  네트워크 없이 디스크에서 읽고, 지나면 If-None-Match로 재검증해서 304면
+  저장된 본문을 그대로 씁니다. 캐시 파일에는 서비스 키를 남기지 않습니다.
+- upsert 키는 (source, external_id)이고, 내용이 바뀐 행만 UPDATE합니다.
+  장소 좌표가 바뀌면 geo.py의 R*Tree도 같은 트랜잭션에서 갱신됩니다.
+- 로컬에서는 fake_tourapi.py (녹화한 응답을 돌려주는 스텁 서버)로 확인합니다.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from instrumentation import registry
+from models import db, Place, TravelDestination
+
+SOURCE = 'tourapi'
+DEFAULT_BASE_URL = 'https://apis.data.go.kr/B551011/KorPetTourService'
+
+# 관광 타입(contentTypeId) -> 장소 카테고리
+CATEGORIES = {'12': '관광지', '32': '펜션', '38': '용품점', '39': '카페'}
+
+feed_requests_total = registry.counter(
+    'petcare_feed_requests_total', '외부 피드 페이지 요청 수 (result=cached/not_modified/downloaded)')
+
+Feed = namedtuple('Feed', ['operation', 'queries', 'model', 'to_fields'])
+
+
+class FeedError(Exception):
+    """외부 API가 오류를 돌려줬거나 응답을 해석할 수 없을 때 발생"""
+
+
+class FeedCache:
+    """원본 응답을 ETag와 함께 디스크에 저장 (키 하나에 JSON 파일 하나)"""
+
+    def __init__(self, directory, ttl=21600):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry):
+        ttl = min(self.ttl, entry['max_age']) if entry.get('max_age') is not None else self.ttl
+        return time.time() - entry['fetched_at'] < ttl
+
+    def put(self, key, body, etag=None, max_age=None):
+        entry = {'key': key, 'etag': etag, 'max_age': max_age, 'fetched_at': time.time(), 'body': body}
+        # 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록 임시 파일에 쓰고 교체
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+        return entry
+
+    def touch(self, entry, max_age=None):
+        """304 응답: 본문은 그대로 두고 받은 시각만 갱신"""
+        return self.put(entry['key'], entry['body'], entry.get('etag'), max_age)
+
+
+def _max_age(response):
+    for directive in response.headers.get('Cache-Control', '').split(','):
+        name, _, value = directive.strip().partition('=')
+        if name.lower() == 'max-age' and value.isdigit():
+            return int(value)
+    return None
+
+
+class FeedClient:
+    """
+    base_url: 서비스 주소, service_key: 발급받은 인증키
+    page_size: 페이지당 항목 수, workers: 페이지를 동시에 받는 스레드 수
+    """
+
+    def __init__(self, base_url, service_key, cache, page_size=100, workers=4,
+                 timeout=10, connect_timeout=3.05, max_retries=3):
+        self.base_url = base_url.rstrip('/')
+        self.service_key = service_key
+        self.cache = cache
+        self.page_size = page_size
+        self.workers = max(1, workers)
+        self.timeout = (connect_timeout, timeout)
+
+        self.session = requests.Session()
+        retry = Retry(total=max_retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=('GET',), respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept': 'application/json', 'User-Agent': 'PetCare-FeedSync/1.0'})
+
+    def close(self):
+        self.session.close()
+
+    def fetch(self, operation, params, force=False):
+        """한 페이지 응답 본문(JSON)과 결과(cached/not_modified/downloaded)"""
+        params = dict(params, MobileOS='ETC', MobileApp='PetCare', _type='json')
+        key = f'{self.base_url}/{operation}?' + '&'.join(f'{k}={params[k]}' for k in sorted(params))
+        entry = self.cache.get(key)
+        if entry is not None and not force and self.cache.is_fresh(entry):
+            return entry['body'], 'cached'
+
+        headers = {'If-None-Match': entry['etag']} if entry and entry.get('etag') else {}
+        try:
+            response = self.session.get(f'{self.base_url}/{operation}', timeout=self.timeout,
+                                        params=dict(params, serviceKey=self.service_key), headers=headers)
+        except requests.RequestException as e:
+            raise FeedError(f'{operation} 요청 실패: {e.__class__.__name__}') from e
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(entry, _max_age(response))
+            return entry['body'], 'not_modified'
+        if response.status_code != 200:
+            raise FeedError(f'{operation} 응답 오류: HTTP {response.status_code}')
+        try:
+            body = response.json()
+        except ValueError as e:
+            raise FeedError(f'{operation} 응답이 JSON이 아닙니다.') from e
+        header = body.get('response', {}).get('header', {})
+        if header.get('resultCode') != '0000':
+            raise FeedError(f"{operation} 오류 {header.get('resultCode')}: {header.get('resultMsg')}")
+
+        self.cache.put(key, body, response.headers.get('ETag'), _max_age(response))
+        return body, 'downloaded'
+
+    def pages(self, operation, params, force=False):
+        """(항목 목록, 결과)를 페이지 순서대로 생성"""
+        first, result = self.fetch(operation, dict(params, numOfRows=self.page_size, pageNo=1), force)
+        yield _items(first), result
+
+        total = int(first['response']['body'].get('totalCount') or 0)
+        page_count = -(-total // self.page_size)
+        if page_count <= 1:
+            return
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='feed-sync') as executor:
+            yield from (
+                (_items(body), result) for body, result in executor.map(
+                    lambda page: self.fetch(operation, dict(params, numOfRows=self.page_size, pageNo=page), force),
+                    range(2, page_count + 1)
+                )
+            )
+
+
+def _items(body):
+    items = body['response']['body'].get('items') or {}
+    item = items.get('item', []) if isinstance(items, dict) else []
+    # 항목이 하나면 목록이 아니라 객체 하나로 오는 경우가 있음
+    return [item] if isinstance(item, dict) else item
+
+
+def _coordinate(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+
+def _pet_policy(item):
+    parts = [item.get('acmpyTypeCd'), item.get('acmpyPsblCpam'), item.get('acmpyNeedMtr')]
+    return ' / '.join(part for part in parts if part) or None
+
+
+def place_fields(item):
+    return {
+        'name': item['title'],
+        'address': ' '.join(filter(None, [item.get('addr1'), item.get('addr2')])) or '-',
+        'category': CATEGORIES.get(item.get('contenttypeid')),
+        'phone': (item.get('tel') or None) and item['tel'][:20],
+        'website': item.get('homepage') or None,
+        'latitude': _coordinate(item.get('mapy')),
+        'longitude': _coordinate(item.get('mapx')),
+        'description': item.get('overview') or None,
+        'pet_friendly': item.get('acmpyTypeCd') != '동반불가',
+    }
+
+
+def destination_fields(item):
+    return {
+        'name': item['title'],
+        'location': item.get('addr1') or '-',
+        'description': item.get('overview') or None,
+        'image_url': item.get('firstimage') or None,
+        'contact_info': item.get('tel') or None,
+        'website': item.get('homepage') or None,
+        'pet_policies': _pet_policy(item),
+    }
+
+
+FEEDS = {
+    'places': Feed('areaBasedList', [{'contentTypeId': type_id} for type_id in ('39', '32', '38')],
+                   Place, place_fields),
+    'destinations': Feed('areaBasedList', [{'contentTypeId': '12'}], TravelDestination, destination_fields),
+}
+
+
+def upsert(model, items, to_fields, now=None):
+    """한 페이지 항목을 (source, external_id) 기준으로 넣거나 고침. (추가, 수정, 그대로) 수를 반환"""
+    rows = {str(item['contentid']): to_fields(item) for item in items if item.get('contentid') and item.get('title')}
+    if not rows:
+        return 0, 0, 0
+    now = now or datetime.utcnow()
+    existing = {obj.external_id: obj for obj in model.query.filter(
+        model.source == SOURCE, model.external_id.in_(list(rows)))}
+
+    inserted = updated = 0
+    for external_id, fields in rows.items():
+        obj = existing.get(external_id)
+        if obj is None:
+            db.session.add(model(source=SOURCE, external_id=external_id, synced_at=now, **fields))
+            inserted += 1
+            continue
+        changed = {name: value for name, value in fields.items() if getattr(obj, name) != value}
+        if changed:
+            for name, value in changed.items():
+                setattr(obj, name, value)
+            obj.synced_at = now
+            updated += 1
+    db.session.commit()
+    return inserted, updated, len(rows) - inserted - updated
+
+
+def make_client():
+    return FeedClient(
+        base_url=os.getenv('TOUR_API_BASE_URL') or DEFAULT_BASE_URL,
+        service_key=os.getenv('TOUR_API_KEY', ''),
+        cache=FeedCache(os.getenv('FEED_CACHE_DIR', 'feed_cache'), int(os.getenv('FEED_CACHE_TTL', '21600'))),
+        page_size=int(os.getenv('FEED_PAGE_SIZE', '100')),
+        workers=int(os.getenv('FEED_SYNC_WORKERS', '4')),
+    )
+
+
+def sync(names=None, force=False, client=None):
+    """피드를 받아 upsert (앱 컨텍스트 안에서 호출). 피드 이름 -> 통계 Counter"""
+    own_client = client is None
+    client = client or make_client()
+    results = {}
+    try:
+        for name in names or FEEDS:
+            feed = FEEDS[name]
+            stats = Counter()
+            for params in feed.queries:
+                for items, result in client.pages(feed.operation, params, force):
+                    feed_requests_total.inc(operation=feed.operation, result=result)
+                    stats['pages'] += 1
+                    stats[result] += 1
+                    inserted, updated, unchanged = upsert(feed.model, items, feed.to_fields)
+                    stats.update(inserted=inserted, updated=updated, unchanged=unchanged)
+            results[name] = stats
+    finally:
+        if own_client:
+            client.close()
+    return results
+
+
+def main():
+    from app import app
+
+    names = [arg for arg in sys.argv[1:] if not arg.startswith('--')] or list(FEEDS)
+    unknown = [name for name in names if name not in FEEDS]
+    if unknown:
+        print(f"❌ 알 수 없는 피드: {', '.join(unknown)} (가능: {', '.join(FEEDS)})")
+        sys.exit(2)
+    if not os.getenv('TOUR_API_KEY'):
+        print('❌ TOUR_API_KEY가 설정되지 않았습니다.')
+        sys.exit(2)
+
+    with app.app_context():
+        try:
+            results = sync(names, force='--force' in sys.argv)
+        except FeedError as e:
+            print(f'❌ 동기화 실패: {e}')
+            sys.exit(1)
+    for name, stats in results.items():
+        print(f"✅ {name}: 페이지 {stats['pages']}개 (캐시 {stats['cached']}, 304 {stats['not_modified']}, "
+              f"다운로드 {stats['downloaded']}) / 추가 {stats['inserted']}, 수정 {stats['updated']}, "
+              f"그대로 {stats['unchanged']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+반려동물 동반 장소 위치 검색 (SQLite R*Tree)
+
+Place의 위도/경도는 평범한 실수 컬럼이라 "주변 장소"를 찾으려면 모든 행을
+읽어 거리를 계산해야 합니다. 대신 R*Tree 가상 테이블 place_rtree에 좌표를
+넣어두고, 반경을 감싸는 위경도 사각형과 겹치는 장소만 골라낸 뒤
+그 후보만 실제 거리(하버사인)로 거르고 정렬합니다.
+
+- place_rtree의 id는 place.id와 같습니다. 좌표가 없는 장소는 넣지 않습니다.
+- 장소가 추가/이동/삭제되면 같은 트랜잭션 안에서(after_flush) 고칩니다.
+- R*Tree는 좌표를 32비트 실수로 저장하므로 후보를 고를 때만 쓰고,
+  거리 계산과 반경 판정은 place 테이블의 원래 좌표로 합니다.
+- bbox 검색도 한 변이 MAX_BBOX_M을 넘으면 거절하므로, 한 요청이 후보로 읽는 장소는
+  nearby()의 최대 반경과 같은 범위로 제한됩니다.
+- sort=rating이면 반경 안의 장소를 평균 평점(reviews.py가 관리하는 집계 컬럼)순으로 줍니다.
+- 테이블은 migrations.py (버전 6)에서 만들고 기존 장소를 채웁니다.
+  SQLite가 아니거나 테이블이 없으면 latitude/longitude 범위 조건으로 대신합니다.
+"""
+
+import math
+from collections import namedtuple
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from models import db, Place
+
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEGREE = 111320
+
+DEFAULT_RADIUS_M = 2000
+MAX_RADIUS_M = 50000
+MAX_BBOX_M = 2 * MAX_RADIUS_M  # bbox 한 변의 최대 길이 (nearby의 최대 반경을 감싸는 사각형과 같음)
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+SORT_OPTIONS = ('distance', 'rating')
+
+NearbyPlace = namedtuple('NearbyPlace', ['place', 'distance'])
+
+_ready = {}  # 엔진 URL -> R*Tree 테이블 존재 여부
+
+
+class InvalidLocation(ValueError):
+    """위치 검색 인자가 잘못되었을 때 발생"""
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """두 좌표 사이의 거리 (미터)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def bounding_box(lat, lng, radius_m):
+    """반경 radius_m 원을 감싸는 (남, 서, 북, 동) 사각형"""
+    d_lat = radius_m / METERS_PER_DEGREE
+    d_lng = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return max(lat - d_lat, -90.0), lng - d_lng, min(lat + d_lat, 90.0), lng + d_lng
+
+
+def is_available(conn):
+    """현재 DB에 place_rtree 테이블이 있는지 (엔진별로 한 번만 확인)"""
+    key = str(conn.engine.url)
+    if key not in _ready:
+        _ready[key] = conn.dialect.name == 'sqlite' and inspect(conn).has_table('place_rtree')
+    return _ready[key]
+
+
+def create_index(conn):
+    """place_rtree 테이블을 만들고 기존 장소로 채움 (이미 있으면 다시 채움)"""
+    conn.execute(text(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS place_rtree '
+        'USING rtree(id, min_lat, max_lat, min_lng, max_lng)'
+    ))
+    _ready[str(conn.engine.url)] = True
+    return rebuild(conn)
+
+
+def rebuild(conn):
+    """R*Tree를 비우고 좌표가 있는 장소를 모두 다시 넣음. 넣은 장소 수를 반환"""
+    conn.execute(text('DELETE FROM place_rtree'))
+    result = conn.execute(text(
+        'INSERT INTO place_rtree (id, min_lat, max_lat, min_lng, max_lng) '
+        'SELECT id, latitude, latitude, longitude, longitude FROM place '
+        'WHERE latitude IS NOT NULL AND longitude IS NOT NULL'
+    ))
+    return result.rowcount
+
+
+def _sync_index(session, flush_context):
+    """flush된 장소 추가/이동/삭제를 같은 트랜잭션 안에서 R*Tree에 반영"""
+    removed, upserts = set(), {}
+    for obj in session.new:
+        if isinstance(obj, Place):
+            upserts[obj.id] = obj
+    for obj in session.dirty:
+        if isinstance(obj, Place):
+            state = inspect(obj)
+            if state.attrs.latitude.history.has_changes() or state.attrs.longitude.history.has_changes():
+                upserts[obj.id] = obj
+    for obj in session.deleted:
+        if isinstance(obj, Place):
+            removed.add(obj.id)
+
+    if not (removed or upserts):
+        return
+    conn = session.connection()
+    if not is_available(conn):
+        return
+    conn.execute(text('DELETE FROM place_rtree WHERE id = :id'),
+                 [{'id': place_id} for place_id in removed | set(upserts)])
+    located = [obj for obj in upserts.values() if obj.latitude is not None and obj.longitude is not None]
+    if located:
+        conn.execute(
+            text('INSERT INTO place_rtree (id, min_lat, max_lat, min_lng, max_lng) '
+                 'VALUES (:id, :lat, :lat, :lng, :lng)'),
+            [{'id': obj.id, 'lat': obj.latitude, 'lng': obj.longitude} for obj in located]
+        )
+
+
+def watch():
+    """장소 좌표가 바뀌어 flush될 때 R*Tree를 고치도록 세션 이벤트 등록"""
+    event.listen(Session, 'after_flush', _sync_index)
+
+
+def _candidates(conn, box, category=None, pet_friendly=None):
+    """사각형 안의 장소 (id, 위도, 경도, 평균 평점, 리뷰 수) - R*Tree가 있으면 R*Tree로 고름"""
+    south, west, north, east = box
+    params = {'south': south, 'west': west, 'north': north, 'east': east}
+    if is_available(conn):
+        sql = ('SELECT place.id, place.latitude, place.longitude, place.rating_avg, place.review_count '
+               'FROM place_rtree '
+               'JOIN place ON place.id = place_rtree.id '
+               'WHERE place_rtree.max_lat >= :south AND place_rtree.min_lat <= :north '
+               'AND place_rtree.max_lng >= :west AND place_rtree.min_lng <= :east '
+               # R*Tree는 32비트 실수라 경계가 조금 넓으므로 원래 좌표로 한 번 더 확인
+               'AND place.latitude BETWEEN :south AND :north '
+               'AND place.longitude BETWEEN :west AND :east')
+    else:
+        sql = ('SELECT id, latitude, longitude, rating_avg, review_count FROM place '
+               'WHERE latitude BETWEEN :south AND :north AND longitude BETWEEN :west AND :east')
+    if category:
+        sql += ' AND place.category = :category'
+        params['category'] = category
+    if pet_friendly is not None:
+        sql += ' AND place.pet_friendly = :pet_friendly'
+        params['pet_friendly'] = pet_friendly
+    return conn.execute(text(sql), params).all()
+
+
+def _load(ranked):
+    """(id, 거리) 목록 순서대로 Place를 한 번에 조회"""
+    ids = [place_id for place_id, _ in ranked]
+    places = {place.id: place for place in Place.query.filter(Place.id.in_(ids))} if ids else {}
+    return [NearbyPlace(places[place_id], distance) for place_id, distance in ranked if place_id in places]
+
+
+def _rank(rows, lat, lng, radius_m, sort, limit):
+    """후보를 반경으로 거르고 거리순(또는 평점순, 같으면 거리순)으로 limit개까지 (id, 거리)"""
+    ranked = []
+    for place_id, place_lat, place_lng, rating_avg, review_count in rows:
+        distance = haversine(lat, lng, place_lat, place_lng)
+        if radius_m is None or distance <= radius_m:
+            key = (-rating_avg, -review_count, distance) if sort == 'rating' else (distance,)
+            ranked.append((key, place_id, distance))
+    ranked.sort()
+    return [(place_id, distance) for _, place_id, distance in ranked[:limit]]
+
+
+def nearby(lat, lng, radius_m=DEFAULT_RADIUS_M, category=None, pet_friendly=None,
+           sort='distance', limit=DEFAULT_LIMIT):
+    """(lat, lng)에서 radius_m 미터 안의 장소를 가까운 순(sort='rating'이면 평점순)으로 최대 limit개"""
+    rows = _candidates(db.session.connection(), bounding_box(lat, lng, radius_m), category, pet_friendly)
+    return _load(_rank(rows, lat, lng, radius_m, sort, limit))
+
+
+def within(box, category=None, pet_friendly=None, sort='distance', limit=DEFAULT_LIMIT):
+    """지도 화면 사각형 (남, 서, 북, 동) 안의 장소를 중심에서 가까운 순(또는 평점순)으로 최대 limit개"""
+    south, west, north, east = box
+    rows = _candidates(db.session.connection(), box, category, pet_friendly)
+    return _load(_rank(rows, (south + north) / 2, (west + east) / 2, None, sort, limit))
+
+
+def _coordinate(args, name, low, high):
+    try:
+        value = float(args[name])
+    except KeyError:
+        raise InvalidLocation(f'{name} 값이 필요합니다.')
+    except ValueError:
+        raise InvalidLocation(f'{name} 값이 숫자가 아닙니다.')
+    if not (low <= value <= high) or math.isnan(value):
+        raise InvalidLocation(f'{name} 값이 범위를 벗어났습니다.')
+    return value
+
+
+def parse_location_args(args):
+    """
+    요청 쿼리스트링에서 위치 검색 조건을 추출.
+    lat/lng(+radius) 또는 bbox=남,서,북,동 중 하나가 필요하고, 잘못되면 InvalidLocation
+    """
+    filters = {
+        'category': (args.get('category') or '').strip() or None,
+        'pet_friendly': {'true': True, '1': True, 'false': False, '0': False}.get(
+            (args.get('pet_friendly') or '').lower()),
+        'sort': args.get('sort') if args.get('sort') in SORT_OPTIONS else 'distance',
+        'limit': max(1, min(args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT)),
+    }
+    if args.get('bbox'):
+        try:
+            south, west, north, east = (float(value) for value in args['bbox'].split(','))
+        except ValueError:
+            raise InvalidLocation('bbox는 남,서,북,동 위경도 4개여야 합니다.')
+        if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+            raise InvalidLocation('bbox 범위가 잘못되었습니다.')
+        # 후보를 모두 읽어 거리를 계산하므로 너무 넓은 사각형은 받지 않음
+        height = (north - south) * METERS_PER_DEGREE
+        width = (east - west) * METERS_PER_DEGREE * math.cos(math.radians((south + north) / 2))
+        if max(height, width) > MAX_BBOX_M:
+            raise InvalidLocation('bbox가 너무 넓습니다. 지도를 더 확대해 주세요.')
+        filters['box'] = (south, west, north, east)
+        return filters
+
+    filters['lat'] = _coordinate(args, 'lat', -90, 90)
+    filters['lng'] = _coordinate(args, 'lng', -180, 180)
+    radius = args.get('radius', DEFAULT_RADIUS_M, type=float)
+    filters['radius_m'] = max(1.0, min(radius, MAX_RADIUS_M))
+    return filters
+
+
+def serialize_place(place, distance=None):
+    """지도/목록에 필요한 장소 필드"""
+    result = {
+        'id': place.id,
+        'name': place.name,
+        'address': place.address,
+        'category': place.category,
+        'phone': place.phone,
+        'latitude': place.latitude,
+        'longitude': place.longitude,
+        'pet_friendly': place.pet_friendly,
+        'rating': round(place.rating_avg, 2),
+        'review_count': place.review_count,
+    }
+    if distance is not None:
+        result['distance_m'] = round(distance)
+    return result
@@ -0,0 +1,100 @@
+"""
+로그인 사용자 캐시 (Flask-Login user_loader)
+
+로그인한 요청마다 load_user()가 User 행을 다시 조회하는 대신, 요청 처리에
+필요한 필드만 담은 스냅샷(CachedUser)을 user_id별로 캐시에 보관합니다.
+캐시 적중 시 current_user를 만드는 비용은 캐시 조회 한 번입니다.
+
+- 뷰와 템플릿이 쓰는 것은 id, nickname, is_authenticated 정도이므로 스냅샷은
+  ORM 객체가 아닌 가벼운 객체입니다. 관계(pets, posts 등)나 password_hash가
+  필요하면 db.session.get(User, current_user.id)로 행을 조회하세요.
+- User 행이 수정/삭제되어 커밋되면(닉네임, 프로필 사진, 비밀번호 변경 등)
+  항목을 지우고, 로그아웃할 때도 지웁니다.
+- 백엔드는 cache_backends.make_backend()로 고릅니다. 기본은 프로세스 안의
+  LRU + TTL(IDENTITY_CACHE_TTL초)이라 다른 워커에서 한 변경은 최대 TTL 동안
+  늦게 보일 수 있고, IDENTITY_CACHE_URL에 redis:// 주소를 주면 워커끼리 공유되어
+  어느 워커에서 지워도 바로 반영됩니다.
+"""
+
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from instrumentation import registry
+from models import db, User
+
+identity_lookups = registry.counter(
+    'petcare_identity_cache_lookups_total', '로그인 사용자 캐시 조회 수 (result=hit/miss)')
+
+# 스냅샷에 담는 User 컬럼 (password_hash 등 민감한 값은 넣지 않음)
+SNAPSHOT_FIELDS = ('id', 'username', 'email', 'nickname', 'profile_image')
+
+
+class CachedUser(UserMixin):
+    """current_user로 쓰는 User 스냅샷"""
+
+    def __init__(self, id, username, email, nickname, profile_image=None):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.nickname = nickname
+        self.profile_image = profile_image
+
+    def __repr__(self):
+        return f'<CachedUser {self.id} {self.username}>'
+
+
+def snapshot_user(user):
+    return {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+
+
+class IdentityCache:
+    """user_id -> User 스냅샷 캐시. 백엔드는 get/set/delete를 가진 캐시 저장소"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def load(self, user_id):
+        """세션의 user_id로 CachedUser를 반환 (없는 사용자면 None)"""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+        cached = self.backend.get(str(user_id))
+        if cached is not None:
+            identity_lookups.inc(result='hit')
+            return CachedUser(**cached)
+
+        identity_lookups.inc(result='miss')
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        snapshot = snapshot_user(user)
+        self.backend.set(str(user_id), snapshot)
+        return CachedUser(**snapshot)
+
+    def invalidate(self, user_id):
+        self.backend.delete(str(user_id))
+
+    def watch(self):
+        """User 수정/삭제가 커밋되면 해당 캐시 항목을 지우도록 세션 이벤트 등록"""
+        event.listen(Session, 'after_flush', _collect_changed_users)
+        event.listen(Session, 'after_commit', self._invalidate_committed)
+        event.listen(Session, 'after_rollback', _discard_changed_users)
+
+    def _invalidate_committed(self, session):
+        for user_id in session.info.pop('_changed_user_ids', ()):
+            self.invalidate(user_id)
+
+
+def _collect_changed_users(session, flush_context):
+    # 커밋 전에 지우면 다른 요청이 옛 값으로 다시 채울 수 있으므로 id만 모아둠
+    changed = session.info.setdefault('_changed_user_ids', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            changed.add(obj.id)
+
+
+def _discard_changed_users(session):
+    session.info.pop('_changed_user_ids', None)
@@ -0,0 +1,291 @@
+"""
+업로드 이미지 처리 (원본 저장, 내용 해시로 중복 제거, 크기별 변환본)
+
+휴대폰 사진은 한 장에 수 MB라 그대로 일기 사진이나 프로필 사진에 쓰면
+페이지가 무거워집니다. 업로드 요청은 원본을 저장만 하고 바로 응답하며,
+작은 WebP/JPEG 변환본은 스레드 풀에서 만들어 UploadedImage에 URL을 기록합니다.
+
+- 요청 본문을 64KB씩 읽어 임시 파일에 쓰면서 SHA-256을 계산하므로 사진 전체를
+  메모리에 올리지 않습니다. IMAGE_MAX_BYTES를 넘으면 읽기를 멈추고 거절합니다.
+  이렇게 버퍼링 없이 흘려 받는 것은 본문 자체가 이미지(Content-Type: image/*)일 때만입니다.
+  multipart 업로드는 werkzeug가 먼저 요청 전체를 파싱해 file 필드를 임시 파일
+  (작으면 메모리)에 옮겨 둔 뒤 그 사본을 읽으므로 한 번 더 복사되고, 크기 제한도
+  다 받은 뒤에야 적용됩니다(그 전에는 MAX_CONTENT_LENGTH가 막음).
+- 같은 내용의 사진은 해시가 같으므로 다시 저장/변환하지 않고 기존 행을 돌려줍니다.
+- 원본은 static 밖(IMAGE_ORIGINALS_DIR)에 두고, 변환본만
+  static/uploads/<해시 앞 2자리>/<해시>/<크기>.<webp|jpg> 로 공개합니다.
+  경로가 내용 해시로 정해지므로 저장할 때 바로 URL을 기록하고(변환 전에는
+  status가 pending), 내용이 바뀌지 않으니 브라우저가 오래 캐시해도 됩니다.
+- 변환 상태(pending/ready/failed)는 DB에 있으므로, 서버가 재시작되면
+  resume_pending()이 끝나지 않은 변환을 다시 큐에 넣습니다.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy.exc import IntegrityError
+
+from instrumentation import registry
+from models import db, UploadedImage
+
+CHUNK_SIZE = 64 * 1024
+
+# Pillow 포맷 이름 -> 원본 확장자
+ALLOWED_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+# (이름, 긴 변 최대 픽셀, 정사각형으로 자르기) - thumb는 목록/프로필, large는 일기 상세
+VARIANTS = (
+    ('thumb', 320, True),
+    ('large', 1280, False),
+)
+OUTPUT_FORMATS = (('webp', 'WEBP', {'quality': 80, 'method': 4}),
+                  ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}))
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+uploads_total = registry.counter(
+    'petcare_image_uploads_total', '이미지 업로드 수 (result=stored/duplicate/too_large/invalid)')
+processed_total = registry.counter(
+    'petcare_image_processed_total', '이미지 변환 수 (result=ok/error)')
+processing_seconds = registry.histogram(
+    'petcare_image_processing_seconds', '이미지 한 장의 변환본을 모두 만드는 데 걸린 시간')
+
+
+class ImageTooLarge(Exception):
+    """업로드가 IMAGE_MAX_BYTES를 넘음"""
+
+
+class InvalidImage(ValueError):
+    """이미지가 아니거나 지원하지 않는 형식/크기"""
+
+
+def variant_urls(url_prefix, digest):
+    """해시로 정해지는 변환본 URL {크기: {webp: URL, jpeg: URL}} (아직 만들어지지 않았어도 같음)"""
+    base = f'{url_prefix.rstrip("/")}/{digest[:2]}/{digest}'
+    return {name: {fmt: f'{base}/{name}.{EXTENSIONS[fmt]}' for fmt, _, _ in OUTPUT_FORMATS}
+            for name, _, _ in VARIANTS}
+
+
+class ImagePipeline:
+    """
+    upload_dir: 변환본을 둘 공개 폴더 (url_prefix로 서비스), originals_dir: 원본 폴더
+    max_bytes: 업로드 한 장의 최대 크기, max_pixels: 디코딩할 최대 픽셀 수 (압축 폭탄 방지)
+    """
+
+    def __init__(self, app, upload_dir, originals_dir, url_prefix, workers=2,
+                 max_bytes=15 * 1024 * 1024, max_pixels=40_000_000):
+        self.app = app
+        self.upload_dir = os.path.join(app.root_path, upload_dir)
+        self.originals_dir = os.path.join(app.root_path, originals_dir)
+        self.url_prefix = url_prefix
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self._inflight = {}  # 해시 -> 진행 중인 Future
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image')
+        os.makedirs(self.originals_dir, exist_ok=True)
+
+    def original_path(self, digest, image_format):
+        return os.path.join(self.originals_dir, digest[:2], f'{digest}.{ALLOWED_FORMATS[image_format]}')
+
+    def _variant_dir(self, digest):
+        return os.path.join(self.upload_dir, digest[:2], digest)
+
+    def _spool(self, stream):
+        """스트림을 임시 파일에 나눠 쓰면서 해시 계산. (임시 파일 경로, 해시, 바이트 수)"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, path = tempfile.mkstemp(dir=self.originals_dir, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        uploads_total.inc(result='too_large')
+                        raise ImageTooLarge()
+                    digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path, digest.hexdigest(), size
+
+    def _inspect(self, path):
+        """헤더만 읽어 (포맷, 가로, 세로) 확인. 지원하지 않으면 InvalidImage"""
+        try:
+            with Image.open(path) as image:
+                image_format, (width, height) = image.format, image.size
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+            raise InvalidImage('이미지 파일이 아니에요.')
+        if image_format not in ALLOWED_FORMATS:
+            raise InvalidImage('JPEG, PNG, WebP, GIF 이미지만 올릴 수 있어요.')
+        if width * height > self.max_pixels:
+            raise InvalidImage('이미지 해상도가 너무 커요.')
+        return image_format, width, height
+
+    def store(self, stream, uploaded_by=None):
+        """
+        업로드 스트림을 저장하고 변환을 큐에 넣은 뒤 (UploadedImage, 새로 저장했는지) 반환.
+        같은 내용이 이미 있으면 저장/변환하지 않고 기존 행을 돌려줌
+        """
+        path, digest, size = self._spool(stream)
+        try:
+            image = db.session.get(UploadedImage, digest)
+            if image is not None and image.status != 'failed':
+                uploads_total.inc(result='duplicate')
+                return image, False
+
+            try:
+                image_format, width, height = self._inspect(path)
+            except InvalidImage:
+                uploads_total.inc(result='invalid')
+                raise
+            original = self.original_path(digest, image_format)
+            os.makedirs(os.path.dirname(original), exist_ok=True)
+            os.replace(path, original)
+
+            if image is None:
+                image = UploadedImage(sha256=digest, format=image_format, width=width, height=height,
+                                      size=size, uploaded_by=uploaded_by,
+                                      variants=json.dumps(variant_urls(self.url_prefix, digest)))
+                db.session.add(image)
+            image.status, image.error = 'pending', None
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # 같은 사진이 동시에 올라온 경우 먼저 저장된 행을 사용
+                db.session.rollback()
+                uploads_total.inc(result='duplicate')
+                return db.session.get(UploadedImage, digest), False
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+
+        uploads_total.inc(result='stored')
+        self._submit(digest)
+        return image, True
+
+    def resume_pending(self):
+        """재시작 전에 끝나지 않은 변환(pending)을 다시 큐에 넣음"""
+        with self.app.app_context():
+            digests = [image.sha256 for image in
+                       UploadedImage.query.filter_by(status='pending').order_by(UploadedImage.created_at)]
+        for digest in digests:
+            self._submit(digest)
+        return len(digests)
+
+    def _submit(self, digest):
+        with self._lock:
+            if digest not in self._inflight:
+                self._inflight[digest] = self._executor.submit(self._run, digest)
+
+    def _run(self, digest):
+        try:
+            with self.app.app_context():
+                self._process(digest)
+        finally:
+            with self._lock:
+                self._inflight.pop(digest, None)
+
+    def _process(self, digest):
+        image = db.session.get(UploadedImage, digest)
+        if image is None or image.status == 'ready':
+            return
+
+        started = time.perf_counter()
+        try:
+            self._render(self.original_path(digest, image.format), self._variant_dir(digest))
+        except Exception as e:
+            processed_total.inc(result='error')
+            image.status, image.error = 'failed', str(e)[:500]
+            db.session.commit()
+            return
+        processing_seconds.observe(time.perf_counter() - started)
+        processed_total.inc(result='ok')
+
+        image.status, image.error = 'ready', None
+        image.processed_at = datetime.utcnow()
+        db.session.commit()
+
+    def _render(self, source, target_dir):
+        """원본에서 VARIANTS x OUTPUT_FORMATS 변환본을 만들어 target_dir에 저장"""
+        os.makedirs(target_dir, exist_ok=True)
+        largest = max(size for _, size, _ in VARIANTS)
+        with Image.open(source) as original:
+            # JPEG는 디코딩 단계에서 1/2, 1/4, 1/8로 줄여 읽을 수 있어 큰 사진일수록 빨라짐
+            original.draft('RGB', (largest, largest))
+            picture = ImageOps.exif_transpose(original)
+            picture = picture.convert('RGBA' if _has_alpha(picture) else 'RGB')
+
+            for name, size, crop in VARIANTS:
+                if crop:
+                    variant = ImageOps.fit(picture, (size, size), Image.LANCZOS)
+                else:
+                    variant = picture.copy()
+                    variant.thumbnail((size, size), Image.LANCZOS)
+                for fmt, pil_format, options in OUTPUT_FORMATS:
+                    output = variant
+                    if pil_format == 'JPEG' and variant.mode == 'RGBA':
+                        # JPEG는 투명도가 없으므로 흰 배경에 합성
+                        output = Image.new('RGB', variant.size, 'white')
+                        output.paste(variant, mask=variant.getchannel('A'))
+                    path = os.path.join(target_dir, f'{name}.{EXTENSIONS[fmt]}')
+                    output.save(path + '.tmp', pil_format, **options)
+                    os.replace(path + '.tmp', path)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def resolve_photos(ids, limit=5):
+    """업로드된 이미지 id(해시) 목록을 Diary.photos에 저장할 항목 목록으로 (없는/실패한 id는 제외)"""
+    if not isinstance(ids, (list, tuple)):
+        return []
+    ids = [value for value in ids if isinstance(value, str)][:limit]
+    images = {image.sha256: image for image in
+              UploadedImage.query.filter(UploadedImage.sha256.in_(ids), UploadedImage.status != 'failed')} if ids else {}
+    return [photo_entry(images[digest]) for digest in dict.fromkeys(ids) if digest in images]
+
+
+def parse_photos(value):
+    """Diary.photos JSON을 사진 항목 목록으로. 예전처럼 URL 문자열만 있으면 {'url': URL}"""
+    try:
+        photos = json.loads(value) if value else []
+    except ValueError:
+        return []
+    return [{'url': photo} if isinstance(photo, str) else photo
+            for photo in photos if isinstance(photo, (str, dict))] if isinstance(photos, list) else []
+
+
+def photo_entry(image):
+    """일기/프로필에 기록하는 사진 한 장 {id, width, height, thumb, large}"""
+    entry = {'id': image.sha256, 'width': image.width, 'height': image.height}
+    entry.update(json.loads(image.variants))
+    return entry
+
+
+def serialize_image(image):
+    result = {
+        'id': image.sha256,
+        'status': image.status,
+        'format': image.format,
+        'width': image.width,
+        'height': image.height,
+        'size': image.size,
+    }
+    if image.status != 'failed':
+        result['variants'] = json.loads(image.variants)
+    return result
@@ -0,0 +1,269 @@
+"""
+요청별 쿼리 수/지연 시간 계측
+
+METRICS_ENABLED 설정(환경변수 PETCARE_METRICS=1)을 켰을 때만 동작합니다.
+요청마다 엔드포인트, SQL 문 수, DB 시간, 템플릿 렌더링 시간, OpenAI 호출 시간을
+기록하고, 엔드포인트별 히스토그램을 /metrics 에서 Prometheus 텍스트 형식으로
+보여줍니다. /metrics 는 로컬(127.0.0.1, ::1)에서만 접근할 수 있습니다.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, abort, g, has_app_context, request
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+
+LOCAL_ADDRS = ('127.0.0.1', '::1')
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """라벨별 누적 버킷 히스토그램"""
+
+    def __init__(self, name, help_text, buckets=TIME_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total, value_sum) in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, counts):
+                    labels = _format_labels(key + (('le', _format_value(float(bound))),))
+                    lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = _format_labels(key + (('le', '+Inf'),))
+                lines.append(f'{self.name}_bucket{labels} {total}')
+                lines.append(f'{self.name}_sum{_format_labels(key)} {_format_value(value_sum)}')
+                lines.append(f'{self.name}_count{_format_labels(key)} {total}')
+        return lines
+
+
+class Counter:
+    """라벨별 단조 증가 카운터"""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._series.get(tuple(sorted(labels.items())), 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.append(f'{self.name}{_format_labels(key)} {_format_value(value)}')
+        return lines
+
+
+class Gauge:
+    """렌더링 시점에 콜백으로 값을 읽어오는 게이지"""
+
+    def __init__(self, name, help_text, callback):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} gauge']
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(key)} {_format_value(value)}')
+        return lines
+
+
+class MetricsRegistry:
+    """/metrics 에 노출할 지표 모음. 다른 모듈도 여기에 지표를 등록합니다."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def histogram(self, name, help_text, buckets=TIME_BUCKETS):
+        return self._get_or_create(name, lambda: Histogram(name, help_text, buckets))
+
+    def counter(self, name, help_text):
+        return self._get_or_create(name, lambda: Counter(name, help_text))
+
+    def gauge(self, name, help_text, callback):
+        return self._get_or_create(name, lambda: Gauge(name, help_text, callback))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    'petcare_request_duration_seconds', '요청 전체 처리 시간')
+request_sql_statements = registry.histogram(
+    'petcare_request_sql_statements', '요청당 실행된 SQL 문 수', COUNT_BUCKETS)
+request_db_seconds = registry.histogram(
+    'petcare_request_db_seconds', '요청당 SQL 실행에 쓴 시간')
+request_template_seconds = registry.histogram(
+    'petcare_request_template_seconds', '요청당 템플릿 렌더링 시간')
+request_openai_seconds = registry.histogram(
+    'petcare_request_openai_seconds', '요청당 OpenAI 호출 시간')
+
+
+class RequestMetrics:
+    """한 요청 동안 누적되는 측정값"""
+
+    __slots__ = ('started', 'sql_statements', 'db_seconds', 'template_seconds',
+                 'openai_seconds', '_template_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_statements = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.openai_seconds = 0.0
+        self._template_started = []
+
+
+def current_metrics():
+    """현재 요청의 RequestMetrics (계측이 꺼져 있거나 요청 밖이면 None)"""
+    if not has_app_context():
+        return None
+    return g.get('_request_metrics')
+
+
+@contextmanager
+def track_openai():
+    """OpenAI 호출을 감싸서 걸린 시간을 현재 요청에 더함"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.openai_seconds += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['_query_started'].pop()
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.sql_statements += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+def _handle_error(exception_context):
+    # 실패한 SQL 문은 after_cursor_execute가 호출되지 않으므로 시작 시각만 버림
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('_query_started'):
+        conn.info['_query_started'].pop()
+
+
+def _before_render_template(sender, template, context, **extra):
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics._template_started.append(time.perf_counter())
+
+
+def _template_rendered(sender, template, context, **extra):
+    metrics = current_metrics()
+    if metrics is not None and metrics._template_started:
+        metrics.template_seconds += time.perf_counter() - metrics._template_started.pop()
+
+
+def init_instrumentation(app, db):
+    """METRICS_ENABLED가 켜져 있으면 계측 훅과 /metrics 엔드포인트를 등록"""
+    if not app.config.get('METRICS_ENABLED'):
+        return False
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+    before_render_template.connect(_before_render_template, app)
+    template_rendered.connect(_template_rendered, app)
+
+    @app.before_request
+    def _start_request_metrics():
+        g._request_metrics = RequestMetrics()
+
+    @app.teardown_request
+    def _record_request_metrics(exc):
+        metrics = g.pop('_request_metrics', None)
+        if metrics is None or request.endpoint == 'metrics':
+            return
+        endpoint = request.endpoint or 'unmatched'
+        request_duration.observe(time.perf_counter() - metrics.started, endpoint=endpoint)
+        request_sql_statements.observe(metrics.sql_statements, endpoint=endpoint)
+        request_db_seconds.observe(metrics.db_seconds, endpoint=endpoint)
+        request_template_seconds.observe(metrics.template_seconds, endpoint=endpoint)
+        request_openai_seconds.observe(metrics.openai_seconds, endpoint=endpoint)
+
+    @app.route('/metrics')
+    def metrics():
+        if request.remote_addr not in LOCAL_ADDRS:
+            abort(404)
+        return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    return True
@@ -0,0 +1,278 @@
+"""
+OpenAI 호출 게이트웨이
+
+채팅, 일기 생성, 대화 요약이 모두 이 게이트웨이를 거쳐 OpenAI를 호출합니다.
+OpenAI가 느려지거나 장애가 나도 웹 워커가 함께 묶여 사이트 전체가 멈추지
+않도록 아래를 보장합니다.
+
+- 연결 풀: 하나의 HTTP 클라이언트를 재사용하고 연결 수를 동시 호출 수에 맞춤
+- 호출 기한(deadline): 재시도와 대기 시간을 포함해 호출 한 번이 넘지 않는 시간
+- 동시 호출 제한: 세마포어 슬롯을 acquire_timeout 안에 얻지 못하면 바로 실패
+- 재시도: 타임아웃/연결 오류/429/5xx만 지수 백오프(+지터)로 다시 시도
+- 서킷 브레이커: 연속 실패가 쌓이면 reset_timeout 동안 호출하지 않고 바로
+  LLMUnavailable을 발생시킴. 이후 한 번 시험 호출해서 성공하면 닫힘
+- 메트릭: petcare_llm_* (결과별 호출 수, 지연 시간, 실행 중 호출 수, 브레이커 상태)
+
+OPENAI_BASE_URL을 fake_openai.py 주소로 주면 로컬 스텁 서버로 시험할 수 있고,
+스텁의 FAKE_OPENAI_FAIL_RATE / FAKE_OPENAI_LATENCY 로 장애를 흉내 낼 수 있습니다.
+"""
+
+import random
+import threading
+import time
+
+import openai
+from openai import DEFAULT_CONNECTION_LIMITS, DefaultHttpxClient, OpenAI, Timeout
+
+from instrumentation import TIME_BUCKETS, registry, track_openai
+
+# openai가 쓰는 httpx 계열의 Limits 클래스 (openai 버전에 따라 패키지가 다름)
+# DefaultHttpxClient는 openai 1.17.0부터 있으므로 requirements.txt의 최소 버전도 1.17.0
+Limits = type(DEFAULT_CONNECTION_LIMITS)
+
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+FALLBACK_REPLIES = (
+    '{name}(이)가 지금 낮잠 자는 중이에요... 💤 조금 있다가 다시 불러주세요!',
+    '킁킁, {name}(이)가 잠깐 산책 나갔어요. 🐾 금방 돌아올게요!',
+    '{name}(이)가 밥 먹느라 바빠요! 🍚 잠시 후에 다시 이야기해요.',
+)
+
+llm_calls = registry.counter(
+    'petcare_llm_calls_total', 'LLM 호출 수 (purpose, result=ok/error/retry/busy/circuit_open)')
+llm_latency = registry.histogram(
+    'petcare_llm_latency_seconds', 'LLM 호출 한 번(재시도 포함)에 걸린 시간',
+    TIME_BUCKETS + (20.0, 30.0))
+
+
+class LLMUnavailable(Exception):
+    """서킷이 열려 있거나, 동시 호출이 가득 찼거나, 재시도를 모두 실패함"""
+
+
+class LLMRejected(LLMUnavailable):
+    """OpenAI를 호출해 보지도 않고 거절함 (서킷 열림, 동시 호출 가득). retry_after: 다시 해볼 만한 초"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def fallback_reply(name):
+    """OpenAI를 쓸 수 없을 때 보여줄 반려동물 말투의 고정 답변"""
+    return random.choice(FALLBACK_REPLIES).format(name=name)
+
+
+class CircuitBreaker:
+    """연속 실패 failure_threshold번이면 열리고, reset_timeout초 뒤 시험 호출 1번을 허용"""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+            # 반쯤 열림: 시험 호출은 한 번에 하나만
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def retry_after(self):
+        """열려 있으면 시험 호출을 허용할 때까지 남은 초, 아니면 0"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def cancel_trial(self):
+        """결과를 알 수 없이 끝난 시험 호출(중단된 스트림 등)의 자리를 돌려줌"""
+        with self._lock:
+            self._trial_running = False
+
+
+class LLMGateway:
+    """
+    timeout: 시도 한 번의 읽기 타임아웃(초), connect_timeout: 연결 타임아웃(초)
+    deadline: 재시도를 포함한 호출 전체의 기본 기한(초)
+    max_concurrency: 동시에 OpenAI로 나가는 호출 수 (연결 풀 크기도 같음)
+    acquire_timeout: 슬롯을 기다리는 최대 시간(초)
+    max_retries: 재시도 횟수, backoff_base/backoff_max: 지수 백오프 시작/최대 대기(초)
+    """
+
+    def __init__(self, api_key, base_url=None, model='gpt-3.5-turbo', timeout=20.0,
+                 connect_timeout=3.0, deadline=45.0, max_concurrency=8, acquire_timeout=2.0,
+                 max_retries=2, backoff_base=0.5, backoff_max=4.0, breaker=None):
+        self.model = model
+        self.timeout = timeout
+        self.deadline = deadline
+        self.acquire_timeout = acquire_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight_lock = threading.Lock()
+        self.in_flight = 0
+        # 재시도는 게이트웨이가 직접 하므로 SDK 자체 재시도는 끔
+        self.client = OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=DefaultHttpxClient(
+                timeout=Timeout(timeout, connect=connect_timeout),
+                limits=Limits(max_connections=max_concurrency,
+                              max_keepalive_connections=max_concurrency)
+            )
+        )
+
+        registry.gauge('petcare_llm_in_flight', '실행 중인 LLM 호출 수', lambda: self.in_flight)
+        registry.gauge('petcare_llm_circuit_open', 'LLM 서킷 브레이커 상태 (0=닫힘, 1=열림, 0.5=시험 중)',
+                       lambda: {'closed': 0, 'open': 1, 'half_open': 0.5}[self.breaker.state])
+
+    def complete(self, messages, max_tokens=500, temperature=0.7, purpose='chat', deadline=None):
+        """응답 본문 문자열을 반환. 쓸 수 없으면 LLMUnavailable"""
+        expires_at = time.monotonic() + (deadline or self.deadline)
+        started = time.perf_counter()
+        self._acquire(purpose)
+        try:
+            with track_openai():
+                response = self._with_retries(purpose, expires_at, lambda remaining: (
+                    self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        timeout=remaining
+                    )
+                ))
+            llm_calls.inc(purpose=purpose, result='ok')
+            return response.choices[0].message.content
+        finally:
+            self._release()
+            llm_latency.observe(time.perf_counter() - started, purpose=purpose)
+
+    def stream(self, messages, max_tokens=500, temperature=0.7, purpose='chat', deadline=None):
+        """
+        토큰 조각을 차례로 내보내는 제너레이터.
+        재시도는 첫 토큰을 받기 전까지만 하고, 스트림 도중 끊기면 예외를 그대로 올림.
+        """
+        expires_at = time.monotonic() + (deadline or self.deadline)
+        started = time.perf_counter()
+        self._acquire(purpose)
+        finished = False
+        try:
+            with track_openai():
+                stream = self._with_retries(purpose, expires_at, lambda remaining: (
+                    self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        stream=True,
+                        timeout=remaining
+                    )
+                ), record_success=False)
+                try:
+                    for chunk in stream:
+                        if time.monotonic() > expires_at:
+                            raise openai.APITimeoutError(request=None)
+                        if not chunk.choices:
+                            continue
+                        token = chunk.choices[0].delta.content
+                        if token:
+                            yield token
+                except RETRYABLE_ERRORS:
+                    self.breaker.record_failure()
+                    llm_calls.inc(purpose=purpose, result='error')
+                    raise
+                finally:
+                    stream.close()
+            self.breaker.record_success()
+            llm_calls.inc(purpose=purpose, result='ok')
+            finished = True
+        finally:
+            if not finished:
+                # 클라이언트가 중간에 연결을 끊는 등 결과를 모르고 끝난 경우
+                self.breaker.cancel_trial()
+            self._release()
+            llm_latency.observe(time.perf_counter() - started, purpose=purpose)
+
+    def _acquire(self, purpose):
+        if not self.breaker.allow():
+            llm_calls.inc(purpose=purpose, result='circuit_open')
+            raise LLMRejected('LLM 서킷이 열려 있습니다.', retry_after=self.breaker.retry_after())
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            self.breaker.cancel_trial()
+            llm_calls.inc(purpose=purpose, result='busy')
+            raise LLMRejected('동시 LLM 호출이 너무 많습니다.')
+        with self._in_flight_lock:
+            self.in_flight += 1
+
+    def _release(self):
+        with self._in_flight_lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _with_retries(self, purpose, expires_at, call, record_success=True):
+        attempt = 0
+        while True:
+            remaining = expires_at - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise openai.APITimeoutError(request=None)
+                result = call(min(remaining, self.timeout))
+            except RETRYABLE_ERRORS as e:
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                delay = random.uniform(delay / 2, delay)
+                attempt += 1
+                if attempt > self.max_retries or time.monotonic() + delay >= expires_at:
+                    self.breaker.record_failure()
+                    llm_calls.inc(purpose=purpose, result='error')
+                    raise LLMUnavailable('LLM 호출에 실패했습니다.') from e
+                llm_calls.inc(purpose=purpose, result='retry')
+                time.sleep(delay)
+                continue
+            except openai.APIStatusError:
+                # 잘못된 요청(400 등)은 서버가 응답한 것이므로 장애로 치지 않음
+                self.breaker.record_success()
+                llm_calls.inc(purpose=purpose, result='error')
+                raise
+            except Exception:
+                self.breaker.cancel_trial()
+                llm_calls.inc(purpose=purpose, result='error')
+                raise
+            if record_success:
+                self.breaker.record_success()
+            return result
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+데이터베이스 스키마 마이그레이션
+
+db.create_all()은 없는 테이블만 만들고 기존 테이블에 컬럼/인덱스를 더하지
+않으므로, 이미 운영 중인 DB는 이 모듈로 버전을 올립니다.
+
+사용법:
+    python migrations.py            # 밀린 마이그레이션 적용
+    python migrations.py --status   # 현재 버전과 적용할 마이그레이션 확인
+
+- 적용한 버전은 schema_version 테이블에 기록합니다.
+- 새 DB는 create_all()로 최신 스키마를 만든 뒤, 모델 밖의 객체(검색 색인 등)를
+  만드는 단계만 실제로 적용되고 나머지는 건너뛴 채 기록됩니다.
+- 각 마이그레이션은 한 트랜잭션으로 실행되고, 이미 반영된 컬럼/인덱스는
+  건너뛰므로 버전 기록이 없는 기존 DB에도 안전하게 적용됩니다.
+- 스키마를 바꿀 때는 models.py를 고치고 MIGRATIONS 끝에 단계를 추가하세요.
+"""
+
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+
+import geo
+import reviews
+import search
+from models import db
+
+# 모델과 함께 drop_all/create_all 되지 않도록 별도 메타데이터에 둠
+schema_version = Table(
+    'schema_version', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+def _columns(conn, table):
+    return {column['name'] for column in inspect(conn).get_columns(table)}
+
+
+def _add_column(conn, table, column, constraints=''):
+    """models.py에 선언된 컬럼 타입으로 컬럼을 (없으면) 추가"""
+    if column in _columns(conn, table):
+        return False
+    column_type = db.metadata.tables[table].c[column].type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {column_type} {constraints}'.rstrip()))
+    return True
+
+
+def _create_indexes(conn, *names):
+    """models.py에 선언된 인덱스 중 이름이 names인 것을 (없으면) 생성"""
+    existing = {}
+    for table in db.metadata.sorted_tables:
+        existing[table.name] = {index['name'] for index in inspect(conn).get_indexes(table.name)}
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in names and index.name not in existing[table.name]:
+                index.create(conn)
+
+
+def _baseline(conn):
+    """처음 배포된 스키마 (create_all로 만들어진 테이블)"""
+
+
+def _comment_count(conn):
+    if _add_column(conn, 'community_post', 'comment_count', 'NOT NULL DEFAULT 0'):
+        conn.execute(text(
+            'UPDATE community_post SET comment_count = '
+            '(SELECT COUNT(*) FROM comment WHERE comment.post_id = community_post.id)'
+        ))
+
+
+def _pet_updated_at(conn):
+    if _add_column(conn, 'pet', 'updated_at'):
+        conn.execute(text('UPDATE pet SET updated_at = created_at'))
+
+
+def _hot_path_indexes(conn):
+    # 이전 버전의 likes 단일 컬럼 인덱스는 (likes, created_at) 인덱스로 바꿈
+    likes_index = next((index for index in inspect(conn).get_indexes('community_post')
+                        if index['name'] == 'ix_community_post_likes'), None)
+    if likes_index is not None and likes_index['column_names'] != ['likes', 'created_at']:
+        conn.execute(text('DROP INDEX ix_community_post_likes'))
+
+    _create_indexes(
+        conn,
+        'ix_pet_user',
+        'ix_diary_pet_created',
+        'ix_diary_public_likes',
+        'ix_diary_job_status',
+        'ix_community_post_created',
+        'ix_community_post_tag_created',
+        'ix_community_post_likes',
+        'ix_community_post_views',
+        'ix_community_post_comments',
+        'ix_comment_post_parent',
+        'ix_comment_parent',
+        'ix_health_record_pet_created',
+        'ix_care_routine_pet',
+        'ix_chat_log_pet_created',
+    )
+
+
+def _search_index(conn):
+    # FTS5는 SQLite 전용. 다른 DB에서는 search.py가 LIKE 검색으로 대신함
+    if conn.dialect.name == 'sqlite':
+        search.create_index(conn)
+
+
+def _place_rtree(conn):
+    # R*Tree도 SQLite 전용. 다른 DB에서는 geo.py가 위경도 범위 조건으로 대신함
+    if conn.dialect.name == 'sqlite':
+        geo.create_index(conn)
+
+
+def _place_ratings(conn):
+    columns = ['review_count', 'rating_sum', 'rating_avg'] + [f'rating_{r}' for r in reviews.RATINGS]
+    added = [_add_column(conn, 'place', column, 'NOT NULL DEFAULT 0') for column in columns]
+    _create_indexes(conn, 'ix_place_rating', 'ix_place_category_rating', 'ix_place_review_place_created')
+    if any(added):
+        reviews.reconcile(conn)
+
+
+def _feed_sync_keys(conn):
+    for table in ('place', 'travel_destination'):
+        for column in ('source', 'external_id', 'synced_at'):
+            _add_column(conn, table, column)
+    _create_indexes(conn, 'ux_place_source_external', 'ux_travel_destination_source_external')
+
+
+def _uploaded_images(conn):
+    db.metadata.tables['uploaded_image'].create(conn, checkfirst=True)
+    _add_column(conn, 'diary_job', 'photos')
+
+
+def _diary_job_claims(conn):
+    for column in ('next_attempt_at', 'claimed_by', 'claimed_at'):
+        _add_column(conn, 'diary_job', column)
+
+
+# (버전, 설명, 함수) - 순서대로 적용
+MIGRATIONS = [
+    (1, '기본 스키마', _baseline),
+    (2, '게시글 댓글 수 컬럼 (community_post.comment_count)', _comment_count),
+    (3, '페르소나 캐시 버전 컬럼 (pet.updated_at)', _pet_updated_at),
+    (4, '자주 쓰는 조회 경로 인덱스', _hot_path_indexes),
+    (5, '게시글/공개 일기 전문 검색 색인 (search_index)', _search_index),
+    (6, '장소 위치 검색 R*Tree (place_rtree)', _place_rtree),
+    (7, '장소 평점 집계 컬럼 (place.review_count, rating_*)', _place_ratings),
+    (8, '외부 API 동기화 키 (place/travel_destination.source, external_id)', _feed_sync_keys),
+    (9, '업로드 이미지와 변환본 (uploaded_image, diary_job.photos)', _uploaded_images),
+    (10, '일기 작업 재시도 시각과 점유 (diary_job.next_attempt_at, claimed_by, claimed_at)', _diary_job_claims),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    if not inspect(conn).has_table('schema_version'):
+        return 0
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def pending_migrations(conn):
+    version = current_version(conn)
+    return [migration for migration in MIGRATIONS if migration[0] > version]
+
+
+def migrate(verbose=True):
+    """밀린 마이그레이션을 적용하고 적용한 버전 목록을 반환 (앱 컨텍스트 안에서 호출)"""
+    engine = db.engine
+
+    # 없는 테이블은 create_all로 만들고, 기존 테이블 변경은 마이그레이션으로
+    db.create_all()
+    schema_version.create(engine, checkfirst=True)
+
+    applied = []
+    with engine.connect() as conn:
+        pending = pending_migrations(conn)
+
+    # 이미 반영된 컬럼/인덱스는 건너뛰므로 새 DB에도 그대로 실행
+    for version, description, upgrade in pending:
+        with engine.begin() as conn:
+            upgrade(conn)
+            conn.execute(schema_version.insert().values(version=version, description=description))
+        applied.append(version)
+        if verbose:
+            print(f"🔧 마이그레이션 {version}: {description}")
+    return applied
+
+
+def main():
+    from app import app
+
+    with app.app_context():
+        if '--status' in sys.argv:
+            with db.engine.connect() as conn:
+                version = current_version(conn)
+                pending = pending_migrations(conn) if inspect(conn).has_table('user') else []
+            print(f"📋 현재 스키마 버전: {version} (최신 {LATEST_VERSION})")
+            for number, description, _ in pending:
+                print(f"   - {number}: {description}")
+            return
+
+        applied = migrate()
+        print(f"✅ 스키마 버전 {LATEST_VERSION} ({len(applied)}개 적용)")
+
+
+if __name__ == '__main__':
+    main()
@@ -44,6 +44,7 @@ class Pet(db.Model):
     other_info = db.Column(db.Text)  # 기타 정보
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # 페르소나 캐시 버전
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
     # 관계
@@ -51,6 +52,9 @@ class Pet(db.Model):
     health_records = db.relationship('HealthRecord', backref='pet', lazy=True, cascade='all, delete-orphan')
     care_routines = db.relationship('CareRoutine', backref='pet', lazy=True, cascade='all, delete-orphan')
     chat_logs = db.relationship('ChatLog', backref='pet', lazy=True, cascade='all, delete-orphan')
+    chat_summary = db.relationship('ChatSummary', backref='pet', uselist=False, cascade='all, delete-orphan')
+    
+    __table_args__ = (db.Index('ix_pet_user', 'user_id'),)
 
 class Diary(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -68,6 +72,38 @@ class Diary(db.Model):
     
     # 관계
     diary_likes = db.relationship('DiaryLike', backref='diary', lazy=True, cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('ix_diary_pet_created', 'pet_id', 'created_at'),  # 반려동물별 일기 목록
+        db.Index('ix_diary_public_likes', 'is_public', 'likes', 'created_at'),  # 인기 일기
+    )
+
+class DiaryJob(db.Model):
+    """AI 일기 생성 작업 - 재시작해도 이어서 처리할 수 있도록 상태를 DB에 저장"""
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    title = db.Column(db.String(200), nullable=False)
+    content_summary = db.Column(db.Text, nullable=False)
+    weather = db.Column(db.String(50))
+    photos = db.Column(db.Text)  # 일기에 옮길 사진 목록 (images.resolve_photos 결과 JSON)
+    is_public = db.Column(db.Boolean, default=False)
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime)  # 실패 후 다시 시도할 수 있는 시각 (백오프)
+    claimed_by = db.Column(db.String(64))  # 처리를 맡은 프로세스 (호스트:pid)
+    claimed_at = db.Column(db.DateTime)  # 맡은 시각. lease초가 지나면 다른 프로세스가 가져갈 수 있음
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    pet_id = db.Column(db.Integer, db.ForeignKey('pet.id'), nullable=False)
+    diary_id = db.Column(db.Integer, db.ForeignKey('diary.id'))
+    
+    # 관계
+    pet = db.relationship('Pet')
+    diary = db.relationship('Diary')
+    
+    # 끝나지 않은 작업 찾기 (diary_jobs.claimable_jobs)
+    __table_args__ = (db.Index('ix_diary_job_status', 'status', 'created_at'),)
 
 class DiaryLike(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -84,6 +120,7 @@ class CommunityPost(db.Model):
     tag = db.Column(db.String(50))  # 태그 (산책해요, 꿀팁 등)
     likes = db.Column(db.Integer, default=0)
     views = db.Column(db.Integer, default=0)
+    comment_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # 댓글 작성/삭제 시 함께 갱신
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -92,6 +129,15 @@ class CommunityPost(db.Model):
     # 관계
     comments = db.relationship('Comment', backref='post', lazy=True, cascade='all, delete-orphan')
     post_likes = db.relationship('PostLike', backref='post', lazy=True, cascade='all, delete-orphan')
+    
+    # 피드 정렬 기준별 (정렬 컬럼, created_at) 인덱스. id는 SQLite rowid로 뒤에 붙음
+    __table_args__ = (
+        db.Index('ix_community_post_created', 'created_at'),
+        db.Index('ix_community_post_tag_created', 'tag', 'created_at'),
+        db.Index('ix_community_post_likes', 'likes', 'created_at'),
+        db.Index('ix_community_post_views', 'views', 'created_at'),
+        db.Index('ix_community_post_comments', 'comment_count', 'created_at'),
+    )
 
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -106,6 +152,12 @@ class Comment(db.Model):
     
     # 관계
     replies = db.relationship('Comment', backref=db.backref('parent', remote_side=[id]), lazy=True)
+    comment_likes = db.relationship('CommentLike', backref='comment', lazy=True, cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('ix_comment_post_parent', 'post_id', 'parent_id'),  # 게시글의 댓글 목록
+        db.Index('ix_comment_parent', 'parent_id'),  # 대댓글 찾기
+    )
 
 class PostLike(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -115,6 +167,14 @@ class PostLike(db.Model):
     
     __table_args__ = (db.UniqueConstraint('user_id', 'post_id', name='unique_user_post_like'),)
 
+class CommentLike(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    comment_id = db.Column(db.Integer, db.ForeignKey('comment.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.UniqueConstraint('user_id', 'comment_id', name='unique_user_comment_like'),)
+
 class HealthRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     record_type = db.Column(db.String(50), nullable=False)  # 알러지, 질병, 수술 등
@@ -124,6 +184,8 @@ class HealthRecord(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     pet_id = db.Column(db.Integer, db.ForeignKey('pet.id'), nullable=False)
+    
+    __table_args__ = (db.Index('ix_health_record_pet_created', 'pet_id', 'created_at'),)
 
 class CareRoutine(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -137,6 +199,8 @@ class CareRoutine(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     pet_id = db.Column(db.Integer, db.ForeignKey('pet.id'), nullable=False)
+    
+    __table_args__ = (db.Index('ix_care_routine_pet', 'pet_id'),)
 
 class ChatLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -145,6 +209,20 @@ class ChatLog(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     pet_id = db.Column(db.Integer, db.ForeignKey('pet.id'), nullable=False)
+    
+    # 최근 대화 조회용 (pet_id로 거르고 created_at 역순 정렬)
+    __table_args__ = (db.Index('ix_chat_log_pet_created', 'pet_id', 'created_at'),)
+
+class ChatSummary(db.Model):
+    """오래된 대화를 접어 둔 반려동물별 누적 요약"""
+    id = db.Column(db.Integer, primary_key=True)
+    summary = db.Column(db.Text, nullable=False, default='')
+    summarized_until_id = db.Column(db.Integer, nullable=False, default=0)  # 요약에 반영된 마지막 ChatLog.id
+    folded_turns = db.Column(db.Integer, nullable=False, default=0)
+    folded_tokens = db.Column(db.Integer, nullable=False, default=0)  # 요약으로 접힌 대화의 원래 토큰 수
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    pet_id = db.Column(db.Integer, db.ForeignKey('pet.id'), nullable=False, unique=True)
 
 class Place(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -159,8 +237,30 @@ class Place(db.Model):
     pet_friendly = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # 리뷰 집계 (리뷰 작성/수정/삭제 시 reviews.py에서 함께 갱신, 매일 reviews.py로 재검증)
+    review_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_avg = db.Column(db.Float, default=0, server_default='0', nullable=False)
+    rating_1 = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # 1~5점별 리뷰 수
+    rating_2 = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_3 = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_4 = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_5 = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    
+    # 외부 API에서 가져온 장소 (feed_sync.py). 직접 등록한 장소는 비어 있음
+    source = db.Column(db.String(50))
+    external_id = db.Column(db.String(100))
+    synced_at = db.Column(db.DateTime)
+    
     # 관계
     reviews = db.relationship('PlaceReview', backref='place', lazy=True, cascade='all, delete-orphan')
+    
+    # 평점순 목록 (전체 / 카테고리별), 외부 데이터 upsert 키
+    __table_args__ = (
+        db.Index('ix_place_rating', 'rating_avg', 'review_count'),
+        db.Index('ix_place_category_rating', 'category', 'rating_avg', 'review_count'),
+        db.Index('ux_place_source_external', 'source', 'external_id', unique=True),
+    )
 
 class PlaceReview(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -170,6 +270,10 @@ class PlaceReview(db.Model):
     
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     place_id = db.Column(db.Integer, db.ForeignKey('place.id'), nullable=False)
+    
+    author = db.relationship('User')
+    
+    __table_args__ = (db.Index('ix_place_review_place_created', 'place_id', 'created_at'),)
 
 class TravelDestination(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -182,4 +286,30 @@ class TravelDestination(db.Model):
     pet_policies = db.Column(db.Text)  # 반려동물 동반 정책
     facilities = db.Column(db.Text)  # 시설 정보
     activities = db.Column(db.Text)  # 가능한 활동
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # 외부 API에서 가져온 여행지 (feed_sync.py). 직접 등록한 여행지는 비어 있음
+    source = db.Column(db.String(50))
+    external_id = db.Column(db.String(100))
+    synced_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ux_travel_destination_source_external', 'source', 'external_id', unique=True),
+    )
+
+class UploadedImage(db.Model):
+    """업로드한 이미지 - 내용 해시(SHA-256)로 중복을 없애고 변환본 URL을 기록 (images.py)"""
+    sha256 = db.Column(db.String(64), primary_key=True)
+    format = db.Column(db.String(10), nullable=False)  # 원본 형식: JPEG, PNG, WEBP, GIF
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # 원본 바이트 수
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, ready, failed
+    variants = db.Column(db.Text)  # JSON {크기: {webp: URL, jpeg: URL}}
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    
+    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    
+    __table_args__ = (db.Index('ix_uploaded_image_status', 'status', 'created_at'),)
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""
+페이지 HTTP 조건부 캐시와 렌더링 조각(fragment) 캐시
+
+index(), community(), places(), travel()은 로그인하지 않은 방문자에게 모두 같은
+HTML을 보여주는데도 매번 Jinja 템플릿 전체를 렌더링합니다.
+
+콘텐츠 버전
+    ContentVersions가 범위('diary', 'post')마다 임의의 토큰과 바뀐 시각을 들고
+    있습니다. Diary/CommunityPost/Comment 등이 바뀌어 커밋되거나 좋아요 수가
+    바뀌면(counters.like_listeners) 해당 범위의 토큰을 새로 만듭니다.
+    조회수는 자주 바뀌므로 버전을 올리지 않고, 캐시 TTL만큼 늦게 보일 수 있습니다.
+    (조회수 반영은 updated_at도 그대로 두므로 content_fingerprint도 바꾸지 않습니다.)
+
+페이지 (PageCache.cached_page)
+    - 로그인하지 않은 GET 요청은 경로, 쿼리스트링, 콘텐츠 버전, 템플릿 배포 시각으로
+      약한 ETag와 Last-Modified를 만들고, If-None-Match/If-Modified-Since가 맞으면
+      렌더링 없이 304를 돌려줍니다. 렌더링한 HTML도 ETag별로 저장해 재사용합니다.
+    - 라우트마다 Cache-Control max-age를 정하고, 로그인 여부에 따라 내용이 다르므로
+      Vary: Cookie를 붙입니다. 로그인한 사용자에게는 private, no-cache를 보냅니다.
+
+조각 (PageCache.fragment)
+    인기 목록, 게시글 카드처럼 로그인한 사용자에게도 보여주는 부분은 (이름, 키)로
+    렌더링 결과를 캐시합니다. 키에 콘텐츠 버전을 넣으므로 글이 바뀌면 자연히
+    새 키가 되고, 옛 항목은 LRU/TTL로 밀려납니다. 사용자마다 달라지는 부분
+    (내 글의 수정 메뉴 등)이 있으면 키에 사용자 id를 넣습니다.
+
+백엔드는 cache_backends.make_backend()로 고릅니다. 렌더링 결과(페이지, 조각)는
+TTL(PAGE_CACHE_TTL초)이 지나면 사라지지만, 콘텐츠 버전은 만료시키지 않습니다.
+버전이 TTL마다 새로 만들어지면 내용이 그대로여도 ETag가 바뀌어 304를 받을 수 없기
+때문입니다. PAGE_CACHE_URL에 redis:// 주소를 주면 워커끼리 버전과 조각을 공유하고,
+기본인 프로세스 안의 LRU에서는 다른 워커에서 한 변경을 알 수 없으므로 범위마다
+PAGE_CACHE_VERSION_CHECK초에 한 번 content_fingerprint(행 수, 최대 id, 최근 수정
+시각을 SELECT 한 번으로)를 확인해서 달라졌을 때만 버전을 올립니다.
+"""
+
+import hashlib
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, make_response, request, session
+from flask_login import current_user
+from markupsafe import Markup
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from instrumentation import registry
+from models import db, Diary, CommunityPost, Comment, Pet, User
+
+page_requests = registry.counter(
+    'petcare_page_cache_requests_total', '페이지 캐시 처리 수 (result=not_modified/hit/miss/bypass)')
+fragment_lookups = registry.counter(
+    'petcare_fragment_cache_lookups_total', '조각 캐시 조회 수 (fragment, result=hit/miss)')
+
+# 바뀌면 해당 범위의 콘텐츠 버전을 올릴 모델
+SCOPES = {
+    Diary: ('diary',),
+    Pet: ('diary',),  # 인기 일기의 작성자 표시가 반려동물 이름
+    CommunityPost: ('post',),
+    Comment: ('post',),  # 게시글 카드의 댓글 수
+    User: ('post',),  # 게시글 카드의 작성자 닉네임
+}
+
+# counters.LIKE_TARGETS 종류 -> 범위
+LIKE_SCOPES = {'diary': 'diary', 'post': 'post', 'comment': 'post'}
+
+# 범위 -> 내용이 바뀌었는지 알아볼 집계 (좋아요/댓글 수 갱신은 updated_at을 바꾸고, 조회수 반영은 바꾸지 않음)
+FINGERPRINT_COLUMNS = {
+    'diary': (func.count(Diary.id), func.max(Diary.id), func.max(Diary.updated_at),
+              func.max(Pet.updated_at)),
+    'post': (func.count(CommunityPost.id), func.max(CommunityPost.id), func.max(CommunityPost.updated_at),
+             func.count(Comment.id), func.max(Comment.updated_at)),
+}
+
+
+def _digest(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:20]
+
+
+def template_stamp(template_folder):
+    """템플릿 중 가장 최근에 바뀐 시각 (배포가 바뀌면 ETag도 바뀌도록)"""
+    latest = 0.0
+    for root, _, files in os.walk(template_folder):
+        for name in files:
+            latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+    return int(latest)
+
+
+def content_fingerprint(scope):
+    """범위의 내용이 바뀌면 달라지는 값 (다른 워커에서 한 변경을 알아채는 용도)"""
+    columns = [select(column).scalar_subquery() for column in FINGERPRINT_COLUMNS[scope]]
+    return tuple(db.session.execute(select(*columns)).one())
+
+
+class ContentVersions:
+    """
+    범위 -> (토큰, 바뀐 시각). 백엔드는 get/set/delete를 가진 캐시 저장소
+    fingerprint(scope): 주면 check_interval초마다 확인해서 달라졌을 때 버전을 올림
+    """
+
+    def __init__(self, backend, fingerprint=None, check_interval=60):
+        self.backend = backend
+        self.fingerprint = fingerprint
+        self.check_interval = check_interval
+        self._checked = {}  # 범위 -> (확인한 시각, 지문). 이 프로세스에서만
+
+    def get(self, scope):
+        value = self.backend.get(f'version:{scope}')
+        if value is None:
+            # 처음이거나 LRU에서 밀려났으면 새 버전으로 시작 (캐시된 조각은 새로 렌더링)
+            value = self._bump(scope)
+        elif self.fingerprint is not None:
+            value = self._check(scope, value)
+        return value[0], value[1]
+
+    def bump(self, *scopes):
+        for scope in scopes:
+            self._bump(scope)
+
+    def _bump(self, scope, fingerprint=None):
+        value = [uuid.uuid4().hex[:12], int(time.time())]
+        # 만료시키면 내용이 그대로여도 토큰이 바뀌어 ETag가 TTL마다 달라지므로 TTL 없이 저장
+        self.backend.set(f'version:{scope}', value, ttl=0)
+        self._checked[scope] = (time.monotonic(), fingerprint)
+        return value
+
+    def _check(self, scope, value):
+        checked_at, known = self._checked.get(scope, (0.0, None))
+        if time.monotonic() - checked_at < self.check_interval:
+            return value
+        current = self.fingerprint(scope)
+        if current == known:
+            self._checked[scope] = (time.monotonic(), current)
+            return value
+        # 다른 워커에서 바뀜 (이 프로세스에서 올린 직후라 지문을 모를 때도 한 번 올림)
+        return self._bump(scope, current)
+
+    def on_likes_changed(self, kind, target_id, likes):
+        """좋아요 수가 바뀐 글의 범위 버전을 올림 (counters.like_listeners에 등록)"""
+        if kind in LIKE_SCOPES:
+            self.bump(LIKE_SCOPES[kind])
+
+    def watch(self):
+        """SCOPES 모델이 바뀌어 커밋되면 해당 범위 버전을 올리도록 세션 이벤트 등록"""
+        event.listen(Session, 'after_flush', _collect_changed_scopes)
+        event.listen(Session, 'after_commit', self._bump_committed)
+        event.listen(Session, 'after_rollback', _discard_changed_scopes)
+
+    def _bump_committed(self, session):
+        self.bump(*session.info.pop('_changed_content_scopes', ()))
+
+
+def _collect_changed_scopes(session, flush_context):
+    # 커밋 전에 올리면 다른 요청이 옛 내용을 새 버전으로 캐시할 수 있으므로 모아만 둠
+    changed = session.info.setdefault('_changed_content_scopes', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        changed.update(SCOPES.get(type(obj), ()))
+
+
+def _discard_changed_scopes(session):
+    session.info.pop('_changed_content_scopes', None)
+
+
+def _not_modified(etag, last_modified):
+    # If-None-Match가 있으면 그것만 보고, 없을 때만 If-Modified-Since를 봄 (RFC 9110)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    return request.if_modified_since is not None and request.if_modified_since >= last_modified
+
+
+class PageCache:
+    """
+    backend: 렌더링 결과를 저장할 캐시 저장소, versions: ContentVersions
+    stamp: 템플릿 배포 시각 (template_stamp)
+    """
+
+    def __init__(self, backend, versions, stamp):
+        self.backend = backend
+        self.versions = versions
+        self.stamp = stamp
+
+    def fragment(self, name, key, render):
+        """(name, key)로 캐시된 HTML 조각. 없으면 render()로 만들어 저장"""
+        cache_key = f'fragment:{name}:{_digest(key)}'
+        html = self.backend.get(cache_key)
+        if html is None:
+            fragment_lookups.inc(fragment=name, result='miss')
+            html = str(render())
+            self.backend.set(cache_key, html)
+        else:
+            fragment_lookups.inc(fragment=name, result='hit')
+        return Markup(html)
+
+    def version_key(self, *scopes):
+        """범위들의 현재 버전 토큰 (조각 키에 넣음)"""
+        return tuple(self.versions.get(scope)[0] for scope in scopes)
+
+    def validators(self, scopes, extra=()):
+        """현재 요청의 (ETag 값, Last-Modified)"""
+        versions = [self.versions.get(scope) for scope in scopes]
+        etag = _digest(request.path, sorted(request.args.items(multi=True)),
+                       [token for token, _ in versions], extra, self.stamp)
+        modified = max([self.stamp] + [updated for _, updated in versions])
+        return etag, datetime.fromtimestamp(modified, timezone.utc)
+
+    def cached_page(self, scopes=(), max_age=0, key=None):
+        """
+        로그인하지 않은 GET 요청에 ETag/Last-Modified/304와 렌더링 결과 캐시를 적용.
+        scopes: 페이지 내용이 따르는 콘텐츠 범위, max_age: 브라우저/프록시 캐시 시간(초)
+        key: 버전 외에 내용을 정하는 값을 돌려주는 함수 (예: 순위표 상위 항목)
+        """
+        cache_control = f'public, max-age={max_age}' if max_age else 'public, no-cache'
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if (request.method != 'GET' or current_user.is_authenticated
+                        or session.get('_flashes')):
+                    page_requests.inc(result='bypass')
+                    response = make_response(view(*args, **kwargs))
+                    response.headers['Cache-Control'] = 'private, no-cache'
+                    response.vary.add('Cookie')
+                    return response
+
+                etag, last_modified = self.validators(scopes, key() if key else ())
+                if _not_modified(etag, last_modified):
+                    page_requests.inc(result='not_modified')
+                    response = Response(status=304)
+                else:
+                    body = self.backend.get(f'page:{etag}')
+                    if body is not None:
+                        page_requests.inc(result='hit')
+                        response = Response(body, mimetype='text/html')
+                    else:
+                        page_requests.inc(result='miss')
+                        response = make_response(view(*args, **kwargs))
+                        if response.status_code != 200:
+                            return response
+                        self.backend.set(f'page:{etag}', response.get_data(as_text=True))
+
+                response.set_etag(etag, weak=True)
+                response.last_modified = last_modified
+                response.headers['Cache-Control'] = cache_control
+                response.vary.add('Cookie')
+                return response
+            return wrapper
+        return decorator
@@ -0,0 +1,152 @@
+"""
+커뮤니티 피드 키셋(커서) 페이지네이션
+
+OFFSET 대신 마지막으로 본 게시글의 정렬 키 (정렬 컬럼, created_at, id)를
+커서로 넘겨서 다음 페이지를 가져옵니다. 테이블이 아무리 커져도 한 페이지를
+가져오는 비용은 페이지 크기만큼만 듭니다.
+"""
+
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import or_, tuple_
+from sqlalchemy.orm import joinedload
+
+from models import CommunityPost
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+SORT_OPTIONS = ('latest', 'popular', 'comments', 'views')
+
+FeedPage = namedtuple('FeedPage', ['items', 'next_cursor'])
+
+
+class InvalidCursor(ValueError):
+    """커서 문자열을 해석할 수 없을 때 발생"""
+
+
+def encode_cursor(values):
+    """정렬 키 값 목록을 URL에 안전한 문자열로 변환"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """커서 문자열을 정렬 키 값 목록으로 복원"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        expected = 2 if sort == 'latest' else 3
+        if not isinstance(values, list) or len(values) != expected:
+            raise InvalidCursor(cursor)
+        # 마지막 두 값은 항상 (created_at, id)
+        values[-2] = datetime.fromisoformat(values[-2])
+        values[-1] = int(values[-1])
+        if expected == 3:
+            values[0] = int(values[0])
+        return values
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def _sort_columns(sort):
+    """정렬 방식별 키셋 컬럼 (모두 내림차순)"""
+    if sort == 'popular':
+        return [CommunityPost.likes, CommunityPost.created_at, CommunityPost.id]
+    if sort == 'views':
+        return [CommunityPost.views, CommunityPost.created_at, CommunityPost.id]
+    if sort == 'comments':
+        return [CommunityPost.comment_count, CommunityPost.created_at, CommunityPost.id]
+    return [CommunityPost.created_at, CommunityPost.id]
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def parse_feed_args(args):
+    """요청 쿼리스트링에서 피드 필터(tag, q, sort, cursor, limit)를 추출"""
+    tag = (args.get('tag') or '').strip()
+    if tag == 'all':
+        tag = ''
+    sort = args.get('sort', 'latest')
+    if sort not in SORT_OPTIONS:
+        sort = 'latest'
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    return {
+        'tag': tag,
+        'q': (args.get('q') or '').strip(),
+        'sort': sort,
+        'cursor': args.get('cursor') or None,
+        'limit': max(1, min(limit, MAX_PAGE_SIZE)),
+    }
+
+
+def feed_query(tag='', q=''):
+    """태그/검색어 필터가 적용된 게시글 쿼리 (정렬과 커서 조건 제외)"""
+    # 카드마다 작성자를 따로 조회하지 않도록 함께 로드
+    query = CommunityPost.query.options(joinedload(CommunityPost.author))
+    if tag:
+        query = query.filter(CommunityPost.tag == tag)
+    if q:
+        pattern = f'%{_escape_like(q)}%'
+        query = query.filter(or_(
+            CommunityPost.title.ilike(pattern, escape='\\'),
+            CommunityPost.content.ilike(pattern, escape='\\'),
+        ))
+    return query
+
+
+def paginate_feed(tag='', q='', sort='latest', cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    커서 기반으로 게시글 한 페이지를 가져옵니다.
+
+    다음 페이지가 있는지 확인하기 위해 limit + 1개를 조회하고,
+    남는 한 개는 버린 뒤 마지막 항목의 정렬 키로 next_cursor를 만듭니다.
+    """
+    columns = _sort_columns(sort)
+    query = feed_query(tag=tag, q=q)
+
+    if cursor:
+        values = decode_cursor(cursor, sort)
+        query = query.filter(tuple_(*columns) < tuple_(*values))
+
+    rows = query.order_by(*[c.desc() for c in columns]).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        key = [last.created_at, last.id]
+        if sort == 'popular':
+            key.insert(0, last.likes or 0)
+        elif sort == 'views':
+            key.insert(0, last.views or 0)
+        elif sort == 'comments':
+            key.insert(0, last.comment_count)
+        next_cursor = encode_cursor(key)
+
+    return FeedPage(rows, next_cursor)
+
+
+def serialize_post(post):
+    """피드 카드에 필요한 필드만 담은 JSON 표현"""
+    return {
+        'id': post.id,
+        'title': post.title,
+        'excerpt': post.content[:200],
+        'tag': post.tag,
+        'likes': post.likes,
+        'views': post.views,
+        'comments': post.comment_count,
+        'author': post.author.nickname,
+        'user_id': post.user_id,
+        'created_at': post.created_at.isoformat(),
+    }
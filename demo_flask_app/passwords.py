@@ -0,0 +1,128 @@
+"""
+비밀번호 해시/검증 서비스와 로그인 시도 제한
+
+비밀번호 해시(scrypt, PBKDF2)는 일부러 느리고 scrypt는 한 번에 수십 MB를
+쓰므로, 요청 스레드마다 바로 돌리면 로그인이 몰릴 때(크리덴셜 스터핑 포함)
+모든 워커 스레드가 해시 계산에 묶입니다.
+
+- 해시 계산은 PASSWORD_WORKERS개짜리 전용 스레드 풀에서 합니다. hashlib의
+  scrypt/pbkdf2_hmac은 계산 중 GIL을 놓으므로 스레드로도 병렬로 돌아갑니다.
+- 대기 + 실행 중인 계산은 PASSWORD_MAX_PENDING개로 제한하고, 넘치면
+  PasswordServiceBusy를 발생시켜 요청 쪽에서 503을 돌려주게 합니다.
+- 해시 방식은 PASSWORD_HASH_METHOD(werkzeug 형식, 예: scrypt, pbkdf2:sha256:600000)로
+  정합니다. 저장된 해시의 방식/파라미터가 지금 설정과 다르면 로그인에 성공했을 때
+  새 설정으로 다시 해시해서 저장합니다.
+- RateLimiter는 키(IP, 계정)별 토큰 버킷입니다. 해시를 계산하기 전에 토큰을
+  하나씩 쓰고, 없으면 다시 시도할 수 있을 때까지의 초를 알려줍니다.
+  프로세스 안에만 있으므로 워커가 여럿이면 워커마다 따로 셉니다.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from instrumentation import registry
+
+hash_seconds = registry.histogram(
+    'petcare_password_hash_seconds', '비밀번호 해시/검증 계산 시간 (operation=hash/verify)')
+rejected_total = registry.counter(
+    'petcare_password_rejected_total', '거절한 비밀번호 요청 수 (reason=busy/rate_limited)')
+rehashed_total = registry.counter(
+    'petcare_password_rehashed_total', '로그인하면서 새 해시 방식으로 바꾼 비밀번호 수')
+
+
+class PasswordServiceBusy(Exception):
+    """대기 중인 해시 계산이 너무 많아 새 요청을 받을 수 없음"""
+
+
+def hash_scheme(password_hash):
+    """werkzeug 해시 문자열의 방식/파라미터 부분 (예: scrypt:32768:8:1)"""
+    return (password_hash or '').split('$', 1)[0]
+
+
+class PasswordService:
+    """
+    method: werkzeug generate_password_hash의 method
+    workers: 동시에 계산할 해시 수 (0이면 호출한 스레드에서 바로 계산)
+    max_pending: 대기 + 실행 중인 계산의 최대 수
+    """
+
+    def __init__(self, method='scrypt', workers=4, max_pending=32):
+        self.method = method
+        # 'scrypt'처럼 파라미터를 생략한 설정도 저장되는 형태(scrypt:32768:8:1)로 비교
+        self.scheme = hash_scheme(generate_password_hash('', method=method))
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = (ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password')
+                          if workers else None)
+
+    def _run(self, operation, func, *args):
+        if not self._slots.acquire(blocking=False):
+            rejected_total.inc(reason='busy')
+            raise PasswordServiceBusy()
+        try:
+            started = time.perf_counter()
+            if self._executor is None:
+                result = func(*args)
+            else:
+                result = self._executor.submit(func, *args).result()
+            hash_seconds.observe(time.perf_counter() - started, operation=operation)
+            return result
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        """지금 설정한 방식으로 비밀번호 해시"""
+        return self._run('hash', generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """비밀번호가 맞는지 확인. (일치 여부, 새 방식으로 다시 해시해야 하는지)"""
+        if not password_hash:
+            return False, False
+        ok = self._run('verify', check_password_hash, password_hash, password)
+        return ok, ok and self.needs_rehash(password_hash)
+
+    def needs_rehash(self, password_hash):
+        return hash_scheme(password_hash) != self.scheme
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+
+class RateLimiter:
+    """
+    키별 토큰 버킷. 버킷에는 최대 burst개의 토큰이 있고 분당 per_minute개씩 다시 찹니다.
+    키가 너무 많아지지 않도록 오래 쓰지 않은 버킷부터 maxsize개까지만 보관합니다.
+    """
+
+    def __init__(self, per_minute, burst, maxsize=100000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # 키 -> (남은 토큰, 마지막으로 채운 시각)
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """토큰을 하나 쓰고 0을 반환. 토큰이 없으면 쓰지 않고 다시 시도할 수 있을 때까지의 초"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate if self.rate else float('inf')
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        if wait:
+            rejected_total.inc(reason='rate_limited')
+        return wait
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
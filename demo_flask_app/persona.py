@@ -0,0 +1,123 @@
+"""
+반려동물 페르소나 시스템 프롬프트 캐시
+
+api_chat()이 메시지마다 Pet 행을 다시 조회하고 같은 프롬프트를 다시 만드는 대신,
+pet_id별로 컴파일된 프롬프트를 캐시에 보관합니다.
+
+- 캐시 항목에는 소유자 id와 버전(Pet.updated_at)이 함께 저장되어 있습니다.
+  캐시 적중 시에는 Pet 행 전체를 읽거나 프롬프트를 다시 만들지 않고, 기본 키로
+  소유자와 버전 컬럼만 한 번 조회해서 버전이 다르거나 행이 없으면 다시 만듭니다.
+  그래서 다른 워커(프로세스 안 LRU)에서 수정/삭제한 반려동물도 바로 반영됩니다.
+- Pet 행이 수정/삭제되어 커밋되면 이 프로세스의 해당 항목은 바로 지웁니다.
+- 백엔드는 cache_backends.make_backend()로 고르므로 PERSONA_CACHE_URL에
+  redis:// 주소를 주면 여러 워커가 같은 캐시를 공유합니다.
+- 프롬프트는 항상 같은 바이트열로 만들어지므로 OpenAI 쪽 프롬프트 캐싱
+  (동일 접두어 재사용)에도 유리합니다.
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from instrumentation import registry
+from models import db, Pet
+
+persona_lookups = registry.counter(
+    'petcare_persona_cache_lookups_total', '페르소나 캐시 조회 수 (result=hit/miss)')
+
+Persona = namedtuple('Persona', ['pet_id', 'user_id', 'name', 'version', 'prompt'])
+
+PERSONA_TEMPLATE = (
+    "당신은 {name}이라는 이름의 {species} {breed}입니다.\n"
+    "성격: {personality}\n"
+    "말투: {speaking_style}\n"
+    "주인을 부르는 호칭: {user_nickname}\n"
+    "좋아하는 것: {likes}\n"
+    "싫어하는 것: {dislikes}\n"
+    "습관: {habits}\n"
+    "\n"
+    "반려동물의 관점에서 주인과 대화하세요. 친근하고 애정어린 톤으로 대화하며, "
+    "때로는 장난스럽고 귀여운 모습을 보여주세요."
+)
+
+
+def compile_persona(pet):
+    """Pet 행으로 페르소나 시스템 프롬프트를 만든다"""
+    prompt = PERSONA_TEMPLATE.format(
+        name=pet.name,
+        species=pet.species,
+        breed=pet.breed,
+        personality=pet.personality,
+        speaking_style=pet.speaking_style,
+        user_nickname=pet.user_nickname or '주인',
+        likes=pet.likes,
+        dislikes=pet.dislikes,
+        habits=pet.habits
+    )
+    return Persona(pet.id, pet.user_id, pet.name, _version(pet.updated_at, pet.created_at), prompt)
+
+
+def _version(updated_at, created_at):
+    stamp = updated_at or created_at
+    return stamp.isoformat() if stamp else ''
+
+
+class PersonaCache:
+    """pet_id -> Persona 캐시. 백엔드는 get/set/delete를 가진 캐시 저장소"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def load(self, pet_id, user_id):
+        """사용자의 반려동물 페르소나를 반환 (없거나 남의 반려동물이면 None)"""
+        try:
+            pet_id = int(pet_id)
+        except (TypeError, ValueError):
+            return None
+
+        cached = self.backend.get(str(pet_id))
+        if cached is not None:
+            persona = Persona(**cached)
+            row = (db.session.query(Pet.user_id, Pet.updated_at, Pet.created_at)
+                   .filter(Pet.id == pet_id).first())
+            if row is not None and _version(row.updated_at, row.created_at) == persona.version:
+                if row.user_id != user_id:
+                    return None
+                persona_lookups.inc(result='hit')
+                return persona
+            # 다른 워커에서 수정/삭제됨
+            self.invalidate(pet_id)
+
+        persona_lookups.inc(result='miss')
+        pet = Pet.query.filter_by(id=pet_id, user_id=user_id).first()
+        if pet is None:
+            return None
+        persona = compile_persona(pet)
+        self.backend.set(str(pet_id), persona._asdict())
+        return persona
+
+    def invalidate(self, pet_id):
+        self.backend.delete(str(pet_id))
+
+    def watch(self):
+        """Pet 수정/삭제가 커밋되면 해당 캐시 항목을 지우도록 세션 이벤트 등록"""
+        event.listen(Session, 'after_flush', _collect_changed_pets)
+        event.listen(Session, 'after_commit', self._invalidate_committed)
+        event.listen(Session, 'after_rollback', _discard_changed_pets)
+
+    def _invalidate_committed(self, session):
+        for pet_id in session.info.pop('_changed_pet_ids', ()):
+            self.invalidate(pet_id)
+
+
+def _collect_changed_pets(session, flush_context):
+    # 커밋 전에 지우면 다른 요청이 옛 값으로 다시 채울 수 있으므로 id만 모아둠
+    changed = session.info.setdefault('_changed_pet_ids', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Pet) and obj.id is not None:
+            changed.add(obj.id)
+
+
+def _discard_changed_pets(session):
+    session.info.pop('_changed_pet_ids', None)
@@ -0,0 +1,305 @@
+"""
+메인 페이지 인기/트렌딩 순위
+
+index()가 요청마다 ORDER BY likes DESC 쿼리를 두 번 실행하는 대신,
+순위표를 메모리에 들고 있다가 그대로 보여줍니다.
+
+- 인기(popular_*): 좋아요 수 순
+- 트렌딩(trending_*): 좋아요 수를 작성 후 경과 시간으로 감쇠한 점수 순
+      score = likes / (경과 시간(h) + 2) ** gravity
+  최근 trending_window_days일 안에 작성된 글만 후보로 봅니다.
+  점수는 SQL로 정렬할 수 없으므로 좋아요 순으로 TRENDING_CANDIDATES개씩 읽다가,
+  아직 읽지 않은 글이 (방금 썼다고 쳐도) 순위표에 들 수 없으면 멈춥니다.
+  TRENDING_MAX_CANDIDATES개를 읽어도 끝나지 않으면 거기서 멈추므로 그때는 근사치입니다.
+
+순위표마다 화면에 보여줄 size개보다 넉넉하게(capacity개) 들고 있고,
+좋아요가 바뀌면(counters.like_listeners) 해당 항목만 고쳐서 다시 정렬합니다.
+순위표 밖의 글이 좋아요를 받아 하한(floor)을 넘으면 그 글 한 개만 읽어서
+끼워 넣습니다. 순위표에 남은 항목이 size개보다 적어지면 다음 조회 때
+다시 계산하고, 그 외에도 refresh_interval초마다 전체를 다시 계산합니다.
+
+일기/게시글이 만들어지거나 바뀌거나 지워져 커밋되면(watch) 해당 글을 순위표에서
+SQL 없이 바로 빼므로, 비공개로 바꾼 일기나 지운 글이 메인 페이지에 남지 않습니다.
+지워지지 않은 글은 다음 조회 때 종류별로 한 번에 다시 읽어서(비공개면 제외) 끼워 넣습니다.
+세션 이벤트는 커밋한 프로세스에서만 받으므로, 다른 워커에는 refresh_interval 안에 반영됩니다.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+
+from instrumentation import registry
+from models import Diary, CommunityPost
+
+RankedItem = namedtuple('RankedItem', ['id', 'title', 'content', 'author', 'created_at',
+                                       'likes', 'views', 'score'])
+
+# 순위표 이름 -> (대상 종류, 트렌딩 여부)
+BOARDS = {
+    'popular_diaries': ('diary', False),
+    'popular_posts': ('post', False),
+    'trending_diaries': ('diary', True),
+    'trending_posts': ('post', True),
+}
+
+TRENDING_CANDIDATES = 200  # 트렌딩 후보를 한 번에 읽는 수
+TRENDING_MAX_CANDIDATES = 2000
+
+# 바뀌면 순위표에서 다시 확인할 모델 -> 대상 종류
+KINDS = {Diary: 'diary', CommunityPost: 'post'}
+
+refreshes_total = registry.counter(
+    'petcare_rankings_refresh_total', '순위표 전체 재계산 횟수 (reason=schedule/stale)')
+
+
+def trending_score(likes, created_at, now, gravity=1.5):
+    age_hours = max((now - created_at).total_seconds() / 3600, 0)
+    return (likes or 0) / (age_hours + 2) ** gravity
+
+
+def _diary_item(diary):
+    return RankedItem(diary.id, diary.title, diary.content[:100], diary.pet.name,
+                      diary.created_at, diary.likes or 0, None, 0)
+
+
+def _post_item(post):
+    return RankedItem(post.id, post.title, post.content[:100], post.author.nickname,
+                      post.created_at, post.likes or 0, post.views or 0, 0)
+
+
+def _base_query(kind):
+    if kind == 'diary':
+        return Diary.query.options(joinedload(Diary.pet)).filter(Diary.is_public == True), Diary, _diary_item
+    return CommunityPost.query.options(joinedload(CommunityPost.author)), CommunityPost, _post_item
+
+
+class Rankings:
+    """
+    size: 화면에 보여줄 개수, capacity: 순위표마다 들고 있는 후보 수
+    refresh_interval: 전체 재계산 주기(초)
+    """
+
+    def __init__(self, app, size=5, capacity=20, refresh_interval=300,
+                 trending_window_days=7, gravity=1.5):
+        self.app = app
+        self.size = size
+        self.capacity = max(capacity, size)
+        self.refresh_interval = refresh_interval
+        self.trending_window = timedelta(days=trending_window_days)
+        self.gravity = gravity
+        self._boards = {}  # 이름 -> 점수 내림차순 RankedItem 목록
+        self._floors = {}  # 이름 -> 순위표 밖 항목들의 점수 상한 (None이면 밖에 항목 없음)
+        self._refreshed_at = 0.0
+        self._stale = False
+        self._pending = set()  # 다음 조회 때 다시 읽을 (종류, id)
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+
+    def top(self, name, limit=None):
+        """순위표 상위 항목 (RankedItem 목록)"""
+        self._maybe_refresh()
+        self._reload_pending()
+        return self._boards.get(name, [])[:limit or self.size]
+
+    def refresh(self, reason='schedule'):
+        """모든 순위표를 DB에서 다시 계산"""
+        now = datetime.utcnow()
+        boards, floors = {}, {}
+        with self._lock:
+            self._pending.clear()  # 지금부터 읽는 DB에 이미 반영돼 있음
+        with self.app.app_context():
+            for name, (kind, trending) in BOARDS.items():
+                query, model, to_item = _base_query(kind)
+                if trending:
+                    items, unread = self._trending_items(query, model, to_item, now)
+                else:
+                    rows = (query.order_by(model.likes.desc(), model.created_at.desc(), model.id.desc())
+                            .limit(self.capacity + 1).all())
+                    items = sorted((self._scored(to_item(row), trending, now) for row in rows),
+                                   key=_sort_key)
+                    unread = None
+                boards[name] = items[:self.capacity]
+                # 하한: 순위표 밖 항목 중 가장 높은 점수 (읽지 않은 글의 점수 상한 포함)
+                outside = [items[self.capacity].score] if len(items) > self.capacity else []
+                if unread is not None:
+                    outside.append(unread)
+                floors[name] = max(outside) if outside else None
+
+        with self._lock:
+            self._boards, self._floors = boards, floors
+            self._refreshed_at = time.monotonic()
+            self._stale = False
+        refreshes_total.inc(reason=reason)
+
+    def _trending_items(self, query, model, to_item, now):
+        """
+        트렌딩 후보를 점수순으로. 좋아요 순으로 나눠 읽다가 읽지 않은 글의 점수 상한
+        (좋아요 수가 마지막으로 읽은 글 이하이고 방금 썼을 때의 점수)이 capacity번째
+        점수보다 높지 않으면 멈춤. (항목 목록, 읽지 않은 글의 점수 상한 또는 None)
+        """
+        ordered = (query.filter(model.created_at >= now - self.trending_window, model.likes > 0)
+                   .order_by(model.likes.desc(), model.created_at.desc(), model.id.desc()))
+        items = []
+        while True:
+            rows = ordered.offset(len(items)).limit(TRENDING_CANDIDATES).all()
+            items = sorted(items + [self._scored(to_item(row), True, now) for row in rows], key=_sort_key)
+            if len(rows) < TRENDING_CANDIDATES:
+                return items, None
+            unread = trending_score(rows[-1].likes, now, now, self.gravity)
+            if len(items) >= TRENDING_MAX_CANDIDATES or (
+                    len(items) >= self.capacity and items[self.capacity - 1].score >= unread):
+                return items, unread
+
+    def on_likes_changed(self, kind, target_id, likes):
+        """좋아요가 바뀐 글 하나만 순위표에 반영 (counters.like_listeners에 등록)"""
+        if not self._boards:
+            return
+        now = datetime.utcnow()
+        loaded = None
+        for name, (board_kind, trending) in BOARDS.items():
+            if board_kind != kind:
+                continue
+            with self._lock:
+                board = self._boards.get(name, [])
+                index = next((i for i, item in enumerate(board) if item.id == target_id), None)
+                if index is not None:
+                    self._update(name, board, index, likes, trending, now)
+                    continue
+                floor = self._floors.get(name)
+                if likes <= 0:
+                    continue
+            # 순위표 밖의 글: 한 개만 읽어서 하한을 넘으면 끼워 넣음
+            if loaded is None:
+                loaded = self._load(kind, target_id) or False
+            if not loaded or (trending and loaded.created_at < now - self.trending_window):
+                continue
+            item = self._scored(loaded._replace(likes=likes), trending, now)
+            if floor is not None and item.score <= floor:
+                continue
+            with self._lock:
+                board = [i for i in self._boards.get(name, []) if i.id != target_id] + [item]
+                self._store(name, board)
+
+    def watch(self):
+        """일기/게시글 변경이 커밋되면 on_content_changed를 부르도록 세션 이벤트 등록"""
+        event.listen(Session, 'after_flush', _collect_changed_items)
+        event.listen(Session, 'after_commit', self._apply_committed)
+        event.listen(Session, 'after_rollback', _discard_changed_items)
+
+    def _apply_committed(self, session):
+        changed = session.info.pop('_changed_ranked_items', None)
+        if changed:
+            self.on_content_changed(changed)
+
+    def on_content_changed(self, changed):
+        """
+        changed: (종류, id, 지워졌는지) 목록. 해당 글을 순위표에서 바로 빼고,
+        지워지지 않은 글은 다음 조회 때 다시 읽어서 조건에 맞으면 끼워 넣음
+        """
+        if not self._boards:
+            return
+        with self._lock:
+            for name, (kind, _) in BOARDS.items():
+                ids = {target_id for changed_kind, target_id, _ in changed if changed_kind == kind}
+                board = self._boards.get(name, [])
+                kept = [item for item in board if item.id not in ids]
+                if len(kept) == len(board):
+                    continue
+                self._boards[name] = kept
+                if len(kept) < self.size and self._floors.get(name) is not None:
+                    self._stale = True
+            self._pending.update((kind, target_id) for kind, target_id, deleted in changed if not deleted)
+            if len(self._pending) > self.capacity:
+                self._stale = True  # 한꺼번에 많이 바뀌면 하나씩 읽지 않고 전체 재계산
+
+    def _reload_pending(self):
+        if not self._pending:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        now = datetime.utcnow()
+        loaded = []
+        with self.app.app_context():
+            # 종류마다 한 번에 읽음 (지워졌거나 비공개로 바뀐 글은 결과에 없음)
+            for kind in sorted({kind for kind, _ in pending}):
+                query, model, to_item = _base_query(kind)
+                ids = [target_id for pending_kind, target_id in pending if pending_kind == kind]
+                loaded += [(kind, to_item(row)) for row in query.filter(model.id.in_(ids)).all()]
+        for kind, item in loaded:
+            for name, (board_kind, trending) in BOARDS.items():
+                if board_kind != kind:
+                    continue
+                if trending and (item.likes <= 0 or item.created_at < now - self.trending_window):
+                    continue
+                scored = self._scored(item, trending, now)
+                with self._lock:
+                    floor = self._floors.get(name)
+                    if floor is not None and scored.score <= floor:
+                        continue
+                    board = [i for i in self._boards.get(name, []) if i.id != item.id] + [scored]
+                    self._store(name, board)
+
+    def _update(self, name, board, index, likes, trending, now):
+        item = self._scored(board[index]._replace(likes=likes), trending, now)
+        board = board[:index] + board[index + 1:]
+        floor = self._floors.get(name)
+        if trending and likes <= 0:
+            pass  # 좋아요가 없으면 트렌딩 후보가 아님
+        elif floor is not None and item.score < floor:
+            pass  # 순위표 밖 항목보다 낮아졌을 수 있으므로 빼고, 모자라면 다시 계산
+        else:
+            board.append(item)
+        self._store(name, board)
+        if len(self._boards[name]) < self.size and floor is not None:
+            self._stale = True
+
+    def _store(self, name, board):
+        board.sort(key=_sort_key)
+        if len(board) > self.capacity:
+            self._floors[name] = max(self._floors.get(name) or 0, board[self.capacity].score)
+        self._boards[name] = board[:self.capacity]
+
+    def _scored(self, item, trending, now):
+        score = trending_score(item.likes, item.created_at, now, self.gravity) if trending else item.likes
+        return item._replace(score=score)
+
+    def _load(self, kind, target_id):
+        query, model, to_item = _base_query(kind)
+        row = query.filter(model.id == target_id).first()
+        return to_item(row) if row is not None else None
+
+    def _maybe_refresh(self):
+        expired = time.monotonic() - self._refreshed_at >= self.refresh_interval
+        if not (expired or self._stale):
+            return
+        # 처음 한 번은 기다리고, 이후에는 한 요청만 재계산하고 나머지는 기존 순위표 사용
+        if not self._refreshing.acquire(blocking=not self._boards):
+            return
+        try:
+            if time.monotonic() - self._refreshed_at >= self.refresh_interval or self._stale:
+                self.refresh(reason='stale' if self._stale else 'schedule')
+        finally:
+            self._refreshing.release()
+
+
+def _sort_key(item):
+    return (-item.score, -item.id)
+
+
+def _collect_changed_items(session, flush_context):
+    # 커밋 전에 빼면 롤백됐을 때 멀쩡한 글이 빠지므로 모아만 둠
+    changed = session.info.setdefault('_changed_ranked_items', set())
+    for obj in list(session.new) + list(session.dirty):
+        if type(obj) in KINDS:
+            changed.add((KINDS[type(obj)], obj.id, False))
+    for obj in session.deleted:
+        if type(obj) in KINDS:
+            changed.add((KINDS[type(obj)], obj.id, True))
+
+
+def _discard_changed_items(session):
+    session.info.pop('_changed_ranked_items', None)
@@ -0,0 +1,171 @@
+"""
+반복 질문용 챗봇 응답 캐시
+
+"뭐 먹고 싶어?", "산책 갈래?"처럼 자주 오는 질문은 매번 OpenAI를 부르지 않고
+같은 반려동물에게 이전에 했던 대답을 재사용합니다. (CHAT_CACHE_ENABLED=1 일 때만)
+
+- 키: (pet_id, 정규화한 메시지). 정규화는 NFKC, 소문자, 공백/문장부호 제거,
+  같은 글자 3번 이상 반복을 2번으로 줄이기("ㅋㅋㅋㅋ" -> "ㅋㅋ").
+- threshold < 1.0 이면 정확히 같은 키가 없을 때 같은 반려동물의 항목 중
+  글자 n-gram 코사인 유사도가 threshold 이상인 것을 찾습니다.
+- 항목은 TTL이 지나면 만료되고, 전체 개수는 maxsize를 넘지 않게 LRU로 내보냅니다.
+- 페르소나 버전이 바뀐 항목(반려동물 정보 수정)은 적중으로 치지 않습니다.
+- 캐시된 대답은 대화 맥락을 보지 않으므로 맥락이 중요한 서비스라면 끄거나
+  threshold를 높게 두세요.
+"""
+
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict, namedtuple
+
+from instrumentation import registry
+
+CacheHit = namedtuple('CacheHit', ['response', 'similarity'])
+
+_strip_pattern = re.compile(r'[\s\W_]+', re.UNICODE)
+_repeat_pattern = re.compile(r'(.)\1{2,}')
+
+cache_lookups = registry.counter(
+    'petcare_chat_cache_lookups_total', '챗봇 응답 캐시 조회 수 (result=exact/similar/miss)')
+
+
+def normalize_message(text):
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = _strip_pattern.sub('', text)
+    return _repeat_pattern.sub(r'\1\1', text)
+
+
+def ngrams(text, n=2):
+    """글자 n-gram 빈도 (짧은 문장은 글자 단위)"""
+    if len(text) < n:
+        return Counter([text]) if text else Counter()
+    return Counter(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def cosine(a, b):
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[gram] for gram, count in a.items() if gram in b)
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+class _Entry:
+    __slots__ = ('response', 'version', 'grams', 'expires_at')
+
+    def __init__(self, response, version, grams, expires_at):
+        self.response = response
+        self.version = version
+        self.grams = grams
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    def __init__(self, ttl=3600, maxsize=5000, threshold=1.0, per_pet_scan=200):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.per_pet_scan = per_pet_scan  # 유사도 검색 시 반려동물당 살펴볼 최대 항목 수
+        self._entries = OrderedDict()  # (pet_id, normalized) -> _Entry
+        self._by_pet = {}  # pet_id -> OrderedDict(normalized -> None), 최근 것이 뒤
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        registry.gauge('petcare_chat_cache_hit_ratio', '챗봇 응답 캐시 적중률', lambda: self.hit_rate)
+        registry.gauge('petcare_chat_cache_entries', '챗봇 응답 캐시 항목 수', lambda: len(self._entries))
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, persona, message):
+        """캐시된 대답(CacheHit) 또는 None"""
+        normalized = normalize_message(message)
+        if not normalized:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            key = (persona.pet_id, normalized)
+            entry = self._entries.get(key)
+            if entry is not None and self._usable(key, entry, persona.version, now):
+                self._entries.move_to_end(key)
+                return self._hit('exact', entry.response, 1.0)
+
+            if self.threshold < 1.0:
+                found = self._most_similar(persona, normalized, now)
+                if found is not None:
+                    return self._hit('similar', *found)
+
+            self.misses += 1
+            cache_lookups.inc(result='miss')
+            return None
+
+    def put(self, persona, message, response):
+        normalized = normalize_message(message)
+        if not normalized or not response:
+            return
+
+        key = (persona.pet_id, normalized)
+        entry = _Entry(response, persona.version, ngrams(normalized), time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            pet_keys = self._by_pet.setdefault(persona.pet_id, OrderedDict())
+            pet_keys[normalized] = None
+            pet_keys.move_to_end(normalized)
+            while len(self._entries) > self.maxsize:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget(old_key)
+
+    def invalidate_pet(self, pet_id):
+        with self._lock:
+            for normalized in list(self._by_pet.get(pet_id, ())):
+                self._entries.pop((pet_id, normalized), None)
+            self._by_pet.pop(pet_id, None)
+
+    def _hit(self, kind, response, similarity):
+        self.hits += 1
+        cache_lookups.inc(result=kind)
+        return CacheHit(response, similarity)
+
+    def _usable(self, key, entry, version, now):
+        if entry.expires_at <= now or entry.version != version:
+            del self._entries[key]
+            self._forget(key)
+            return False
+        return True
+
+    def _forget(self, key):
+        pet_id, normalized = key
+        pet_keys = self._by_pet.get(pet_id)
+        if pet_keys is not None:
+            pet_keys.pop(normalized, None)
+            if not pet_keys:
+                del self._by_pet[pet_id]
+
+    def _most_similar(self, persona, normalized, now):
+        pet_keys = self._by_pet.get(persona.pet_id)
+        if not pet_keys:
+            return None
+
+        grams = ngrams(normalized)
+        best, best_score = None, self.threshold
+        # 최근에 저장된 항목부터 per_pet_scan개까지만 비교
+        for candidate in list(reversed(pet_keys))[:self.per_pet_scan]:
+            key = (persona.pet_id, candidate)
+            entry = self._entries.get(key)
+            if entry is None or not self._usable(key, entry, persona.version, now):
+                continue
+            score = cosine(grams, entry.grams)
+            if score >= best_score:
+                best, best_score = key, score
+
+        if best is None:
+            return None
+        self._entries.move_to_end(best)
+        return self._entries[best].response, best_score
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+장소 리뷰 작성/수정/삭제와 평점 집계
+
+Place의 review_count, rating_sum, rating_avg, rating_1~rating_5(점수별 리뷰 수)는
+목록/지도에서 평점순 정렬과 평균 표시를 리뷰를 읽지 않고 하기 위해 비정규화한
+컬럼입니다. 리뷰 행을 바꾸는 것과 같은 트랜잭션 안에서 원자적인 UPDATE로 함께
+갱신해야 하므로, 리뷰 쓰기는 반드시 이 모듈을 거칩니다.
+
+집계가 어긋났을 때(직접 SQL로 고친 경우 등)를 위해 매일 한 번 재검증합니다.
+    python reviews.py              # 모든 장소의 집계를 리뷰에서 다시 계산해 고침
+    python reviews.py --check      # 고치지 않고 어긋난 장소 수만 확인
+
+    # crontab 예시 (매일 새벽 4시)
+    0 4 * * * cd /srv/petcare/demo_flask_app && python reviews.py
+"""
+
+import sys
+
+from sqlalchemy import Float, bindparam, case, cast, func, select, update
+from sqlalchemy.orm import joinedload
+
+from models import db, Place, PlaceReview
+
+RATINGS = (1, 2, 3, 4, 5)
+
+
+def validate_rating(value):
+    """1~5 정수 평점. 아니면 ValueError"""
+    try:
+        if isinstance(value, bool):
+            raise ValueError(value)
+        rating = int(str(value).strip())
+    except (TypeError, ValueError):
+        raise ValueError('평점은 1~5 사이의 정수여야 합니다.')
+    if rating not in RATINGS:
+        raise ValueError('평점은 1~5 사이의 정수여야 합니다.')
+    return rating
+
+
+def _bump_rating(place_id, added=None, removed=None):
+    """평점 added를 더하고 removed를 뺀 만큼 집계 컬럼을 SQL 안에서 증감"""
+    count_delta = (added is not None) - (removed is not None)
+    sum_delta = (added or 0) - (removed or 0)
+    count = Place.review_count + count_delta
+    values = {
+        'review_count': count,
+        'rating_sum': Place.rating_sum + sum_delta,
+        # SET의 오른쪽은 모두 갱신 전 값이므로 평균도 증감분으로 계산
+        'rating_avg': case(
+            (count > 0, cast(Place.rating_sum + sum_delta, Float) / count),
+            else_=0.0
+        ),
+    }
+    if added is not None:
+        values[f'rating_{added}'] = getattr(Place, f'rating_{added}') + 1
+    if removed is not None:
+        column = f'rating_{removed}'
+        values[column] = values.get(column, getattr(Place, column)) - 1
+    db.session.execute(update(Place).where(Place.id == place_id).values(**values))
+
+
+def add_review(place, user_id, rating, content=None):
+    """리뷰를 추가하고 장소 평점 집계에 더한 뒤 커밋"""
+    rating = validate_rating(rating)
+    review = PlaceReview(rating=rating, content=content, user_id=user_id, place_id=place.id)
+    try:
+        db.session.add(review)
+        db.session.flush()
+        _bump_rating(place.id, added=rating)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire(place)
+    return review
+
+
+def update_review(review, rating=None, content=None):
+    """리뷰 평점/내용을 고치고, 평점이 바뀌었으면 집계도 옮긴 뒤 커밋"""
+    old_rating = review.rating
+    new_rating = validate_rating(rating) if rating is not None else old_rating
+    try:
+        review.rating = new_rating
+        if content is not None:
+            review.content = content
+        db.session.flush()
+        if new_rating != old_rating:
+            _bump_rating(review.place_id, added=new_rating, removed=old_rating)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire(review.place)
+    return review
+
+
+def delete_review(review):
+    """리뷰를 삭제하고 장소 평점 집계에서 뺀 뒤 커밋"""
+    place, rating = review.place, review.rating
+    try:
+        db.session.delete(review)
+        db.session.flush()
+        _bump_rating(place.id, removed=rating)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire(place)
+
+
+def top_rated(category=None, pet_friendly=None, limit=20):
+    """평점 높은 장소 (ix_place_rating / ix_place_category_rating 인덱스 순서대로)"""
+    query = Place.query
+    if category:
+        query = query.filter(Place.category == category)
+    if pet_friendly is not None:
+        query = query.filter(Place.pet_friendly == pet_friendly)
+    return query.order_by(Place.rating_avg.desc(), Place.review_count.desc()).limit(limit).all()
+
+
+def recent_reviews(place_id, limit=20):
+    return (PlaceReview.query.options(joinedload(PlaceReview.author))
+            .filter(PlaceReview.place_id == place_id)
+            .order_by(PlaceReview.created_at.desc(), PlaceReview.id.desc())
+            .limit(limit).all())
+
+
+def rating_summary(place):
+    """장소의 평균 평점/리뷰 수/점수별 리뷰 수 (집계 컬럼만 읽음)"""
+    return {
+        'average': round(place.rating_avg, 2),
+        'count': place.review_count,
+        'histogram': {rating: getattr(place, f'rating_{rating}') for rating in RATINGS},
+    }
+
+
+def serialize_review(review):
+    return {
+        'id': review.id,
+        'rating': review.rating,
+        'content': review.content,
+        'author': review.author.nickname,
+        'user_id': review.user_id,
+        'created_at': review.created_at.isoformat(),
+    }
+
+
+def _aggregate_columns():
+    places = Place.__table__
+    return [places.c.review_count, places.c.rating_sum] + [places.c[f'rating_{r}'] for r in RATINGS]
+
+
+def reconcile(conn, fix=True, batch_size=1000):
+    """
+    리뷰 테이블에서 장소별 집계를 다시 계산해 저장된 값과 비교하고,
+    fix=True면 어긋난 장소를 고칩니다. 어긋난 장소 수를 반환
+    """
+    places, reviews = Place.__table__, PlaceReview.__table__
+    actual = (
+        select(
+            reviews.c.place_id,
+            func.count().label('review_count'),
+            func.sum(reviews.c.rating).label('rating_sum'),
+            *[func.sum(case((reviews.c.rating == r, 1), else_=0)).label(f'rating_{r}') for r in RATINGS]
+        )
+        .group_by(reviews.c.place_id)
+        .subquery()
+    )
+    columns = _aggregate_columns()
+    query = (
+        select(places.c.id, places.c.rating_avg, *columns,
+               *[func.coalesce(actual.c[column.name], 0).label(f'actual_{column.name}') for column in columns])
+        .select_from(places.outerjoin(actual, actual.c.place_id == places.c.id))
+        .order_by(places.c.id)
+    )
+
+    fixes = []
+    for row in conn.execute(query):
+        expected = {column.name: row._mapping[f'actual_{column.name}'] for column in columns}
+        expected['rating_avg'] = (expected['rating_sum'] / expected['review_count']
+                                  if expected['review_count'] else 0.0)
+        stored = {name: row._mapping[name] for name in expected}
+        if any(abs(stored[name] - value) > 1e-9 for name, value in expected.items()):
+            fixes.append(dict(expected, place_id=row.id))
+
+    if fix:
+        for start in range(0, len(fixes), batch_size):
+            conn.execute(
+                update(places).where(places.c.id == bindparam('place_id')),
+                fixes[start:start + batch_size]
+            )
+    return len(fixes)
+
+
+def main():
+    from app import app
+
+    fix = '--check' not in sys.argv
+    with app.app_context():
+        with db.engine.begin() as conn:
+            mismatched = reconcile(conn, fix=fix)
+    if not mismatched:
+        print('✅ 모든 장소의 평점 집계가 리뷰와 일치합니다.')
+    elif fix:
+        print(f'🔧 평점 집계가 어긋난 장소 {mismatched}개를 고쳤습니다.')
+    else:
+        print(f'❌ 평점 집계가 어긋난 장소 {mismatched}개 (python reviews.py 로 고치세요)')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
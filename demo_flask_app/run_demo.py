@@ -22,7 +22,8 @@ os.environ['FLASK_ENV'] = 'development'
 try:
     # 먼저 models에서 db를 import한 다음 app import
     from models import User, Pet, Diary, CommunityPost, HealthRecord, CareRoutine, TravelDestination, Place, db
-    from app import app
+    from app import app, start_background_jobs
+    from migrations import migrate
 except ImportError as e:
     print(f"❌ 모듈 import 실패: {e}")
     print("pip install -r requirements.txt 명령어로 의존성을 설치해주세요.")
@@ -164,6 +165,8 @@ def create_sample_data():
                 address='서울시 강남구 테헤란로 123',
                 category='병원',
                 phone='02-1234-5678',
+                latitude=37.5006,
+                longitude=127.0364,
                 description='친절한 진료와 합리적인 가격으로 유명한 동물병원입니다.',
                 pet_friendly=True
             )
@@ -233,11 +236,20 @@ def main():
     print("\n💾 데이터베이스 초기화 중...")
     try:
         with app.app_context():
-            db.create_all()
+            migrate()
             print("✅ 데이터베이스 초기화 완료!")
             
             # 샘플 데이터 생성
             create_sample_data()
+        
+        # 재시작 전에 끝나지 않은 AI 일기 작업 이어서 처리
+        # (디버그 리로더의 감시 프로세스가 아닌 실제 서버 프로세스에서만)
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            jobs, images = start_background_jobs()
+            if jobs:
+                print(f"📝 이어서 처리할 일기 작업: {jobs}개")
+            if images:
+                print(f"🖼️ 이어서 변환할 사진: {images}개")
             
     except Exception as e:
         print(f"❌ 데이터베이스 초기화 실패: {e}")
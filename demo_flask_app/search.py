@@ -0,0 +1,327 @@
+"""
+게시글/공개 일기 전문 검색 (SQLite FTS5)
+
+커뮤니티 게시글(제목/내용/태그)과 공개 일기(제목/내용)를 FTS5 가상 테이블
+search_index 하나에 색인하고 bm25 점수 순으로 찾습니다.
+
+- 한국어는 띄어쓰기 단위로 자르면 조사가 붙어서("산책을", "산책하고")
+  검색이 안 되므로, 한글 등은 2글자씩 겹쳐 자른 n-gram(바이그램)으로,
+  영문/숫자는 단어 그대로 색인합니다. FTS5 내장 trigram 토크나이저는
+  3글자 미만 검색어를 찾지 못해서 두 글자 단어가 많은 한국어에는 맞지 않습니다.
+      "산책하고 왔어요" -> "산책 책하 하고 고 왔어 어요 요"
+  검색어도 같은 방식으로 잘라 연속된 n-gram(구문)으로 찾으므로 부분 문자열
+  검색과 같은 결과가 나옵니다.
+- rowid = 글 id * 2 (+1이면 일기) 로 정해서 원본 글 하나의 색인 행을
+  바로 지우고 다시 넣을 수 있습니다.
+- 글이 추가/수정/삭제되면 같은 트랜잭션 안에서(after_flush) 색인을 고칩니다.
+  비공개 일기는 색인하지 않고, 공개 여부가 바뀌면 넣거나 뺍니다.
+- 색인 테이블은 migrations.py (버전 5)에서 만들고 기존 글을 채웁니다.
+  SQLite가 아니거나 색인이 없으면 LIKE 검색으로 대신합니다.
+"""
+
+import base64
+import json
+import re
+import unicodedata
+from collections import namedtuple
+
+from sqlalchemy import event, inspect, or_, text
+from sqlalchemy.orm import Session, joinedload
+
+from models import db, CommunityPost, Diary
+from pagination import InvalidCursor, encode_cursor
+
+KINDS = ('post', 'diary')
+MAX_TERMS = 8
+
+# 색인 컬럼별 bm25 가중치 (제목, 본문, 태그)
+WEIGHTS = (4.0, 1.0, 2.0)
+
+SearchHit = namedtuple('SearchHit', ['kind', 'item', 'score'])
+SearchPage = namedtuple('SearchPage', ['hits', 'next_cursor'])
+
+# 영문/숫자 단어, 또는 그 밖의 글자(한글 등)가 이어진 덩어리
+_RUN = re.compile(r'[0-9a-z]+|[^\W\d_a-z]+')
+
+_ready = {}  # 엔진 URL -> 색인 테이블 존재 여부
+
+
+def _normalize(value):
+    return unicodedata.normalize('NFKC', value or '').lower()
+
+
+def _runs(value):
+    return _RUN.findall(_normalize(value))
+
+
+def _grams(run):
+    if run.isascii() or len(run) == 1:
+        return [run]
+    # 끝 글자도 따로 넣어서 한 글자 검색어가 덩어리 끝에 있어도 찾게 함
+    return [run[i:i + 2] for i in range(len(run) - 1)] + [run[-1]]
+
+
+def ngram_text(value):
+    """색인에 넣을 n-gram 문자열"""
+    return ' '.join(gram for run in _runs(value) for gram in _grams(run))
+
+
+def match_expression(query):
+    """검색어를 FTS5 MATCH 식으로 변환 (모든 단어를 포함하는 글). 단어가 없으면 None"""
+    terms = []
+    for run in _runs(query)[:MAX_TERMS]:
+        if run.isascii() or len(run) == 1:
+            terms.append(f'"{run}"*')  # 접두어 검색
+        else:
+            terms.append('"' + ' '.join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+    return ' '.join(terms) or None
+
+
+def _rowid(kind, target_id):
+    return target_id * 2 + (1 if kind == 'diary' else 0)
+
+
+def _document(obj):
+    if isinstance(obj, CommunityPost):
+        return _rowid('post', obj.id), obj.title, obj.content, obj.tag
+    return _rowid('diary', obj.id), obj.title, obj.content, None
+
+
+def is_available(conn):
+    """현재 DB에 검색 색인(FTS5 테이블)이 있는지 (엔진별로 한 번만 확인)"""
+    key = str(conn.engine.url)
+    if key not in _ready:
+        _ready[key] = conn.dialect.name == 'sqlite' and inspect(conn).has_table('search_index')
+    return _ready[key]
+
+
+def create_index(conn):
+    """search_index 테이블을 만들고 기존 글로 채움 (이미 있으면 다시 채움)"""
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "title, body, tag, tokenize='unicode61 remove_diacritics 0')"
+    ))
+    _ready[str(conn.engine.url)] = True
+    return rebuild(conn)
+
+
+def rebuild(conn, batch_size=500):
+    """색인을 비우고 게시글과 공개 일기를 모두 다시 넣음. 넣은 문서 수를 반환"""
+    posts = db.metadata.tables['community_post']
+    diaries = db.metadata.tables['diary']
+    conn.execute(text('DELETE FROM search_index'))
+    total = 0
+    for kind, query in (
+        ('post', posts.select().with_only_columns(posts.c.id, posts.c.title, posts.c.content, posts.c.tag)),
+        ('diary', diaries.select().with_only_columns(diaries.c.id, diaries.c.title, diaries.c.content)
+            .where(diaries.c.is_public == True)),
+    ):
+        result = conn.execute(query)
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+            _insert(conn, [(_rowid(kind, row.id), row.title, row.content,
+                            row.tag if kind == 'post' else None) for row in rows])
+            total += len(rows)
+    return total
+
+
+def _insert(conn, documents):
+    conn.execute(
+        text('INSERT INTO search_index (rowid, title, body, tag) VALUES (:rowid, :title, :body, :tag)'),
+        [{'rowid': rowid, 'title': ngram_text(title), 'body': ngram_text(body), 'tag': ngram_text(tag)}
+         for rowid, title, body, tag in documents]
+    )
+
+
+def _delete(conn, rowids):
+    conn.execute(text('DELETE FROM search_index WHERE rowid = :rowid'),
+                 [{'rowid': rowid} for rowid in rowids])
+
+
+def _changed(obj, *fields):
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def _sync_index(session, flush_context):
+    """flush된 게시글/일기 변경을 같은 트랜잭션 안에서 색인에 반영"""
+    removed, upserts = set(), {}
+    for obj in session.new:
+        if isinstance(obj, CommunityPost) or (isinstance(obj, Diary) and obj.is_public):
+            upserts[_document(obj)[0]] = obj
+    for obj in session.dirty:
+        if isinstance(obj, CommunityPost) and _changed(obj, 'title', 'content', 'tag'):
+            upserts[_document(obj)[0]] = obj
+        elif isinstance(obj, Diary) and _changed(obj, 'title', 'content', 'is_public'):
+            if obj.is_public:
+                upserts[_document(obj)[0]] = obj
+            else:
+                removed.add(_rowid('diary', obj.id))
+    for obj in session.deleted:
+        if isinstance(obj, (CommunityPost, Diary)):
+            removed.add(_document(obj)[0])
+
+    if not (removed or upserts):
+        return
+    conn = session.connection()
+    if not is_available(conn):
+        return
+    _delete(conn, removed | set(upserts))
+    if upserts:
+        _insert(conn, [_document(obj) for obj in upserts.values()])
+
+
+def watch():
+    """게시글/일기 변경이 flush될 때 색인을 고치도록 세션 이벤트 등록"""
+    event.listen(Session, 'after_flush', _sync_index)
+
+
+def parse_search_args(args, default_limit, max_limit):
+    """요청 쿼리스트링에서 검색 조건(q, type, cursor, limit)을 추출"""
+    kind = args.get('type', 'all')
+    try:
+        limit = int(args.get('limit', default_limit))
+    except ValueError:
+        limit = default_limit
+    return {
+        'q': (args.get('q') or '').strip(),
+        'kind': kind if kind in KINDS else None,
+        'cursor': args.get('cursor') or None,
+        'limit': max(1, min(limit, max_limit)),
+    }
+
+
+def decode_search_cursor(cursor):
+    """검색 커서를 [점수, rowid] (LIKE 검색이면 [종류 순번, id]) 로 복원"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if (not isinstance(values, list) or len(values) != 2
+                or not all(isinstance(v, (int, float)) for v in values) or not isinstance(values[1], int)):
+            raise InvalidCursor(cursor)
+        return values
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def search(q, kind=None, cursor=None, limit=20):
+    """
+    검색어와 일치하는 게시글/공개 일기를 관련도 순으로 한 페이지 가져옵니다.
+
+    커서는 마지막 결과의 (bm25 점수, rowid) 키셋이며, limit + 1개를 조회해서
+    다음 페이지가 있는지 확인합니다. 검색어에 단어가 없으면 빈 페이지를 반환합니다.
+    """
+    expression = match_expression(q)
+    if expression is None:
+        return SearchPage([], None)
+    after = decode_search_cursor(cursor) if cursor else None
+    conn = db.session.connection()
+    if not is_available(conn):
+        if after is not None and not isinstance(after[0], int):
+            raise InvalidCursor(cursor)
+        return _search_like(q, kind, after, limit)
+
+    if after is not None and isinstance(after[0], int):
+        raise InvalidCursor(cursor)
+
+    weights = ', '.join(str(weight) for weight in WEIGHTS)
+    sql = (f'SELECT rowid, bm25(search_index, {weights}) AS score FROM search_index '
+           'WHERE search_index MATCH :expression')
+    params = {'expression': expression, 'limit': limit + 1}
+    if kind:
+        sql += ' AND rowid % 2 = :parity'
+        params['parity'] = 1 if kind == 'diary' else 0
+    if after is not None:
+        sql += f' AND (bm25(search_index, {weights}), rowid) > (:score, :rowid)'
+        params['score'], params['rowid'] = after
+    sql += ' ORDER BY score, rowid LIMIT :limit'
+    rows = conn.execute(text(sql), params).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].score, rows[-1].rowid])
+
+    # 원본 글은 종류별로 한 번씩만 조회
+    post_ids = [row.rowid // 2 for row in rows if row.rowid % 2 == 0]
+    diary_ids = [row.rowid // 2 for row in rows if row.rowid % 2 == 1]
+    loaded = {}
+    if post_ids:
+        for post in CommunityPost.query.options(joinedload(CommunityPost.author)).filter(
+                CommunityPost.id.in_(post_ids)):
+            loaded[_rowid('post', post.id)] = ('post', post)
+    if diary_ids:
+        for diary in Diary.query.options(joinedload(Diary.pet)).filter(
+                Diary.id.in_(diary_ids), Diary.is_public == True):
+            loaded[_rowid('diary', diary.id)] = ('diary', diary)
+
+    hits = [SearchHit(*loaded[row.rowid], -row.score) for row in rows if row.rowid in loaded]
+    return SearchPage(hits, next_cursor)
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _search_like(q, kind, after, limit):
+    """색인이 없을 때: 제목/내용 LIKE 검색을 최신순으로 (커서는 [종류 순번, id])"""
+    pattern = f'%{_escape_like(q)}%'
+    hits = []
+    for order, (name, model, load) in enumerate((
+        ('post', CommunityPost, joinedload(CommunityPost.author)),
+        ('diary', Diary, joinedload(Diary.pet)),
+    )):
+        if kind and kind != name:
+            continue
+        if after is not None and order < after[0]:
+            continue
+        query = model.query.options(load).filter(or_(
+            model.title.ilike(pattern, escape='\\'),
+            model.content.ilike(pattern, escape='\\'),
+        ))
+        if model is Diary:
+            query = query.filter(Diary.is_public == True)
+        if after is not None and order == after[0]:
+            query = query.filter(model.id < after[1])
+        rows = query.order_by(model.id.desc()).limit(limit + 1 - len(hits)).all()
+        hits += [SearchHit(name, row, 0.0) for row in rows]
+        if len(hits) > limit:
+            break
+
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor([KINDS.index(hits[-1].kind), hits[-1].item.id])
+    return SearchPage(hits, next_cursor)
+
+
+def excerpt(value, q, width=120):
+    """검색어가 처음 나오는 곳 주변을 잘라낸 미리보기"""
+    value = value or ''
+    lowered = value.lower()
+    positions = [lowered.find(run) for run in _runs(q)]
+    positions = [position for position in positions if position >= 0]
+    start = max(min(positions) - width // 4, 0) if positions else 0
+    snippet = value[start:start + width]
+    return ('…' if start > 0 else '') + snippet + ('…' if start + width < len(value) else '')
+
+
+def serialize_hit(hit, q):
+    """검색 결과 한 건의 JSON 표현"""
+    item = hit.item
+    result = {
+        'type': hit.kind,
+        'id': item.id,
+        'title': item.title,
+        'excerpt': excerpt(item.content, q),
+        'likes': item.likes or 0,
+        'score': hit.score,
+        'created_at': item.created_at.isoformat(),
+    }
+    if hit.kind == 'post':
+        result.update(author=item.author.nickname, tag=item.tag, views=item.views or 0)
+    else:
+        result.update(author=item.pet.name)
+    return result
@@ -0,0 +1,203 @@
+"""
+일기 작성용 날씨 조회 캐시
+
+일기마다 날씨 API를 부르면 이미 느린 일기 작성 요청에 수백 ms가 더해지므로,
+위치를 격자(WEATHER_GRID도 단위) 지역으로 묶고 지역별로 "정시 단위" 캐시를 둡니다.
+
+- 같은 지역, 같은 시간대(정시 기준 한 시간)의 조회는 캐시에서 바로 답합니다.
+- 시간대가 바뀌었어도 WEATHER_STALE_TTL초 안의 이전 값이 있으면 그 값을 바로
+  돌려주고 뒤에서 새로 받아옵니다 (stale-while-revalidate).
+- 캐시에 아무것도 없는 지역은 받아올 때까지 최대 timeout초 기다리고, 넘으면
+  None을 돌려줍니다 (호출한 쪽에서 기본값 사용). 받아오던 요청은 계속 진행되어
+  다음 조회부터 캐시에 남습니다.
+- 같은 지역을 동시에 조회해도 외부 API 호출은 한 번만 나갑니다 (요청 합치기).
+
+제공자는 WEATHER_PROVIDER로 고릅니다.
+    fake            위치와 시각으로 정해지는 가짜 날씨 (기본값, API 키 불필요)
+    openweathermap  OpenWeatherMap 현재 날씨 API (WEATHER_API_KEY 필요)
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, timezone
+
+import requests
+
+from instrumentation import registry
+
+# write_diary.html의 날씨 선택지와 같은 값
+CONDITIONS = ('맑음', '구름많음', '흐림', '비', '눈', '바람')
+
+Weather = namedtuple('Weather', ['condition', 'temperature', 'region', 'hour', 'stale'])
+
+lookups_total = registry.counter(
+    'petcare_weather_lookups_total', '날씨 조회 수 (result=fresh/stale/fetched/timeout/error)')
+upstream_calls_total = registry.counter(
+    'petcare_weather_upstream_calls_total', '날씨 제공자 호출 수 (provider, result=ok/error)')
+
+
+class WeatherUnavailable(Exception):
+    """날씨 제공자가 응답하지 않거나 응답을 해석할 수 없을 때 발생"""
+
+
+class FakeWeatherProvider:
+    """위치와 시간대로 정해지는 결정적인 가짜 날씨 (latency초 지연으로 느린 API 흉내)"""
+
+    name = 'fake'
+
+    def __init__(self, latency=0.2):
+        self.latency = latency
+
+    def fetch(self, lat, lng):
+        if self.latency:
+            time.sleep(self.latency)
+        hour = datetime.now(timezone.utc).strftime('%Y%m%d%H')
+        digest = hashlib.sha256(f'{lat:.2f},{lng:.2f},{hour}'.encode()).digest()
+        return CONDITIONS[digest[0] % len(CONDITIONS)], round(digest[1] / 255 * 35 - 5, 1)
+
+
+class OpenWeatherMapProvider:
+    """OpenWeatherMap 현재 날씨 API"""
+
+    name = 'openweathermap'
+    url = 'https://api.openweathermap.org/data/2.5/weather'
+
+    def __init__(self, api_key, timeout=3.0):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def fetch(self, lat, lng):
+        try:
+            response = self.session.get(self.url, timeout=self.timeout, params={
+                'lat': lat, 'lon': lng, 'appid': self.api_key, 'units': 'metric', 'lang': 'kr'})
+            response.raise_for_status()
+            body = response.json()
+            main = body['weather'][0]['main']
+            temperature = body.get('main', {}).get('temp')
+            wind = body.get('wind', {}).get('speed') or 0
+        except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+            raise WeatherUnavailable(str(e)) from e
+        return _owm_condition(main, body.get('clouds', {}).get('all', 0), wind), temperature
+
+
+def _owm_condition(main, cloudiness, wind_speed):
+    if main in ('Rain', 'Drizzle', 'Thunderstorm'):
+        return '비'
+    if main == 'Snow':
+        return '눈'
+    if wind_speed >= 9:
+        return '바람'
+    if main == 'Clear':
+        return '맑음'
+    if main == 'Clouds':
+        return '흐림' if cloudiness >= 85 else '구름많음'
+    return '흐림'  # 안개, 황사 등
+
+
+def make_provider(name, api_key=None, latency=0.2):
+    if name == 'openweathermap':
+        if not api_key:
+            raise ValueError('WEATHER_PROVIDER=openweathermap 에는 WEATHER_API_KEY가 필요합니다.')
+        return OpenWeatherMapProvider(api_key)
+    if name in (None, '', 'fake'):
+        return FakeWeatherProvider(latency)
+    raise ValueError(f'알 수 없는 WEATHER_PROVIDER: {name}')
+
+
+def _hour_bucket(now=None):
+    return (now or datetime.now(timezone.utc)).strftime('%Y%m%d%H')
+
+
+class WeatherService:
+    """
+    provider: fetch(lat, lng) -> (날씨, 기온)을 가진 제공자
+    grid: 지역 격자 크기(도), stale_ttl: 이전 시간대 값을 쓸 수 있는 시간(초)
+    timeout: 캐시에 없을 때 기다리는 최대 시간(초), maxsize: 캐시에 둘 지역 수
+    """
+
+    def __init__(self, provider, grid=0.1, stale_ttl=3 * 3600, timeout=1.5, maxsize=2048, workers=4):
+        self.provider = provider
+        self.grid = grid
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # 지역 -> (시간대, 날씨, 기온, 받은 시각)
+        self._inflight = {}  # 지역 -> 진행 중인 Future
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='weather')
+
+    def region(self, lat, lng):
+        """위경도를 격자 지역 키로 (격자 중심 좌표로 조회하므로 지역마다 결과가 하나)"""
+        return (math.floor(lat / self.grid), math.floor(lng / self.grid))
+
+    def lookup(self, lat, lng, timeout=None):
+        """(lat, lng)의 현재 날씨 Weather, 기다려도 못 받으면 None"""
+        region = self.region(lat, lng)
+        hour = _hour_bucket()
+        with self._lock:
+            entry = self._entries.get(region)
+            if entry is not None:
+                self._entries.move_to_end(region)
+                if entry[0] == hour:
+                    lookups_total.inc(result='fresh')
+                    return Weather(entry[1], entry[2], region, entry[0], False)
+                if time.time() - entry[3] < self.stale_ttl:
+                    self._refresh(region)
+                    lookups_total.inc(result='stale')
+                    return Weather(entry[1], entry[2], region, entry[0], True)
+            future = self._refresh(region)
+
+        try:
+            condition, temperature, fetched_hour = future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            lookups_total.inc(result='timeout')
+            return None
+        except WeatherUnavailable:
+            lookups_total.inc(result='error')
+            return None
+        lookups_total.inc(result='fetched')
+        return Weather(condition, temperature, region, fetched_hour, False)
+
+    def _refresh(self, region):
+        """지역의 진행 중인 조회를 반환하고, 없으면 새로 시작 (self._lock 안에서 호출)"""
+        future = self._inflight.get(region)
+        if future is None:
+            future = self._executor.submit(self._fetch, region)
+            self._inflight[region] = future
+        return future
+
+    def _fetch(self, region):
+        lat, lng = (region[0] + 0.5) * self.grid, (region[1] + 0.5) * self.grid
+        hour = _hour_bucket()
+        try:
+            condition, temperature = self.provider.fetch(lat, lng)
+        except Exception as e:
+            upstream_calls_total.inc(provider=self.provider.name, result='error')
+            with self._lock:
+                self._inflight.pop(region, None)
+            if isinstance(e, WeatherUnavailable):
+                raise
+            raise WeatherUnavailable(str(e)) from e
+        upstream_calls_total.inc(provider=self.provider.name, result='ok')
+
+        with self._lock:
+            self._entries[region] = (hour, condition, temperature, time.time())
+            self._entries.move_to_end(region)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._inflight.pop(region, None)
+        return condition, temperature, hour
+
+
+def serialize_weather(weather):
+    return {
+        'condition': weather.condition,
+        'temperature': weather.temperature,
+        'hour': weather.hour,
+        'stale': weather.stale,
+    }
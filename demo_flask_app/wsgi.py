@@ -2,18 +2,40 @@
 """
 WSGI 엔트리포인트
 직접 app.py를 실행하는 대신 이 파일을 사용하세요.
+
+    python wsgi.py                  # 개발 서버 (마이그레이션 후 실행)
+    gunicorn -w 4 wsgi:app          # 운영 (먼저 python migrations.py)
+
+gunicorn 워커가 wsgi:app을 import할 때도 워커마다 밀린 AI 일기 작업과 사진 변환을
+이어서 처리하고 조회수 반영 스레드를 띄웁니다. --preload를 쓰면 import가 fork 전 마스터에서 일어나므로
+post_fork 훅에서 app.start_background_jobs()를 불러주세요.
 """
 
-from app import app, db
+import os
+
+from app import app, start_background_jobs
+from migrations import migrate
 
 if __name__ == '__main__':
-    # 데이터베이스 테이블 생성
+    # 데이터베이스 테이블 생성 및 스키마 마이그레이션
     with app.app_context():
-        db.create_all()
-        print("✅ 데이터베이스 테이블이 생성되었습니다.")
+        migrate()
+        print("✅ 데이터베이스 스키마가 최신입니다.")
+    
+    # 재시작 전에 끝나지 않은 AI 일기 작업 이어서 처리
+    # (디버그 리로더의 감시 프로세스가 아닌 실제 서버 프로세스에서만)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        jobs, images = start_background_jobs()
+        if jobs:
+            print(f"📝 이어서 처리할 일기 작업: {jobs}개")
+        if images:
+            print(f"🖼️ 이어서 변환할 사진: {images}개")
     
     print("🚀 PetCare 서버가 시작됩니다...")
     print("📍 URL: http://localhost:5000")
     
     # Flask 개발 서버 실행
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)
+else:
+    # WSGI 서버가 import한 워커 프로세스
+    start_background_jobs()